@@ -0,0 +1,50 @@
+"""
+ASGI config for tabelionato project.
+
+It exposes the ASGI callable as a module-level variable named ``application``,
+served in production by gunicorn with uvicorn workers (see the Procfile):
+
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+
+The read-only quiz views are async; the other views still run synchronously,
+in a thread, as Django does for every sync view under ASGI.
+
+Requests only run concurrently if the whole middleware chain is async
+capable: a single sync-only middleware makes Django 3.1 adapt the chain to
+sync. WhiteNoise 5.2 is sync-only, so settings use the async capable
+subclass in tabelionato.utils.middleware. The debug toolbar, in local
+settings, is sync-only too.
+
+Django 3.1 does not give each request its own thread for ``sync_to_async``
+(Django 3.2 does): without it, the ORM calls of every request share one
+thread. ``application`` wraps each request in a ``ThreadSensitiveContext``,
+so each gets its own thread and database connection. Django 3.1 also
+iterates streaming responses in the event loop, where the ORM refuses to
+run; tabelionato.utils.asgi.ASGIHandler reads them in that thread instead.
+
+"""
+import os
+import sys
+from pathlib import Path
+
+import django
+from asgiref.sync import ThreadSensitiveContext
+
+from tabelionato.utils.asgi import ASGIHandler
+
+# This allows easy placement of apps within the interior
+# tabelionato directory.
+ROOT_DIR = Path(__file__).resolve(strict=True).parent.parent
+sys.path.append(str(ROOT_DIR / "tabelionato"))
+# We defer to a DJANGO_SETTINGS_MODULE already in the environment.
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.production")
+
+django.setup(set_prefix=False)
+django_application = ASGIHandler()
+
+
+# This application object is used by any ASGI server configured to use this
+# file.
+async def application(scope, receive, send):
+    async with ThreadSensitiveContext():
+        await django_application(scope, receive, send)
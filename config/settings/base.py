@@ -76,7 +76,7 @@ THIRD_PARTY_APPS = [
 LOCAL_APPS = [
     "tabelionato.users.apps.UsersConfig",
     # Your stuff: custom apps go here   
-    "tabelionato.quiz",
+    "tabelionato.quiz.apps.QuizConfig",
     #"tabelionato.blog",
     #"tabelionato.wiki",
 ]
@@ -127,7 +127,8 @@ AUTH_PASSWORD_VALIDATORS = [
 # https://docs.djangoproject.com/en/dev/ref/settings/#middleware
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "tabelionato.utils.middleware.WhiteNoiseMiddleware",
+    "tabelionato.utils.query_budget.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -274,3 +275,34 @@ SOCIALACCOUNT_ADAPTER = "tabelionato.users.adapters.SocialAccountAdapter"
 
 # Your stuff...
 # ------------------------------------------------------------------------------
+# Tempo de vida, em segundos, dos snapshots compilados dos questionários
+QUIZ_SNAPSHOT_TIMEOUT = env.int("QUIZ_SNAPSHOT_TIMEOUT", default=60 * 60 * 24)
+# Snapshots mantidos em memória em cada processo
+QUIZ_SNAPSHOT_LOCAL_SIZE = env.int("QUIZ_SNAPSHOT_LOCAL_SIZE", default=64)
+# Tentativas anônimas em cookie assinado (veja tabelionato/quiz/anonymous.py)
+QUIZ_ANON_ATTEMPT_AGE = env.int("QUIZ_ANON_ATTEMPT_AGE", default=60 * 60 * 24 * 7)
+QUIZ_ANON_COOKIE_MAX_SIZE = env.int("QUIZ_ANON_COOKIE_MAX_SIZE", default=3072)
+# Idade das tentativas concluídas movidas para o arquivo (veja
+# tabelionato/quiz/archive.py)
+QUIZ_ARCHIVE_AFTER_DAYS = env.int("QUIZ_ARCHIVE_AFTER_DAYS", default=180)
+# Tentativas em andamento sem respostas há mais dias que isso são apagadas
+QUIZ_STALE_ATTEMPT_DAYS = env.int("QUIZ_STALE_ATTEMPT_DAYS", default=30)
+# Cache do django-redis cujo Redis guarda os rankings (veja
+# tabelionato/quiz/leaderboards.py)
+LEADERBOARD_CACHE = env("LEADERBOARD_CACHE", default="default")
+# Orçamento de consultas por view (veja tabelionato/utils/query_budget.py)
+QUERY_BUDGETS = {
+    "quiz:quiz_take": 25,
+    "quiz:quiz_list": 5,
+    "quiz:quiz_detail": 8,
+    "quiz:category_index": 5,
+    "quiz:quiz_category_list_matching": 5,
+    "quiz:quiz_search": 5,
+    "quiz:leaderboard": 4,
+    "quiz:category_leaderboard": 4,
+    "quiz:quiz_leaderboard": 4,
+    "quiz:quiz_marking_export": 6,
+    "admin:quiz_quiz_questions": 5,
+}
+QUERY_BUDGET_DUPLICATES = 5
+QUERY_BUDGET_RAISE = env.bool("QUERY_BUDGET_RAISE", default=False)
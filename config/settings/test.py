@@ -37,5 +37,10 @@ TEMPLATES[-1]["OPTIONS"]["loaders"] = [  # type: ignore[index] # noqa F405
 # https://docs.djangoproject.com/en/dev/ref/settings/#email-backend
 EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
 
+# QUERY BUDGET
+# ------------------------------------------------------------------------------
+# Views que estouram o orçamento de consultas falham nos testes
+QUERY_BUDGET_RAISE = True
+
 # Your stuff...
 # ------------------------------------------------------------------------------
@@ -1,6 +1,7 @@
 import pytest
 
 from tabelionato.users.models import User
+from tabelionato.utils.query_budget import assert_query_budget
 from tabelionato.users.tests.factories import UserFactory
 
 
@@ -12,3 +13,12 @@ def media_storage(settings, tmpdir):
 @pytest.fixture
 def user() -> User:
     return UserFactory()
+
+
+@pytest.fixture
+def query_budget():
+    """
+    ``with query_budget(10): ...`` falha se o bloco executar mais de 10
+    consultas ou repetir uma mesma consulta (N+1).
+    """
+    return assert_query_budget
@@ -1,14 +1,26 @@
-from django.contrib import admin
+import io
+
+from django.contrib import admin, messages
 from django import forms
-from django.contrib.admin.widgets import FilteredSelectMultiple
+from django.core.exceptions import PermissionDenied
+from django.http import JsonResponse
+from django.template.response import TemplateResponse
+from django.urls import path, reverse_lazy
 from django.utils.translation import gettext_lazy as _
 
+from .forms import QuestionImportForm
+from .importer import import_questions
+from .search import search_questions, search_quizzes
+from .widgets import QuestionPickerWidget, picker_label
+
 
 from .models import (
     Quiz,
     Category,
     Question,
     Progress,
+    QuestionStats,
+    QuizStats,
     MultiChoiceQuestion,
     TrueFalseQuestion,
     Answer,
@@ -25,23 +37,32 @@ class QuizAdminForm(forms.ModelForm):
         exclude = []
 
     questions = forms.ModelMultipleChoiceField(
-        queryset=Question.objects.all().select_subclasses(),
+        queryset=Question.objects.all(),
         required=False,
         label=_("Questões"),
-        widget=FilteredSelectMultiple(verbose_name=_("Questões"), is_stacked=False),
+        widget=QuestionPickerWidget(url=reverse_lazy("admin:quiz_quiz_questions")),
     )
 
     def __init__(self, *args, **kwargs):
         super(QuizAdminForm, self).__init__(*args, **kwargs)
         if self.instance.pk:
-            self.fields[
-                "questions"
-            ].initial = self.instance.question_set.all().select_subclasses()
+            self.fields["questions"].initial = list(
+                self.instance.question_set.values_list("id", flat=True)
+            )
 
     def save(self, commit=True):
         quiz = super(QuizAdminForm, self).save(commit=False)
         quiz.save()
-        quiz.question_set.set(self.cleaned_data["questions"])
+
+        # Grava só a diferença, sem reescrever todos os vínculos
+        chosen = set(self.cleaned_data["questions"].values_list("id", flat=True))
+        current = set(quiz.question_set.values_list("id", flat=True))
+        removed, added = current - chosen, chosen - current
+        if removed:
+            quiz.question_set.remove(*removed)
+        if added:
+            quiz.question_set.add(*added)
+
         self.save_m2m()
         return quiz
 
@@ -55,16 +76,138 @@ class QuizAdmin(admin.ModelAdmin):
         "draft",
     )
     search_fields = (
+        "title",
         "description",
-        "category",
+        "category__category",
     )
 
+    # Questões por página do seletor de questões
+    picker_page_size = 20
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        return search_quizzes(queryset, search_term), False
+
+    def get_urls(self):
+        urls = [
+            path(
+                "questions/",
+                self.admin_site.admin_view(self.question_picker_view),
+                name="quiz_quiz_questions",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def question_picker_view(self, request):
+        """
+        Endpoint do seletor de questões, no formato do select2: busca
+        textual (veja search.py), filtros por categoria e dificuldade e
+        páginas sem COUNT(*).
+        """
+        if not (
+            self.has_change_permission(request) or self.has_add_permission(request)
+        ):
+            raise PermissionDenied
+
+        queryset = Question.objects.select_related("category").order_by("id")
+        for param, lookup in (
+            ("category", "category_id"),
+            ("difficulty", "difficulty"),
+        ):
+            value = request.GET.get(param, "")
+            if value.isdigit():
+                queryset = queryset.filter(**{lookup: int(value)})
+        queryset = search_questions(queryset, request.GET.get("q", ""))
+
+        page = request.GET.get("page", "")
+        page = int(page) if page.isdigit() and int(page) > 0 else 1
+        start = (page - 1) * self.picker_page_size
+        questions = list(queryset[start : start + self.picker_page_size + 1])
+
+        return JsonResponse(
+            {
+                "results": [
+                    {"id": question.pk, "text": picker_label(question)}
+                    for question in questions[: self.picker_page_size]
+                ],
+                "pagination": {"more": len(questions) > self.picker_page_size},
+            }
+        )
+
 
 class CategoryAdmin(admin.ModelAdmin):
     search_fields = ("category",)
 
 
-class MultiChoiceQuestionAdmin(admin.ModelAdmin):
+class QuestionSearchMixin:
+    """
+    Busca textual das questões (veja search.py)
+    """
+
+    search_fields = (
+        "content",
+        "explanation",
+        "category__category",
+    )
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        return search_questions(queryset, search_term), False
+
+
+class QuestionImportMixin:
+    """
+    Adiciona à lista de questões a importação de um banco de questões
+    """
+
+    change_list_template = "admin/quiz/question_change_list.html"
+
+    def get_urls(self):
+        urls = [
+            path(
+                "import/",
+                self.admin_site.admin_view(self.import_view),
+                name="%s_%s_import"
+                % (self.model._meta.app_label, self.model._meta.model_name),
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+
+        result = None
+        form = QuestionImportForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            stream = io.TextIOWrapper(
+                form.cleaned_data["file"].file, encoding="utf-8-sig", newline=""
+            )
+            result = import_questions(
+                stream, format=form.format, dry_run=form.cleaned_data["dry_run"]
+            )
+            if result.errors:
+                messages.warning(
+                    request, _("%s registros com erro.") % len(result.errors)
+                )
+            elif not result.dry_run:
+                messages.success(request, _("%s questões importadas.") % result.created)
+
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            title=_("Importar questões"),
+            form=form,
+            result=result,
+        )
+        return TemplateResponse(request, "admin/quiz/question_import.html", context)
+
+
+class MultiChoiceQuestionAdmin(
+    QuestionSearchMixin, QuestionImportMixin, admin.ModelAdmin
+):
     list_display = (
         "content",
         "category",
@@ -77,17 +220,14 @@ class MultiChoiceQuestionAdmin(admin.ModelAdmin):
         "quiz",
     )
 
-    search_fields = (
-        "content",
-        "category",
-        "explanation",
-    )
-    filter_horizontal = ("quiz",)
+    autocomplete_fields = ("quiz",)
 
     inlines = [AnswerInline]
 
 
-class TrueFalseQuestionAdmin(admin.ModelAdmin):
+class TrueFalseQuestionAdmin(
+    QuestionSearchMixin, QuestionImportMixin, admin.ModelAdmin
+):
     list_display = (
         "content",
         "category",
@@ -101,20 +241,44 @@ class TrueFalseQuestionAdmin(admin.ModelAdmin):
         "quiz",
     )
 
-    search_fields = (
-        "content",
-        "category",
-        "explanation",
-    )
-    filter_horizontal = ("quiz",)
+    autocomplete_fields = ("quiz",)
 
 
 class ProgressAdmin(admin.ModelAdmin):
     # TODO
-    search_fields = (
-        "user",
-        "score",
+    search_fields = ("user__username",)
+
+
+class QuizStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        "quiz",
+        "attempts",
+        "completed",
+        "passed",
+        "pass_rate",
+        "mean_score",
+        "score_stddev",
     )
+    list_select_related = ("quiz",)
+    search_fields = ("quiz__title",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+class QuestionStatsAdmin(admin.ModelAdmin):
+    list_display = ("question", "seen", "correct", "percent_correct")
+    list_select_related = ("question",)
+    search_fields = ("question__content",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 admin.site.register(Quiz, QuizAdmin)
@@ -122,3 +286,5 @@ admin.site.register(Category, CategoryAdmin)
 admin.site.register(MultiChoiceQuestion, MultiChoiceQuestionAdmin)
 admin.site.register(TrueFalseQuestion, TrueFalseQuestionAdmin)
 admin.site.register(Progress, ProgressAdmin)
+admin.site.register(QuizStats, QuizStatsAdmin)
+admin.site.register(QuestionStats, QuestionStatsAdmin)
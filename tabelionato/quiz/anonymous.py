@@ -0,0 +1,292 @@
+"""
+Tentativas de usuários anônimos, sem gravar nada no banco.
+
+O estado da tentativa (a ordem das questões, as respostas, a correção de
+cada uma e a pontuação) fica num cookie assinado e comprimido com
+``django.core.signing``, um por questionário, e as respostas são
+corrigidas pelo gabarito do <QuizSnapshot> em cache. Assim o tráfego
+anônimo não cria <Attempt> nem atualiza estatísticas ou progresso.
+
+O cookie vale por ``QUIZ_ANON_ATTEMPT_AGE`` segundos. Se o estado passar de
+``QUIZ_ANON_COOKIE_MAX_SIZE`` bytes (questionários muito longos), ele é
+guardado no cache e o cookie leva só a chave, também assinada. Um cookie
+adulterado, vencido ou com questões que saíram do questionário é ignorado
+e uma nova tentativa começa.
+
+<AnonymousAttempt> expõe a mesma interface de <Attempt> usada por
+<QuizTake> e pelos templates.
+"""
+import secrets
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+
+from .models import percent_correct
+from .selection import build_pool, select_questions
+
+SALT = "tabelionato.quiz.anonymous"
+
+
+def _max_age():
+    return getattr(settings, "QUIZ_ANON_ATTEMPT_AGE", 60 * 60 * 24 * 7)
+
+
+def _max_size():
+    return getattr(settings, "QUIZ_ANON_COOKIE_MAX_SIZE", 3072)
+
+
+def cookie_name(quiz_id):
+    return "quiz_anon_%s" % quiz_id
+
+
+def _salt(quiz_id):
+    # Um cookie de um questionário não vale para outro
+    return "%s:%s" % (SALT, quiz_id)
+
+
+def _cache_key(token):
+    return "quiz:anon:%s" % token
+
+
+def _valid_state(state, quiz):
+    try:
+        question_ids, answers, correct, score = (
+            state["q"],
+            state["a"],
+            state["c"],
+            state["s"],
+        )
+    except (KeyError, TypeError):
+        return False
+    return (
+        isinstance(question_ids, list)
+        and isinstance(answers, list)
+        and isinstance(correct, list)
+        and isinstance(score, int)
+        and len(question_ids) == len(answers) == len(correct) > 0
+        and all(isinstance(qid, int) for qid in question_ids)
+        and all(quiz.get_question(qid) is not None for qid in question_ids)
+    )
+
+
+class AnonymousAttempt:
+    """
+    Tentativa de um usuário anônimo, guardada no cookie pelo ``save``.
+    """
+
+    def __init__(self, quiz, question_ids, answers=None, correct=None, score=0):
+        self.quiz = quiz
+        self.quiz_id = quiz.id
+        self.question_ids = list(question_ids)
+        self.answers = answers or [None] * len(self.question_ids)
+        self.correct = correct or [None] * len(self.question_ids)
+        self.current_score = score
+        self.max_score = len(self.question_ids)
+        self.complete = False
+        self.token = None
+
+    @classmethod
+    def new(cls, quiz, seed=None):
+        question_ids = select_questions(
+            build_pool(quiz.get_questions()),
+            blueprint=quiz.blueprint,
+            max_questions=quiz.max_questions,
+            random_order=quiz.random_order is True,
+            seed=seed,
+        )
+        if len(question_ids) == 0:
+            raise ImproperlyConfigured(
+                "Question set of the quiz is empty. "
+                "Please configure questions properly"
+            )
+        return cls(quiz, question_ids)
+
+    @classmethod
+    def load(cls, request, quiz):
+        """
+        Tentativa guardada no cookie da requisição, ou None se não houver
+        uma válida.
+        """
+        value = request.COOKIES.get(cookie_name(quiz.id))
+        if not value:
+            return None
+        try:
+            state = signing.loads(value, salt=_salt(quiz.id), max_age=_max_age())
+        except signing.BadSignature:
+            return None
+
+        token = state.get("k") if isinstance(state, dict) else None
+        if token is not None:
+            state = cache.get(_cache_key(token))
+        if not _valid_state(state, quiz):
+            return None
+
+        attempt = cls(quiz, state["q"], state["a"], state["c"], state["s"])
+        attempt.token = token
+        return attempt
+
+    @classmethod
+    def from_request(cls, request, quiz):
+        return cls.load(request, quiz) or cls.new(quiz)
+
+    def dumps(self):
+        """
+        Valor do cookie: o estado assinado ou, se ele for grande demais, a
+        chave do estado no cache.
+        """
+        state = {
+            "q": self.question_ids,
+            "a": self.answers,
+            "c": self.correct,
+            "s": self.current_score,
+        }
+        salt = _salt(self.quiz_id)
+        value = signing.dumps(state, salt=salt, compress=True)
+        if len(value) <= _max_size():
+            if self.token is not None:
+                cache.delete(_cache_key(self.token))
+                self.token = None
+            return value
+
+        if self.token is None:
+            self.token = secrets.token_urlsafe(16)
+        cache.set(_cache_key(self.token), state, timeout=_max_age())
+        return signing.dumps({"k": self.token}, salt=salt)
+
+    def save(self, request, response):
+        """
+        Grava a tentativa no cookie da resposta, ou remove o cookie se ela
+        foi concluída.
+        """
+        name = cookie_name(self.quiz_id)
+        if self.complete:
+            if self.token is not None:
+                cache.delete(_cache_key(self.token))
+            if name in request.COOKIES:
+                response.delete_cookie(name, path=request.path)
+            return
+
+        response.set_cookie(
+            name,
+            self.dumps(),
+            max_age=_max_age(),
+            path=request.path,
+            secure=settings.SESSION_COOKIE_SECURE,
+            httponly=True,
+            samesite="Lax",
+        )
+
+    def _position(self, question_id):
+        return self.question_ids.index(question_id)
+
+    def get_first_question_id(self):
+        for question_id, answer in zip(self.question_ids, self.answers):
+            if answer is None:
+                return question_id
+        return None
+
+    def get_unanswered_question_ids(self):
+        return [
+            question_id
+            for question_id, answer in zip(self.question_ids, self.answers)
+            if answer is None
+        ]
+
+    def progress(self):
+        answered = sum(answer is not None for answer in self.answers)
+        return answered, self.max_score
+
+    def record_answer(self, question, guess, is_correct):
+        position = self._position(question.id)
+        if self.answers[position] is not None:
+            return False
+        self.answers[position] = str(guess)
+        self.correct[position] = is_correct is True
+        if is_correct is True:
+            self.current_score += 1
+        return True
+
+    def grade_answers(self, questions, guesses):
+        """
+        Corrige de uma vez as questões ainda sem resposta e conclui a
+        tentativa. Retorna {categoria: [pontos, possíveis]}, como
+        <Attempt.grade_answers>.
+        """
+        pending = set(self.get_unanswered_question_ids())
+        category_scores = {}
+
+        for question in questions:
+            if question.id not in pending:
+                continue
+
+            guess = guesses.get(question.id)
+            is_correct = guess is not None and question.check_answer(guess) is True
+            position = self._position(question.id)
+            # Sem resposta fica como "", para contar como respondida
+            self.answers[position] = "" if guess is None else str(guess)
+            self.correct[position] = is_correct
+            self.current_score += int(is_correct)
+
+            if question.category_id:
+                score = category_scores.setdefault(question.category_id, [0, 0])
+                score[0] += int(is_correct)
+                score[1] += 1
+
+        self.mark_quiz_complete()
+        return category_scores
+
+    def mark_quiz_complete(self):
+        self.complete = True
+
+    def delete(self):
+        # Nada a apagar: o cookie é removido ao concluir
+        pass
+
+    @property
+    def get_current_score(self):
+        return self.current_score
+
+    @property
+    def get_max_score(self):
+        return self.max_score
+
+    @property
+    def get_percent_correct(self):
+        return percent_correct(self.current_score, self.max_score)
+
+    @property
+    def get_incorrect_questions(self):
+        return [
+            question_id
+            for question_id, correct in zip(self.question_ids, self.correct)
+            if correct is False
+        ]
+
+    @property
+    def check_if_passed(self):
+        return self.get_percent_correct >= self.quiz.pass_mark
+
+    @property
+    def result_message(self):
+        if self.check_if_passed:
+            return self.quiz.success_text
+        return self.quiz.fail_text
+
+    def get_user_answers(self):
+        return {
+            question_id: answer or None
+            for question_id, answer in zip(self.question_ids, self.answers)
+            if answer is not None
+        }
+
+    def get_questions(self, with_answers=False, snapshot=None):
+        questions = (snapshot or self.quiz).get_questions(self.question_ids)
+        if with_answers:
+            answers = dict(zip(self.question_ids, self.answers))
+            questions = [
+                question.with_user_answer(answers[question.id] or None)
+                for question in questions
+            ]
+        return questions
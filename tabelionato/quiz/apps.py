@@ -1,5 +1,10 @@
 from django.apps import AppConfig
+from django.utils.translation import gettext_lazy as _
 
 
 class QuizConfig(AppConfig):
-    name = "quiz"
+    name = "tabelionato.quiz"
+    verbose_name = _("Quiz")
+
+    def ready(self):
+        import tabelionato.quiz.signals  # noqa F401
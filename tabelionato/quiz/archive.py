@@ -0,0 +1,187 @@
+"""
+Arquivamento das tentativas concluídas antigas e limpeza das abandonadas.
+
+As tentativas concluídas há mais de ``QUIZ_ARCHIVE_AFTER_DAYS`` dias saem
+de <Attempt> e <AttemptResponse> e vão para <ArchivedAttempt>: uma linha
+por tentativa, com as respostas em JSON comprimido. Assim as tabelas
+vivas, lidas e escritas a cada questão respondida, ficam do tamanho do
+uso recente, e a tabela de arquivo só recebe inserções: não acumula
+tuplas mortas para o VACUUM e cresce sem tocar nas linhas antigas.
+
+As listas de tentativas concluídas (``Attempt.objects.with_archive()``)
+leem as duas tabelas, e a reconstrução das estatísticas e dos rankings
+(veja stats.py) inclui o arquivo. A recalibração das dificuldades (veja
+calibration.py) só lê as tentativas vivas: ela deve rodar antes do
+arquivamento, e uma recalibração completa não vê o que já foi arquivado.
+
+As tentativas em andamento sem nenhuma resposta há mais de
+``QUIZ_STALE_ATTEMPT_DAYS`` dias são apagadas por
+``purge_stale_attempts``. A limpeza roda em lotes pequenos, cada um na sua
+transação e com uma pausa entre eles, e pula as linhas travadas: não
+bloqueia quem está respondendo e dá tempo ao autovacuum de reaproveitar o
+espaço das linhas apagadas.
+"""
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import ArchivedAttempt, Attempt, AttemptResponse, QuizStats
+
+CHUNK_SIZE = 1000
+
+PURGE_CHUNK_SIZE = 500
+
+PURGE_PAUSE = 0.5
+
+
+def _responses(attempt_ids):
+    rows = (
+        AttemptResponse.objects.filter(attempt_id__in=attempt_ids)
+        .order_by("attempt_id", "position")
+        .values_list(
+            "attempt_id",
+            "position",
+            "question_id",
+            "answer",
+            "is_correct",
+            "answered_at",
+        )
+    )
+    responses = {}
+    for attempt_id, *row in rows:
+        responses.setdefault(attempt_id, []).append(row)
+    return responses
+
+
+def _archive_chunk(cutoff, chunk_size):
+    """
+    Arquiva um lote de até ``chunk_size`` tentativas concluídas antes de
+    ``cutoff`` e retorna quantas foram arquivadas.
+    """
+    attempts = list(
+        Attempt.objects.select_for_update(skip_locked=True)
+        .filter(complete=True, end__lt=cutoff)
+        .order_by("id")
+        .values_list(
+            "id", "user_id", "quiz_id", "max_score", "current_score", "start", "end"
+        )[:chunk_size]
+    )
+    if not attempts:
+        return 0
+
+    attempt_ids = [attempt[0] for attempt in attempts]
+    responses = _responses(attempt_ids)
+    ArchivedAttempt.objects.bulk_create(
+        ArchivedAttempt(
+            id=attempt_id,
+            user_id=user_id,
+            quiz_id=quiz_id,
+            max_score=max_score,
+            current_score=current_score,
+            start=start,
+            end=end,
+            responses_data=ArchivedAttempt.pack_responses(
+                responses.get(attempt_id, [])
+            ),
+        )
+        for attempt_id, user_id, quiz_id, max_score, current_score, start, end in attempts
+    )
+    _delete(attempt_ids)
+    return len(attempt_ids)
+
+
+def _delete(attempt_ids):
+    # As respostas primeiro, num único DELETE, para que o da tentativa não
+    # precise buscá-las
+    AttemptResponse.objects.filter(attempt_id__in=attempt_ids).delete()
+    Attempt.objects.filter(id__in=attempt_ids).delete()
+
+
+def archive_attempts(older_than=None, chunk_size=CHUNK_SIZE, now=None):
+    """
+    Move para o arquivo as tentativas concluídas há mais de ``older_than``
+    (um timedelta; por padrão, ``QUIZ_ARCHIVE_AFTER_DAYS`` dias), em lotes
+    de ``chunk_size``, cada um na sua transação. Retorna quantas foram
+    arquivadas.
+    """
+    if older_than is None:
+        older_than = timedelta(days=getattr(settings, "QUIZ_ARCHIVE_AFTER_DAYS", 180))
+    cutoff = (now or timezone.now()) - older_than
+
+    archived = 0
+    while True:
+        with transaction.atomic():
+            count = _archive_chunk(cutoff, chunk_size)
+        if not count:
+            return archived
+        archived += count
+
+
+def stale_attempts(cutoff):
+    """
+    Tentativas em andamento abandonadas: começadas antes de ``cutoff`` e
+    sem resposta desde então.
+    """
+    recent_answer = AttemptResponse.objects.filter(
+        attempt_id=OuterRef("pk"), answered_at__gte=cutoff
+    )
+    return Attempt.objects.filter(complete=False, start__lt=cutoff).filter(
+        ~Exists(recent_answer)
+    )
+
+
+def _purge_chunk(cutoff, chunk_size):
+    attempts = list(
+        stale_attempts(cutoff)
+        .select_for_update(skip_locked=True)
+        .order_by("id")
+        .values_list("id", "quiz_id")[:chunk_size]
+    )
+    if attempts:
+        _delete([attempt_id for attempt_id, _ in attempts])
+        _discount(Counter(quiz_id for _, quiz_id in attempts))
+    return len(attempts)
+
+
+def _discount(purged):
+    """
+    Desconta as tentativas apagadas ({questionário: quantas}) de
+    <QuizStats>, como na reconstrução (veja stats.py), sem passar de zero:
+    uma tentativa pode ter começado antes das estatísticas.
+    """
+    groups = {}
+    for quiz_id, count in purged.items():
+        groups.setdefault(count, []).append(quiz_id)
+    for count, quiz_ids in groups.items():
+        QuizStats.objects.filter(pk__in=quiz_ids).update(
+            attempts=Greatest(F("attempts") - count, 0)
+        )
+
+
+def purge_stale_attempts(
+    older_than=None, chunk_size=PURGE_CHUNK_SIZE, pause=PURGE_PAUSE, now=None
+):
+    """
+    Apaga as tentativas abandonadas (veja ``stale_attempts``) sem resposta
+    há mais de ``older_than`` (por padrão, ``QUIZ_STALE_ATTEMPT_DAYS``
+    dias), em lotes de ``chunk_size`` com ``pause`` segundos entre eles.
+    Retorna quantas foram apagadas.
+    """
+    if older_than is None:
+        older_than = timedelta(days=getattr(settings, "QUIZ_STALE_ATTEMPT_DAYS", 30))
+    cutoff = (now or timezone.now()) - older_than
+
+    purged = 0
+    while True:
+        with transaction.atomic():
+            count = _purge_chunk(cutoff, chunk_size)
+        purged += count
+        if count < chunk_size:
+            return purged
+        time.sleep(pause)
@@ -0,0 +1,235 @@
+"""
+Recalibração da dificuldade das questões.
+
+Lê as respostas das tentativas concluídas em lotes, em ordem de término,
+e acumula para cada questão as estatísticas suficientes em
+<QuestionCalibration>. O ponto onde a última execução parou fica em
+<CalibrationState>, então cada execução processa apenas as tentativas novas.
+
+A dificuldade é estimada de duas formas:
+
+* valor p clássico: proporção de acertos;
+* modelo de Rasch (1PL) pela aproximação normal PROX: a habilidade de cada
+  usuário é estimada a partir do seu acerto e das dificuldades atuais das
+  questões que respondeu, e a dificuldade de cada questão a partir do seu
+  erro e da média e variância das habilidades de quem a respondeu.
+
+A dificuldade em logits é centrada em zero e convertida para a escala de
+1 a 5 de <Question.difficulty>. Todo o cálculo é vetorizado com NumPy e a
+memória usada é limitada ao tamanho do lote mais uma linha por questão.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    Attempt,
+    AttemptResponse,
+    CalibrationState,
+    Question,
+    QuestionCalibration,
+)
+from .snapshots import invalidate_quiz_snapshots
+
+STATE_NAME = "difficulty"
+
+CHUNK_SIZE = 2000
+
+MIN_RESPONSES = 30
+
+# Tentativas concluídas há menos tempo que isso ficam para a próxima
+# execução, para não perder transações ainda abertas
+SAFETY_LAG = timedelta(minutes=5)
+
+# Limites, em logits, entre as faixas de dificuldade 1 a 5
+BAND_EDGES = np.array([-1.5, -0.5, 0.5, 1.5])
+
+# 1.7², fator de escala da aproximação PROX
+PROX_SCALE = 2.89
+
+STAT_FIELDS = ["seen", "correct", "ability_sum", "ability_sq_sum"]
+
+
+def prox(mean, variance, successes, trials):
+    """
+    mean + sqrt(1 + variance / 2.89) * ln(successes / (trials - successes)).
+    Os acertos são limitados a [0.5, trials - 0.5] para que pontuações
+    extremas (tudo certo ou tudo errado) tenham estimativa finita.
+    """
+    trials = np.asarray(trials, dtype=float)
+    successes = np.clip(successes, 0.5, np.maximum(trials - 0.5, 0.5))
+    spread = np.sqrt(1 + np.maximum(variance, 0) / PROX_SCALE)
+    return mean + spread * np.log(successes / np.maximum(trials - successes, 0.5))
+
+
+def to_difficulty_scale(logits):
+    return np.digitize(logits, BAND_EDGES) + 1
+
+
+def _pending_attempts(state, cutoff, chunk_size):
+    attempts = Attempt.objects.filter(complete=True, end__lt=cutoff)
+    if state.last_end is not None:
+        attempts = attempts.filter(
+            Q(end__gt=state.last_end)
+            | Q(end=state.last_end, id__gt=state.last_attempt_id)
+        )
+    return list(attempts.order_by("end", "id").values_list("id", "end")[:chunk_size])
+
+
+def _load_responses(attempt_ids):
+    rows = AttemptResponse.objects.filter(
+        attempt_id__in=attempt_ids, is_correct__isnull=False
+    ).values_list("attempt_id", "question_id", "is_correct")
+    return np.array(list(rows), dtype=np.int64).reshape(-1, 3)
+
+
+def _merge_chunk(responses):
+    """
+    Acumula as respostas de um lote (matriz attempt_id, question_id,
+    is_correct) nas <QuestionCalibration> das questões envolvidas.
+    """
+    attempt_ids, question_ids, correct = responses.T
+    _, person = np.unique(attempt_ids, return_inverse=True)
+    items, item = np.unique(question_ids, return_inverse=True)
+
+    calibrations = QuestionCalibration.objects.in_bulk(items.tolist())
+    new = [
+        QuestionCalibration(question_id=qid)
+        for qid in items.tolist()
+        if qid not in calibrations
+    ]
+    for calibration in new:
+        calibrations[calibration.question_id] = calibration
+
+    difficulty = np.array(
+        [calibrations[qid].rasch_difficulty or 0.0 for qid in items.tolist()]
+    )
+
+    # Habilidade de cada usuário, dadas as dificuldades atuais
+    answered = np.bincount(person)
+    right = np.bincount(person, weights=correct)
+    taken = difficulty[item]
+    mean = np.bincount(person, weights=taken) / answered
+    variance = np.bincount(person, weights=taken**2) / answered - mean**2
+    ability = prox(mean, variance, right, answered)[person]
+
+    size = len(items)
+    seen = np.bincount(item, minlength=size)
+    hits = np.bincount(item, weights=correct, minlength=size)
+    ability_sum = np.bincount(item, weights=ability, minlength=size)
+    ability_sq_sum = np.bincount(item, weights=ability**2, minlength=size)
+
+    for i, qid in enumerate(items.tolist()):
+        calibration = calibrations[qid]
+        calibration.seen += int(seen[i])
+        calibration.correct += int(hits[i])
+        calibration.ability_sum += float(ability_sum[i])
+        calibration.ability_sq_sum += float(ability_sq_sum[i])
+
+    new_ids = {calibration.question_id for calibration in new}
+    existing = [c for c in calibrations.values() if c.question_id not in new_ids]
+    QuestionCalibration.objects.bulk_create(new, batch_size=CHUNK_SIZE)
+    QuestionCalibration.objects.bulk_update(
+        existing, STAT_FIELDS, batch_size=CHUNK_SIZE
+    )
+
+
+def estimate(min_responses=MIN_RESPONSES):
+    """
+    Estima valor p e dificuldade de Rasch de todas as questões com
+    estatísticas e grava em <Question.difficulty> a faixa das que têm ao
+    menos ``min_responses`` respostas. Retorna quantas questões mudaram de
+    dificuldade.
+    """
+    calibrations = list(QuestionCalibration.objects.order_by("question_id"))
+    if not calibrations:
+        return 0
+
+    seen = np.array([c.seen for c in calibrations], dtype=float)
+    correct = np.array([c.correct for c in calibrations], dtype=float)
+    ability_sum = np.array([c.ability_sum for c in calibrations])
+    ability_sq_sum = np.array([c.ability_sq_sum for c in calibrations])
+
+    answered = np.maximum(seen, 1)
+    mean = ability_sum / answered
+    variance = ability_sq_sum / answered - mean**2
+    logits = prox(mean, variance, seen - correct, seen)
+
+    reliable = seen >= min_responses
+    if reliable.any():
+        logits = logits - logits[reliable].mean()
+    bands = to_difficulty_scale(logits)
+
+    for i, calibration in enumerate(calibrations):
+        calibration.p_value = float(correct[i] / seen[i]) if seen[i] else None
+        calibration.rasch_difficulty = float(logits[i])
+    QuestionCalibration.objects.bulk_update(
+        calibrations, ["p_value", "rasch_difficulty"], batch_size=CHUNK_SIZE
+    )
+
+    target = {
+        c.question_id: int(bands[i]) for i, c in enumerate(calibrations) if reliable[i]
+    }
+    changed = [
+        Question(id=qid, difficulty=target[qid])
+        for qid, difficulty in Question.objects.filter(id__in=target).values_list(
+            "id", "difficulty"
+        )
+        if difficulty != target[qid]
+    ]
+    Question.objects.bulk_update(changed, ["difficulty"], batch_size=CHUNK_SIZE)
+
+    # bulk_update não dispara sinais: os snapshots guardam a dificuldade
+    if changed:
+        quiz_ids = list(
+            Question.quiz.through.objects.filter(
+                question_id__in=[q.id for q in changed]
+            )
+            .values_list("quiz_id", flat=True)
+            .distinct()
+        )
+        transaction.on_commit(lambda: invalidate_quiz_snapshots(quiz_ids))
+
+    return len(changed)
+
+
+def recalibrate(
+    chunk_size=CHUNK_SIZE, min_responses=MIN_RESPONSES, full=False, now=None
+):
+    """
+    Processa as tentativas concluídas desde a última execução e reestima
+    as dificuldades. Com ``full``, descarta as estatísticas e recomeça.
+    Retorna um dict com o que foi feito.
+    """
+    cutoff = (now or timezone.now()) - SAFETY_LAG
+
+    with transaction.atomic():
+        state, _ = CalibrationState.objects.get_or_create(name=STATE_NAME)
+        if full:
+            QuestionCalibration.objects.all().delete()
+            state.last_end, state.last_attempt_id = None, 0
+            state.save()
+
+    attempts = responses = 0
+    while True:
+        pending = _pending_attempts(state, cutoff, chunk_size)
+        if not pending:
+            break
+
+        with transaction.atomic():
+            rows = _load_responses([attempt_id for attempt_id, _ in pending])
+            if len(rows):
+                _merge_chunk(rows)
+            state.last_attempt_id, state.last_end = pending[-1]
+            state.save(update_fields=["last_attempt_id", "last_end"])
+
+        attempts += len(pending)
+        responses += len(rows)
+
+    with transaction.atomic():
+        updated = estimate(min_responses)
+
+    return {"attempts": attempts, "responses": responses, "updated": updated}
@@ -0,0 +1,211 @@
+"""
+Exportação das tentativas concluídas em CSV ou XLSX.
+
+As linhas são lidas do banco em lotes com ``iterator`` e escritas à medida
+que chegam, de modo que a memória usada não depende do número de tentativas
+e a resposta começa a ser enviada imediatamente. A pontuação, o máximo e o
+percentual vêm direto das colunas de <Attempt>.
+
+Os textos vêm dos usuários: no CSV, as células que começam como uma
+fórmula ganham um apóstrofo na frente, para que a planilha não a execute;
+no XLSX, os caracteres de controle que o XML não aceita são removidos.
+
+O XLSX é montado sem dependências: um zip gerado em fluxo com a planilha em
+SpreadsheetML, usando strings em linha no lugar da tabela de strings
+compartilhadas.
+"""
+import csv
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from .models import percent_correct
+
+CHUNK_SIZE = 2000
+
+CSV = "csv"
+XLSX = "xlsx"
+
+CONTENT_TYPES = {
+    CSV: "text/csv; charset=utf-8",
+    XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+# Fora do XML 1.0
+XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+
+
+def header():
+    return [
+        _("Tentativa"),
+        _("Usuário"),
+        _("Questionário"),
+        _("Início"),
+        _("Fim"),
+        _("Pontuação"),
+        _("Pontuação Máxima"),
+        _("Percentual"),
+    ]
+
+
+def _date(value):
+    if value is None:
+        return ""
+    return timezone.localtime(value).strftime(DATE_FORMAT)
+
+
+def attempt_rows(queryset, chunk_size=CHUNK_SIZE):
+    rows = queryset.order_by("id").values_list(
+        "id",
+        "user__username",
+        "quiz__title",
+        "start",
+        "end",
+        "current_score",
+        "max_score",
+    )
+    for attempt_id, username, title, start, end, score, max_score in rows.iterator(
+        chunk_size
+    ):
+        yield (
+            attempt_id,
+            username,
+            title,
+            _date(start),
+            _date(end),
+            score,
+            max_score,
+            percent_correct(score, max_score),
+        )
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    # BOM para o Excel reconhecer o UTF-8
+    yield "\ufeff" + writer.writerow(header())
+    for row in rows:
+        yield writer.writerow([_csv_cell(value) for value in row])
+
+
+class _StreamBuffer:
+    """
+    Destino do zip: guarda o que foi escrito até ser recolhido por ``pop``.
+    Sem ``seek`` e ``tell``, o zipfile grava em modo de fluxo.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+XLSX_PARTS = [
+    (
+        "[Content_Types].xml",
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" '
+        'ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/'
+        'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        "</Types>",
+    ),
+    (
+        "_rels/.rels",
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+        'relationships"><Relationship Id="rId1" Type="http://schemas.'
+        "openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+        '" Target="xl/workbook.xml"/></Relationships>',
+    ),
+    (
+        "xl/workbook.xml",
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/'
+        'main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/'
+        'relationships"><sheets><sheet name="Tentativas" sheetId="1" '
+        'r:id="rId1"/></sheets></workbook>',
+    ),
+    (
+        "xl/_rels/workbook.xml.rels",
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+        'relationships"><Relationship Id="rId1" Type="http://schemas.'
+        "openxmlformats.org/officeDocument/2006/relationships/worksheet"
+        '" Target="worksheets/sheet1.xml"/></Relationships>',
+    ),
+]
+
+SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    "<sheetData>"
+)
+
+SHEET_TAIL = "</sheetData></worksheet>"
+
+
+def _xlsx_cell(value):
+    if isinstance(value, int):
+        return "<c><v>%d</v></c>" % value
+    text = XML_INVALID.sub("", str(value))
+    return '<c t="inlineStr"><is><t>%s</t></is></c>' % escape(text)
+
+
+def _xlsx_row(row):
+    return "<row>%s</row>" % "".join(_xlsx_cell(value) for value in row)
+
+
+def stream_xlsx(rows):
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS:
+            archive.writestr(name, content)
+
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write((SHEET_HEAD + _xlsx_row(header())).encode("utf-8"))
+            yield buffer.pop()
+
+            for row in rows:
+                sheet.write(_xlsx_row(row).encode("utf-8"))
+                data = buffer.pop()
+                if data:
+                    yield data
+
+            sheet.write(SHEET_TAIL.encode("utf-8"))
+
+    yield buffer.pop()
+
+
+STREAMS = {CSV: stream_csv, XLSX: stream_xlsx}
@@ -1,5 +1,8 @@
 from django import forms
 from django.forms.widgets import RadioSelect
+from django.utils.translation import gettext_lazy as _
+
+from .importer import detect_format
 
 
 class QuestionForm(forms.Form):
@@ -9,3 +12,56 @@ class QuestionForm(forms.Form):
         self.fields["answers"] = forms.ChoiceField(
             choices=choice_list, widget=RadioSelect
         )
+
+
+class QuizForm(forms.Form):
+    """
+    Formulário do modo de página única: um campo para cada questão
+    """
+
+    def __init__(self, questions, *args, **kwargs):
+        super(QuizForm, self).__init__(*args, **kwargs)
+        self.questions = questions
+        for question in questions:
+            self.fields[self.field_name(question)] = forms.ChoiceField(
+                label=question.content,
+                choices=question.get_answer_list(),
+                widget=RadioSelect,
+            )
+
+    @staticmethod
+    def field_name(question):
+        return "question_%s" % question.id
+
+    def question_fields(self):
+        for question in self.questions:
+            yield question, self[self.field_name(question)]
+
+    def get_guesses(self):
+        return {
+            question.id: self.cleaned_data[self.field_name(question)]
+            for question in self.questions
+        }
+
+
+class QuestionImportForm(forms.Form):
+    """
+    Envio de um banco de questões pelo admin (veja importer.py)
+    """
+
+    file = forms.FileField(
+        label=_("Arquivo"), help_text=_("Arquivo JSON Lines (.jsonl) ou CSV (.csv).")
+    )
+    dry_run = forms.BooleanField(
+        label=_("Apenas validar"),
+        required=False,
+        help_text=_("Valida o arquivo sem gravar nenhuma questão."),
+    )
+
+    def clean_file(self):
+        file = self.cleaned_data["file"]
+        try:
+            self.format = detect_format(file.name)
+        except ValueError as error:
+            raise forms.ValidationError(str(error))
+        return file
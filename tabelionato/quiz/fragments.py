@@ -0,0 +1,92 @@
+"""
+Fragmentos em cache da página de resultados.
+
+O enunciado, a tabela de alternativas e a explicação de cada questão são
+iguais para todos os usuários que fazem a mesma versão do questionário.
+Eles são renderizados uma vez e guardados no cache com a versão do
+<QuizSnapshot> e o idioma na chave, de modo que qualquer alteração no
+questionário ou nas questões gera fragmentos novos e os antigos expiram
+sozinhos. Todos os fragmentos da página são lidos com um único
+``get_many``.
+
+Só o que depende do usuário (a resposta dada e a marcação de erro) é
+renderizado a cada requisição, em ``results.html``.
+"""
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import translation
+from django.utils.safestring import mark_safe
+
+TEMPLATES = {
+    "header": "quiz/fragments/question_header.html",
+    "answers": "quiz/fragments/question_answers.html",
+    "explanation": "quiz/fragments/question_explanation.html",
+}
+
+
+@dataclass(frozen=True)
+class QuestionFragments:
+    header: str
+    answers: str
+    explanation: str
+
+
+def _timeout():
+    return getattr(settings, "QUIZ_FRAGMENT_TIMEOUT", 60 * 60 * 24)
+
+
+def _fragment_key(quiz, question_id):
+    return "quiz:fragment:%s:%s:%s:%s" % (
+        quiz.id,
+        quiz.version,
+        question_id,
+        translation.get_language(),
+    )
+
+
+def render_question_fragments(question):
+    context = {"question": question}
+    return QuestionFragments(
+        **{
+            name: render_to_string(template, context)
+            for name, template in TEMPLATES.items()
+        }
+    )
+
+
+def get_question_fragments(quiz, questions):
+    """
+    Retorna uma lista de (questão, <QuestionFragments>) na ordem de
+    ``questions``. Sem versão (``quiz`` não é um snapshot), os fragmentos
+    são renderizados sem cache.
+    """
+    version = getattr(quiz, "version", None)
+    if version is None:
+        return [(q, _safe(render_question_fragments(q))) for q in questions]
+
+    keys = {q.id: _fragment_key(quiz, q.id) for q in questions}
+    cached = cache.get_many(keys.values())
+
+    missing = {}
+    rows = []
+    for question in questions:
+        fragments = cached.get(keys[question.id])
+        if fragments is None:
+            fragments = render_question_fragments(question)
+            missing[keys[question.id]] = fragments
+        rows.append((question, _safe(fragments)))
+
+    if missing:
+        cache.set_many(missing, timeout=_timeout())
+    return rows
+
+
+def _safe(fragments):
+    return QuestionFragments(
+        header=mark_safe(fragments.header),
+        answers=mark_safe(fragments.answers),
+        explanation=mark_safe(fragments.explanation),
+    )
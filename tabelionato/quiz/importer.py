@@ -0,0 +1,366 @@
+"""
+Importação de bancos de questões.
+
+Lê arquivos JSON Lines (um objeto por linha) ou CSV em fluxo, valida cada
+registro e grava as questões em lotes com ``bulk_create``: categorias,
+questões, alternativas e vínculos com os questionários. Apenas um lote fica
+em memória por vez.
+
+Formato JSON Lines::
+
+    {"type": "multichoice", "content": "Enunciado", "category": "Registro",
+     "difficulty": 2, "explanation": "...", "quizzes": ["registro-de-imoveis"],
+     "answers": [{"content": "Certa", "correct": true}, {"content": "Errada"}]}
+    {"type": "truefalse", "content": "Enunciado", "is_correct": true}
+
+No CSV as colunas têm os mesmos nomes. As alternativas ficam numa única
+coluna ``answers``, separadas por ``|``, com ``*`` antes das corretas
+(``*Certa|Errada``), e os questionários em ``quizzes``, também separados
+por ``|``.
+
+Cada questão é identificada pelo hash do enunciado (veja
+<Question.content_hash>): questões já cadastradas ou repetidas no arquivo
+são ignoradas, então o mesmo arquivo pode ser importado mais de uma vez.
+Registros inválidos são ignorados e informados no resultado; com
+``dry_run`` nada é gravado.
+"""
+import csv
+import json
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from django.db import connection, transaction
+
+from .models import (
+    Answer,
+    Category,
+    MultiChoiceQuestion,
+    Question,
+    Quiz,
+    TrueFalseQuestion,
+    normalize_category,
+)
+from .snapshots import invalidate_quiz_snapshots
+
+BATCH_SIZE = 1000
+
+JSONL = "jsonl"
+CSV = "csv"
+
+FORMATS = {".jsonl": JSONL, ".ndjson": JSONL, ".json": JSONL, ".csv": CSV}
+
+MULTI_CHOICE = "multichoice"
+TRUE_FALSE = "truefalse"
+
+TRUE_VALUES = {"1", "true", "t", "sim", "s", "verdadeiro", "v"}
+FALSE_VALUES = {"0", "false", "f", "nao", "não", "n", "falso"}
+
+SEPARATOR = "|"
+CORRECT_MARK = "*"
+
+
+@dataclass
+class QuestionRecord:
+    line: int
+    kind: str
+    content: str
+    content_hash: str
+    category: Optional[str] = None
+    difficulty: int = 1
+    explanation: str = ""
+    is_correct: bool = False
+    answers: List[Tuple[str, bool]] = field(default_factory=list)
+    quizzes: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ImportResult:
+    read: int = 0
+    created: int = 0
+    skipped: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+    dry_run: bool = False
+
+
+def detect_format(filename):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(
+            "Formato não suportado: %s. Use JSON Lines ou CSV." % (extension or "?")
+        )
+    return FORMATS[extension]
+
+
+def _read_jsonl(stream):
+    for line, text in enumerate(stream, 1):
+        if text.strip():
+            yield line, text
+
+
+def _read_csv(stream):
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError("Valor lógico inválido: %s" % value)
+
+
+def _split(value):
+    if _blank(value):
+        return []
+    if isinstance(value, list):
+        return value
+    return [item.strip() for item in str(value).split(SEPARATOR) if item.strip()]
+
+
+def _parse_answers(value):
+    answers = []
+    for answer in _split(value):
+        if isinstance(answer, dict):
+            content = str(answer.get("content") or "").strip()
+            correct = _to_bool(answer.get("correct", False))
+        else:
+            content = str(answer).strip()
+            correct = content.startswith(CORRECT_MARK)
+            content = content[len(CORRECT_MARK) :].strip() if correct else content
+
+        if not content:
+            raise ValueError("Alternativa sem texto.")
+        if len(content) > 1000:
+            raise ValueError("Alternativa com mais de 1000 caracteres.")
+        answers.append((content, correct))
+    return answers
+
+
+def parse_record(line, row):
+    """
+    Valida um registro (objeto JSON ou linha do CSV) e retorna o
+    <QuestionRecord> correspondente. Levanta ValueError com a mensagem do
+    problema encontrado.
+    """
+    if isinstance(row, str):
+        row = json.loads(row)
+    if not isinstance(row, dict):
+        raise ValueError("O registro deve ser um objeto.")
+
+    kind = str(row.get("type") or "").strip().lower()
+    if kind not in (MULTI_CHOICE, TRUE_FALSE):
+        raise ValueError("'type' deve ser '%s' ou '%s'." % (MULTI_CHOICE, TRUE_FALSE))
+
+    content = str(row.get("content") or "").strip()
+    if not content:
+        raise ValueError("Questão sem enunciado.")
+    if len(content) > 500:
+        raise ValueError("Enunciado com mais de 500 caracteres.")
+
+    explanation = str(row.get("explanation") or "").strip()
+    if len(explanation) > 500:
+        raise ValueError("Explicação com mais de 500 caracteres.")
+
+    category = None if _blank(row.get("category")) else str(row["category"])
+    if category is not None and len(normalize_category(category)) > 250:
+        raise ValueError("Categoria com mais de 250 caracteres.")
+
+    difficulty = row.get("difficulty")
+    try:
+        difficulty = 1 if _blank(difficulty) else int(difficulty)
+    except (TypeError, ValueError):
+        raise ValueError("'difficulty' deve ser um inteiro.")
+    if not 1 <= difficulty <= 5:
+        raise ValueError("'difficulty' deve ser entre 1 e 5.")
+
+    record = QuestionRecord(
+        line=line,
+        kind=kind,
+        content=content,
+        content_hash=Question.make_content_hash(content),
+        category=category,
+        difficulty=difficulty,
+        explanation=explanation,
+        quizzes=[str(url).strip() for url in _split(row.get("quizzes"))],
+    )
+
+    if kind == TRUE_FALSE:
+        if _blank(row.get("is_correct")):
+            raise ValueError("Questão de verdadeiro ou falso sem 'is_correct'.")
+        record.is_correct = _to_bool(row["is_correct"])
+    else:
+        record.answers = _parse_answers(row.get("answers"))
+        if len(record.answers) < 2:
+            raise ValueError("A questão deve ter ao menos duas alternativas.")
+        if not any(correct for _, correct in record.answers):
+            raise ValueError("A questão não tem alternativa correta.")
+
+    return record
+
+
+def _insert_children(model, fields, rows):
+    """
+    Insere as linhas da tabela filha de uma herança multi-tabela, que o
+    ``bulk_create`` do Django não suporta. ``rows`` tem os valores de
+    ``fields`` de cada linha.
+    """
+    if not rows:
+        return
+
+    quote = connection.ops.quote_name
+    columns = [model._meta.get_field(name).column for name in fields]
+    sql = "INSERT INTO %s (%s) VALUES (%s)" % (
+        quote(model._meta.db_table),
+        ", ".join(quote(column) for column in columns),
+        ", ".join(["%s"] * len(columns)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+class QuestionImporter:
+    def __init__(self, dry_run=False, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.result = ImportResult(dry_run=dry_run)
+        self.quiz_ids = dict(Quiz.objects.values_list("url", "id"))
+        self.categories = {}
+        self.seen = set()
+
+    def run(self, stream, format=JSONL):
+        reader = _read_csv if format == CSV else _read_jsonl
+
+        batch = []
+        for line, row in reader(stream):
+            self.result.read += 1
+            try:
+                record = parse_record(line, row)
+            except ValueError as error:
+                self.result.errors.append((line, str(error)))
+                continue
+
+            unknown = [url for url in record.quizzes if url not in self.quiz_ids]
+            if unknown:
+                self.result.errors.append(
+                    (line, "Questionário não encontrado: %s" % ", ".join(unknown))
+                )
+                continue
+
+            if record.content_hash in self.seen:
+                self.result.skipped += 1
+                continue
+            self.seen.add(record.content_hash)
+
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+
+        if batch:
+            self.flush(batch)
+        return self.result
+
+    def flush(self, batch):
+        existing = set(
+            Question.objects.filter(
+                content_hash__in=[record.content_hash for record in batch]
+            ).values_list("content_hash", flat=True)
+        )
+        records = [r for r in batch if r.content_hash not in existing]
+        self.result.skipped += len(batch) - len(records)
+        if not records:
+            return
+
+        if not self.result.dry_run:
+            with transaction.atomic():
+                self.save(records)
+        self.result.created += len(records)
+
+    def save(self, records):
+        names = {normalize_category(r.category) for r in records if r.category}
+        missing = names - set(self.categories)
+        if missing:
+            self.categories.update(Category.objects.get_or_create_many(missing))
+
+        Question.objects.bulk_create(
+            [
+                Question(
+                    content=record.content,
+                    content_hash=record.content_hash,
+                    explanation=record.explanation,
+                    difficulty=record.difficulty,
+                    category=self.categories[normalize_category(record.category)]
+                    if record.category
+                    else None,
+                )
+                for record in records
+            ],
+            batch_size=self.batch_size,
+        )
+        # O SQLite não devolve as chaves do bulk_create: busca pelo hash
+        ids = dict(
+            Question.objects.filter(
+                content_hash__in=[record.content_hash for record in records]
+            ).values_list("content_hash", "id")
+        )
+
+        _insert_children(
+            MultiChoiceQuestion,
+            ["question_ptr"],
+            [(ids[r.content_hash],) for r in records if r.kind == MULTI_CHOICE],
+        )
+        _insert_children(
+            TrueFalseQuestion,
+            ["question_ptr", "is_correct"],
+            [
+                (ids[r.content_hash], r.is_correct)
+                for r in records
+                if r.kind == TRUE_FALSE
+            ],
+        )
+
+        Answer.objects.bulk_create(
+            [
+                Answer(
+                    question_id=ids[record.content_hash],
+                    content=content,
+                    is_correct=correct,
+                )
+                for record in records
+                for content, correct in record.answers
+            ],
+            batch_size=self.batch_size,
+        )
+
+        Through = Question.quiz.through
+        links = [
+            Through(question_id=ids[record.content_hash], quiz_id=self.quiz_ids[url])
+            for record in records
+            for url in record.quizzes
+        ]
+        Through.objects.bulk_create(
+            links, batch_size=self.batch_size, ignore_conflicts=True
+        )
+
+        # bulk_create não dispara sinais
+        quiz_ids = {link.quiz_id for link in links}
+        if quiz_ids:
+            transaction.on_commit(lambda: invalidate_quiz_snapshots(quiz_ids))
+
+
+def import_questions(stream, format=JSONL, dry_run=False, batch_size=BATCH_SIZE):
+    """
+    Importa as questões de ``stream`` (texto) e retorna um <ImportResult>.
+    """
+    return QuestionImporter(dry_run=dry_run, batch_size=batch_size).run(stream, format)
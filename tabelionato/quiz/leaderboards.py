@@ -0,0 +1,251 @@
+"""
+Rankings dos usuários por questionário, por categoria e geral.
+
+Cada ranking é um sorted set do Redis, com o id do usuário como membro,
+em três períodos: a semana e o mês em que a tentativa foi concluída e
+desde sempre. As chaves semanais e mensais expiram sozinhas depois de
+``PERIOD_TTL``. Os rankings são atualizados quando uma tentativa é
+concluída (veja <Attempt.mark_quiz_complete>), depois do commit, e podem
+ser reconstruídos do banco com o comando ``rebuild_leaderboards``. As
+tentativas de questionários sem ``store_result`` são apagadas ao final e
+não entram nos rankings.
+
+A pontuação depende do escopo:
+
+- questionário: a melhor porcentagem de acertos do usuário;
+- categoria e geral: a soma das questões acertadas.
+
+Os 10 primeiros e a posição de um usuário custam O(log n) (ZREVRANGE e
+ZREVRANK). O Redis usado é o do cache ``LEADERBOARD_CACHE`` quando ele é
+do django-redis; nos demais casos (testes e desenvolvimento) os rankings
+ficam em memória, no processo.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+WEEK = "week"
+MONTH = "month"
+ALL = "all"
+PERIODS = (WEEK, MONTH, ALL)
+
+PERIOD_TTL = {
+    WEEK: int(timedelta(weeks=5).total_seconds()),
+    MONTH: int(timedelta(days=400).total_seconds()),
+    ALL: None,
+}
+
+GLOBAL = "global"
+
+KEY_PREFIX = "quiz:leaderboard:"
+
+# ZADD só se a pontuação for maior (ZADD GT exige Redis 6.2)
+MAX_SCRIPT = """
+local current = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not current or tonumber(ARGV[2]) > tonumber(current) then
+    redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+end
+"""
+
+
+def quiz_scope(quiz_id):
+    return "quiz:%s" % quiz_id
+
+
+def category_scope(category_id):
+    return "category:%s" % category_id
+
+
+def period_name(period, when=None):
+    """
+    Nome do período que contém ``when`` (agora, por padrão), na hora local.
+    """
+    if period == ALL:
+        return ALL
+    when = timezone.localtime(when)
+    if period == WEEK:
+        year, week, _ = when.isocalendar()
+        return "%s:%s-W%02d" % (WEEK, year, week)
+    return "%s:%s-%02d" % (MONTH, when.year, when.month)
+
+
+def board_key(scope, period, when=None):
+    return "%s%s:%s" % (KEY_PREFIX, scope, period_name(period, when))
+
+
+class RedisBackend:
+    def __init__(self, client):
+        self.client = client
+        self.maximize = client.register_script(MAX_SCRIPT)
+
+    def update(self, increments, maximums, ttls):
+        """
+        ``increments`` e ``maximums`` são listas de (chave, membro,
+        pontos); ``ttls`` mapeia chaves para a expiração em segundos.
+        """
+        from redis.exceptions import RedisError
+
+        pipe = self.client.pipeline(transaction=False)
+        for key, member, points in increments:
+            pipe.zincrby(key, points, member)
+        for key, member, points in maximums:
+            self.maximize(keys=[key], args=[member, points], client=pipe)
+        for key, ttl in ttls.items():
+            pipe.expire(key, ttl)
+        try:
+            pipe.execute()
+        except RedisError:
+            # Como o cache, o ranking não derruba a requisição; o comando
+            # rebuild_leaderboards corrige a diferença
+            logger.exception("Falha ao atualizar os rankings")
+
+    def replace(self, key, scores, ttl):
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        if scores:
+            pipe.zadd(key, scores)
+            if ttl:
+                pipe.expire(key, ttl)
+        pipe.execute()
+
+    def keys(self):
+        return [key.decode() for key in self.client.scan_iter(match="%s*" % KEY_PREFIX)]
+
+    def delete(self, keys):
+        if keys:
+            self.client.delete(*keys)
+
+    def top(self, key, size):
+        return [
+            (int(member), score)
+            for member, score in self.client.zrevrange(
+                key, 0, size - 1, withscores=True
+            )
+        ]
+
+    def rank(self, key, member):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrevrank(key, member)
+        pipe.zscore(key, member)
+        return tuple(pipe.execute())
+
+
+class LocalBackend:
+    """
+    Mesma interface de <RedisBackend>, em memória. Ordena a cada consulta,
+    então serve só para testes e desenvolvimento.
+    """
+
+    def __init__(self):
+        self.boards = {}
+        self.lock = threading.Lock()
+
+    def update(self, increments, maximums, ttls):
+        with self.lock:
+            for key, member, points in increments:
+                board = self.boards.setdefault(key, {})
+                board[str(member)] = board.get(str(member), 0) + points
+            for key, member, points in maximums:
+                board = self.boards.setdefault(key, {})
+                board[str(member)] = max(board.get(str(member), points), points)
+
+    def replace(self, key, scores, ttl):
+        with self.lock:
+            self.boards[key] = {str(m): score for m, score in scores.items()}
+
+    def keys(self):
+        return list(self.boards)
+
+    def delete(self, keys):
+        with self.lock:
+            for key in keys:
+                self.boards.pop(key, None)
+
+    def _ordered(self, key):
+        # Empates em ordem decrescente do membro, como no Redis
+        board = self.boards.get(key, {})
+        return sorted(board.items(), key=lambda item: (item[1], item[0]), reverse=True)
+
+    def top(self, key, size):
+        return [(int(member), score) for member, score in self._ordered(key)[:size]]
+
+    def rank(self, key, member):
+        for position, (other, score) in enumerate(self._ordered(key)):
+            if other == str(member):
+                return position, score
+        return None, None
+
+    def clear(self):
+        with self.lock:
+            self.boards.clear()
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        cache = caches[getattr(settings, "LEADERBOARD_CACHE", "default")]
+        try:
+            from django_redis.cache import RedisCache
+        except ImportError:
+            RedisCache = None
+
+        if RedisCache is not None and isinstance(cache, RedisCache):
+            _backend = RedisBackend(cache.client.get_client(write=True))
+        else:
+            _backend = LocalBackend()
+    return _backend
+
+
+def record_attempt(user_id, quiz_id, score, percent, category_scores, when):
+    """
+    Soma uma tentativa concluída aos rankings dos três períodos.
+    ``category_scores`` mapeia o id de cada categoria às questões
+    acertadas nela.
+    """
+    increments = []
+    maximums = []
+    ttls = {}
+    for period in PERIODS:
+        key = board_key(quiz_scope(quiz_id), period, when)
+        maximums.append((key, user_id, percent))
+        ttls[key] = PERIOD_TTL[period]
+
+        key = board_key(GLOBAL, period, when)
+        increments.append((key, user_id, score))
+        ttls[key] = PERIOD_TTL[period]
+
+        for category_id, points in category_scores.items():
+            key = board_key(category_scope(category_id), period, when)
+            increments.append((key, user_id, points))
+            ttls[key] = PERIOD_TTL[period]
+
+    get_backend().update(
+        increments, maximums, {key: ttl for key, ttl in ttls.items() if ttl}
+    )
+
+
+def top(scope, period=ALL, size=10):
+    """
+    Lista de (id do usuário, pontos) dos ``size`` primeiros do ranking.
+    """
+    return get_backend().top(board_key(scope, period), size)
+
+
+def rank(scope, user_id, period=ALL):
+    """
+    (posição a partir de 1, pontos) do usuário no ranking, ou (None, None)
+    se ele não estiver nele.
+    """
+    position, score = get_backend().rank(board_key(scope, period), user_id)
+    if position is None:
+        return None, None
+    return position + 1, score
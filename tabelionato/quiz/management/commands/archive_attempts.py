@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from tabelionato.quiz.archive import CHUNK_SIZE, archive_attempts
+
+
+class Command(BaseCommand):
+    help = (
+        "Move as tentativas concluídas antigas para o arquivo, com as "
+        "respostas comprimidas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Idade mínima, em dias, das tentativas arquivadas "
+            "(padrão: QUIZ_ARCHIVE_AFTER_DAYS).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Tentativas arquivadas por transação.",
+        )
+
+    def handle(self, *args, **options):
+        older_than = None
+        if options["days"] is not None:
+            older_than = timedelta(days=options["days"])
+
+        archived = archive_attempts(older_than, chunk_size=options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS("%s tentativas arquivadas." % archived))
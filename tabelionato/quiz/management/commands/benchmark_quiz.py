@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o tempo dos caminhos mais usados do app de questionários em "
+        "questionários de vários tamanhos e grava o resultado em JSON. Os "
+        "dados criados são descartados ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "benchmarks",
+            nargs="*",
+            help="Benchmarks a executar (todos, se omitido).",
+        )
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=None,
+            help="Número de questões dos questionários (padrão: 10 100 500).",
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=None, help="Medições por benchmark."
+        )
+        parser.add_argument("--output", help="Arquivo JSON com os resultados.")
+        parser.add_argument(
+            "--compare", help="Arquivo JSON de uma execução anterior para comparar."
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=1.2,
+            help="Razão entre as medianas a partir da qual há regressão.",
+        )
+
+    def handle(self, *args, **options):
+        # As fábricas dependem do factory-boy, instalado só no desenvolvimento
+        from tabelionato.quiz.tests import benchmarks
+
+        names = options["benchmarks"] or None
+        unknown = set(names or ()) - set(benchmarks.BENCHMARKS)
+        if unknown:
+            raise CommandError(
+                "Benchmarks desconhecidos: %s. Disponíveis: %s."
+                % (", ".join(sorted(unknown)), ", ".join(benchmarks.BENCHMARKS))
+            )
+
+        def progress(key, result):
+            self.stdout.write(
+                "%-45s mediana %9.3f ms  %5s consultas"
+                % (key, result["median"] * 1000, result["queries"])
+            )
+
+        with transaction.atomic():
+            document = benchmarks.run(
+                names,
+                sizes=options["sizes"] or benchmarks.SIZES,
+                repeat=options["repeat"] or benchmarks.REPEAT,
+                progress=progress,
+            )
+            transaction.set_rollback(True)
+
+        if options["output"]:
+            benchmarks.dump(document, options["output"])
+            self.stdout.write(
+                self.style.SUCCESS("Resultados gravados em %s." % options["output"])
+            )
+
+        if options["compare"]:
+            rows = benchmarks.compare(
+                benchmarks.load(options["compare"]), document, options["threshold"]
+            )
+            for key, before, after, ratio, regressed in rows:
+                line = "%-45s %9.3f ms -> %9.3f ms  (%.2fx)" % (
+                    key,
+                    before * 1000,
+                    after * 1000,
+                    ratio,
+                )
+                self.stdout.write(self.style.ERROR(line) if regressed else line)
+            regressions = [row[0] for row in rows if row[4]]
+            if regressions:
+                raise CommandError(
+                    "Regressões acima de %.2fx: %s."
+                    % (options["threshold"], ", ".join(regressions))
+                )
@@ -0,0 +1,72 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tabelionato.quiz.synthetic import LoadDataConfig, generate_load_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera usuários, questionários, questões e tentativas sintéticos em "
+        "volume de produção, para testes de carga. A mesma semente gera "
+        "sempre os mesmos dados."
+    )
+
+    def add_arguments(self, parser):
+        defaults = LoadDataConfig()
+        for name, help in [
+            ("users", "Número de usuários."),
+            ("categories", "Número de categorias."),
+            ("quizzes", "Número de questionários."),
+            ("questions", "Número de questões."),
+            ("questions_per_quiz", "Questões de cada questionário."),
+            ("attempts", "Número de tentativas."),
+            ("days", "Período, em dias, pelo qual as tentativas se espalham."),
+            ("seed", "Semente dos sorteios."),
+            ("batch_size", "Linhas gravadas por lote."),
+        ]:
+            parser.add_argument(
+                "--%s" % name.replace("_", "-"),
+                type=int,
+                default=getattr(defaults, name),
+                help=help,
+            )
+        parser.add_argument(
+            "--no-stats",
+            action="store_false",
+            dest="stats",
+            help="Não recalcula as estatísticas dos questionários ao final.",
+        )
+
+    def handle(self, *args, **options):
+        config = LoadDataConfig(
+            **{
+                name: options[name]
+                for name in LoadDataConfig.__dataclass_fields__
+                if name in options
+            }
+        )
+        if min(config.users, config.categories, config.quizzes, config.questions) < 1:
+            raise CommandError(
+                "São necessários ao menos um usuário, uma categoria, um "
+                "questionário e uma questão."
+            )
+        if config.questions_per_quiz < 1 or config.batch_size < 1:
+            raise CommandError(
+                "--questions-per-quiz e --batch-size devem ser positivos."
+            )
+
+        started = time.monotonic()
+
+        def progress(model, count):
+            self.stdout.write(
+                "%s: %s linhas (%.1fs)"
+                % (model._meta.db_table, count, time.monotonic() - started)
+            )
+
+        generate_load_data(config, progress)
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Dados gerados em %.1f segundos." % (time.monotonic() - started)
+            )
+        )
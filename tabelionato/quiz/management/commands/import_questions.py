@@ -0,0 +1,77 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tabelionato.quiz.importer import (
+    BATCH_SIZE,
+    FORMATS,
+    detect_format,
+    import_questions,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa questões de um arquivo JSON Lines ou CSV. Questões já "
+        "cadastradas (mesmo enunciado) são ignoradas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Arquivo a importar, ou - para stdin.")
+        parser.add_argument(
+            "--format",
+            choices=sorted(set(FORMATS.values())),
+            help="Formato do arquivo. Por padrão, deduzido da extensão.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas valida o arquivo, sem gravar nada.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help="Número de questões gravadas por lote.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        format = options["format"]
+        if format is None:
+            if path == "-":
+                raise CommandError("Informe --format ao ler de stdin.")
+            try:
+                format = detect_format(path)
+            except ValueError as error:
+                raise CommandError(error)
+
+        if path == "-":
+            result = self.run(sys.stdin, format, options)
+        else:
+            try:
+                with open(path, encoding="utf-8-sig", newline="") as stream:
+                    result = self.run(stream, format, options)
+            except OSError as error:
+                raise CommandError(error)
+
+        for line, message in result.errors:
+            self.stderr.write("Linha %s: %s" % (line, message))
+
+        summary = "%s registros lidos, %s questões %s, %s repetidas, %s com erro." % (
+            result.read,
+            result.created,
+            "válidas" if result.dry_run else "criadas",
+            result.skipped,
+            len(result.errors),
+        )
+        style = self.style.WARNING if result.errors else self.style.SUCCESS
+        self.stdout.write(style(summary))
+
+    def run(self, stream, format, options):
+        return import_questions(
+            stream,
+            format=format,
+            dry_run=options["dry_run"],
+            batch_size=options["batch_size"],
+        )
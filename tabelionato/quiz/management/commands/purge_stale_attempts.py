@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from tabelionato.quiz.archive import (
+    PURGE_CHUNK_SIZE,
+    PURGE_PAUSE,
+    purge_stale_attempts,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Apaga, em lotes, as tentativas em andamento abandonadas, sem "
+        "resposta há mais de --days dias. Pode ser agendado para rodar "
+        "periodicamente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=None,
+            help="Dias sem respostas para uma tentativa ser considerada "
+            "abandonada (padrão: QUIZ_STALE_ATTEMPT_DAYS).",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=PURGE_CHUNK_SIZE,
+            help="Tentativas apagadas por transação.",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=PURGE_PAUSE,
+            help="Segundos de pausa entre os lotes.",
+        )
+
+    def handle(self, *args, **options):
+        older_than = None
+        if options["days"] is not None:
+            older_than = timedelta(days=options["days"])
+
+        purged = purge_stale_attempts(
+            older_than, chunk_size=options["chunk_size"], pause=options["pause"]
+        )
+        self.stdout.write(self.style.SUCCESS("%s tentativas apagadas." % purged))
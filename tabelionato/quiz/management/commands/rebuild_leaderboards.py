@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tabelionato.quiz.stats import rebuild_leaderboards
+
+
+class Command(BaseCommand):
+    help = (
+        "Refaz os rankings por questionário, por categoria e geral a partir "
+        "das tentativas concluídas."
+    )
+
+    def handle(self, *args, **options):
+        boards = rebuild_leaderboards()
+        self.stdout.write(self.style.SUCCESS("%s rankings reconstruídos." % boards))
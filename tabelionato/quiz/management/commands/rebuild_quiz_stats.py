@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from tabelionato.quiz.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula as estatísticas dos questionários e das questões a partir "
+        "das tentativas guardadas."
+    )
+
+    def handle(self, *args, **options):
+        result = rebuild_stats()
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Estatísticas de %(quizzes)s questionários e %(questions)s "
+                "questões recalculadas." % result
+            )
+        )
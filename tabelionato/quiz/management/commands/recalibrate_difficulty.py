@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from tabelionato.quiz.calibration import CHUNK_SIZE, MIN_RESPONSES, recalibrate
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalibra a dificuldade das questões a partir das tentativas "
+        "concluídas desde a última execução."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Número de tentativas lidas por lote.",
+        )
+        parser.add_argument(
+            "--min-responses",
+            type=int,
+            default=MIN_RESPONSES,
+            help="Respostas necessárias para alterar a dificuldade de uma questão.",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Descarta as estatísticas acumuladas e processa todas as tentativas.",
+        )
+
+    def handle(self, *args, **options):
+        result = recalibrate(
+            chunk_size=options["chunk_size"],
+            min_responses=options["min_responses"],
+            full=options["full"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                "%(attempts)s tentativas e %(responses)s respostas processadas, "
+                "%(updated)s questões com nova dificuldade." % result
+            )
+        )
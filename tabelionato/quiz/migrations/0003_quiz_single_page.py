@@ -0,0 +1,18 @@
+# Generated by Django 3.1.8 on 2026-10-18 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0002_auto_20210526_0436'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='single_page',
+            field=models.BooleanField(default=False, help_text='Se sim, todas as questões serão exibidas em uma única página e corrigidas de uma só vez ao enviar.', verbose_name='Página única'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 3.1.8 on 2026-10-18 06:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0003_quiz_single_page'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attempt',
+            name='max_score',
+            field=models.PositiveIntegerField(default=0, verbose_name='Max Score'),
+        ),
+        migrations.CreateModel(
+            name='AttemptResponse',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(verbose_name='Position')),
+                ('answer', models.CharField(blank=True, max_length=20, null=True, verbose_name='Answer')),
+                ('is_correct', models.BooleanField(null=True, verbose_name='Correct')),
+                ('answered_at', models.DateTimeField(blank=True, null=True, verbose_name='Answered at')),
+                ('attempt', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='responses', to='quiz.attempt', verbose_name='Attempt')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quiz.question', verbose_name='Question')),
+            ],
+            options={
+                'verbose_name': 'Resposta da Tentativa',
+                'verbose_name_plural': 'Respostas das Tentativas',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='attemptresponse',
+            index=models.Index(condition=models.Q(answered_at__isnull=True), fields=['attempt', 'position'], name='quiz_response_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attemptresponse',
+            index=models.Index(fields=['question', 'is_correct'], name='quiz_response_question_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='attemptresponse',
+            constraint=models.UniqueConstraint(fields=('attempt', 'position'), name='quiz_response_position_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='attemptresponse',
+            constraint=models.UniqueConstraint(fields=('attempt', 'question'), name='quiz_response_question_uniq'),
+        ),
+    ]
@@ -0,0 +1,124 @@
+import json
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def _split(csv):
+    return [int(n) for n in (csv or "").split(",") if n]
+
+
+def _batches(Attempt, fields):
+    last_pk = 0
+    while True:
+        batch = list(
+            Attempt.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .only(*fields)[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1].pk
+
+
+def forwards(apps, schema_editor):
+    """
+    Cria uma <AttemptResponse> para cada questão de cada tentativa, a partir
+    dos campos question_order, question_list, incorrect_questions e
+    user_answers, em lotes de BATCH_SIZE tentativas.
+    """
+    Attempt = apps.get_model("quiz", "Attempt")
+    AttemptResponse = apps.get_model("quiz", "AttemptResponse")
+    Question = apps.get_model("quiz", "Question")
+
+    fields = [
+        "question_order",
+        "question_list",
+        "incorrect_questions",
+        "user_answers",
+        "start",
+        "end",
+    ]
+    for batch in _batches(Attempt, fields):
+        question_ids = {qid for a in batch for qid in _split(a.question_order)}
+        existing = set(
+            Question.objects.filter(id__in=question_ids).values_list("id", flat=True)
+        )
+
+        responses = []
+        for attempt in batch:
+            order = list(dict.fromkeys(_split(attempt.question_order)))
+            pending = set(_split(attempt.question_list))
+            incorrect = set(_split(attempt.incorrect_questions))
+            try:
+                answers = json.loads(attempt.user_answers or "{}")
+            except ValueError:
+                answers = {}
+
+            for position, qid in enumerate(order):
+                if qid not in existing:
+                    continue
+                answered = qid not in pending or str(qid) in answers
+                answer = answers.get(str(qid))
+                responses.append(
+                    AttemptResponse(
+                        attempt_id=attempt.pk,
+                        position=position,
+                        question_id=qid,
+                        answer=None if answer is None else str(answer)[:20],
+                        is_correct=(qid not in incorrect) if answered else None,
+                        answered_at=(attempt.end or attempt.start)
+                        if answered
+                        else None,
+                    )
+                )
+            attempt.max_score = len(order)
+
+        AttemptResponse.objects.bulk_create(responses, batch_size=BATCH_SIZE)
+        Attempt.objects.bulk_update(batch, ["max_score"], batch_size=BATCH_SIZE)
+
+
+def backwards(apps, schema_editor):
+    Attempt = apps.get_model("quiz", "Attempt")
+    AttemptResponse = apps.get_model("quiz", "AttemptResponse")
+
+    for batch in _batches(Attempt, ["pk"]):
+        rows = AttemptResponse.objects.filter(attempt__in=batch).order_by(
+            "attempt_id", "position"
+        )
+        by_attempt = {}
+        for row in rows:
+            by_attempt.setdefault(row.attempt_id, []).append(row)
+
+        for attempt in batch:
+            rows = by_attempt.get(attempt.pk, [])
+            order = [str(r.question_id) for r in rows]
+            pending = [str(r.question_id) for r in rows if r.answered_at is None]
+            attempt.question_order = ",".join(order) + "," if order else ""
+            attempt.question_list = ",".join(pending) + "," if pending else ""
+            attempt.incorrect_questions = ",".join(
+                str(r.question_id) for r in rows if r.is_correct is False
+            )
+            attempt.user_answers = json.dumps(
+                {str(r.question_id): r.answer for r in rows if r.answered_at}
+            )
+
+        Attempt.objects.bulk_update(
+            batch,
+            ["question_order", "question_list", "incorrect_questions", "user_answers"],
+            batch_size=BATCH_SIZE,
+        )
+        AttemptResponse.objects.filter(attempt__in=batch).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0004_attemptresponse"),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
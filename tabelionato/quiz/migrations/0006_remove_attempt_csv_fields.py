@@ -0,0 +1,43 @@
+# Generated by Django 3.1.8 on 2026-10-18 06:26
+
+import django.core.validators
+from django.db import migrations, models
+import re
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0005_backfill_attemptresponse'),
+    ]
+
+    operations = [
+        # Default apenas para que a migração possa ser revertida
+        migrations.AlterField(
+            model_name='attempt',
+            name='question_order',
+            field=models.CharField(blank=True, default='', max_length=1024, validators=[django.core.validators.RegexValidator(re.compile('^\\d+(?:,\\d+)*\\Z'), code='invalid', message='Enter only digits separated by commas.')], verbose_name='Question Order'),
+        ),
+        # Default apenas para que a migração possa ser revertida
+        migrations.AlterField(
+            model_name='attempt',
+            name='question_list',
+            field=models.CharField(blank=True, default='', max_length=1024, validators=[django.core.validators.RegexValidator(re.compile('^\\d+(?:,\\d+)*\\Z'), code='invalid', message='Enter only digits separated by commas.')], verbose_name='Question List'),
+        ),
+        migrations.RemoveField(
+            model_name='attempt',
+            name='incorrect_questions',
+        ),
+        migrations.RemoveField(
+            model_name='attempt',
+            name='question_list',
+        ),
+        migrations.RemoveField(
+            model_name='attempt',
+            name='question_order',
+        ),
+        migrations.RemoveField(
+            model_name='attempt',
+            name='user_answers',
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.1.8 on 2026-10-18 06:27
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quiz', '0006_remove_attempt_csv_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressCategoryScore',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('correct', models.PositiveIntegerField(default=0, verbose_name='Respostas Corretas')),
+                ('possible', models.PositiveIntegerField(default=0, verbose_name='Pontuação Possível')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quiz.category', verbose_name='Categoria')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_scores', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Pontuação por Categoria',
+                'verbose_name_plural': 'Pontuações por Categoria',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='progresscategoryscore',
+            constraint=models.UniqueConstraint(fields=('user', 'category'), name='quiz_progress_category_uniq'),
+        ),
+    ]
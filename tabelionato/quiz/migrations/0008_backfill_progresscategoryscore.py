@@ -0,0 +1,91 @@
+import re
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+SCORE_RE = re.compile(r"([^,]+),(\d+),(\d+),")
+
+
+def _batches(Progress):
+    last_pk = 0
+    while True:
+        batch = list(
+            Progress.objects.filter(pk__gt=last_pk).order_by("pk")[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        yield batch
+        last_pk = batch[-1].pk
+
+
+def forwards(apps, schema_editor):
+    """
+    Converte a string ``score`` ("categoria,acertos,possíveis,...") de cada
+    <Progress> em linhas de <ProgressCategoryScore>.
+    """
+    Category = apps.get_model("quiz", "Category")
+    Progress = apps.get_model("quiz", "Progress")
+    ProgressCategoryScore = apps.get_model("quiz", "ProgressCategoryScore")
+
+    # A busca antiga ignorava maiúsculas e minúsculas
+    categories = {
+        name.lower(): pk
+        for pk, name in Category.objects.values_list("pk", "category")
+        if name
+    }
+
+    for batch in _batches(Progress):
+        scores = {}
+        for progress in batch:
+            for name, correct, possible in SCORE_RE.findall(progress.score or ""):
+                category_id = categories.get(name.lower())
+                if category_id is None:
+                    continue
+                score = scores.setdefault((progress.user_id, category_id), [0, 0])
+                score[0] += int(correct)
+                score[1] += int(possible)
+
+        ProgressCategoryScore.objects.bulk_create(
+            [
+                ProgressCategoryScore(
+                    user_id=user_id,
+                    category_id=category_id,
+                    correct=correct,
+                    possible=possible,
+                )
+                for (user_id, category_id), (correct, possible) in scores.items()
+            ],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+
+def backwards(apps, schema_editor):
+    Progress = apps.get_model("quiz", "Progress")
+    ProgressCategoryScore = apps.get_model("quiz", "ProgressCategoryScore")
+
+    for batch in _batches(Progress):
+        scores = {}
+        rows = ProgressCategoryScore.objects.filter(
+            user_id__in=[p.user_id for p in batch]
+        ).values_list("user_id", "category__category", "correct", "possible")
+        for user_id, name, correct, possible in rows:
+            scores.setdefault(user_id, []).append(
+                ",".join([name, str(correct), str(possible), ""])
+            )
+
+        for progress in batch:
+            progress.score = "".join(scores.get(progress.user_id, []))
+        Progress.objects.bulk_update(batch, ["score"], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0007_progresscategoryscore"),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
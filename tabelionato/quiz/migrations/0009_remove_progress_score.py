@@ -0,0 +1,25 @@
+# Generated by Django 3.1.8 on 2026-10-18 06:40
+
+import django.core.validators
+from django.db import migrations, models
+import re
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0008_backfill_progresscategoryscore'),
+    ]
+
+    operations = [
+        # Default apenas para que a migração possa ser revertida
+        migrations.AlterField(
+            model_name='progress',
+            name='score',
+            field=models.CharField(blank=True, default='', max_length=1024, validators=[django.core.validators.RegexValidator(re.compile('^\\d+(?:,\\d+)*\\Z'), code='invalid', message='Enter only digits separated by commas.')], verbose_name='Pontuação'),
+        ),
+        migrations.RemoveField(
+            model_name='progress',
+            name='score',
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.1.8 on 2026-10-18 06:29
+
+from django.db import migrations, models
+import tabelionato.quiz.selection
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0009_remove_progress_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='blueprint',
+            field=models.JSONField(blank=True, help_text='Regras de sorteio das questões, por exemplo [{"category": "registro", "difficulty": [1, 2], "count": 3}]. Se vazio, todas as questões são usadas.', null=True, validators=[tabelionato.quiz.selection.validate_blueprint], verbose_name='Blueprint'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.1.8 on 2026-10-18 06:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0010_quiz_blueprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalibrationState',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_end', models.DateTimeField(blank=True, null=True)),
+                ('last_attempt_id', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionCalibration',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='calibration', serialize=False, to='quiz.question', verbose_name='Questão')),
+                ('seen', models.PositiveIntegerField(default=0, verbose_name='Respostas')),
+                ('correct', models.PositiveIntegerField(default=0, verbose_name='Respostas Corretas')),
+                ('ability_sum', models.FloatField(default=0)),
+                ('ability_sq_sum', models.FloatField(default=0)),
+                ('p_value', models.FloatField(blank=True, null=True, verbose_name='Valor p')),
+                ('rasch_difficulty', models.FloatField(blank=True, null=True, verbose_name='Dificuldade (logits)')),
+            ],
+            options={
+                'verbose_name': 'Calibração da Questão',
+                'verbose_name_plural': 'Calibrações das Questões',
+            },
+        ),
+    ]
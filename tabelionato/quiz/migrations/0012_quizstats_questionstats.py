@@ -0,0 +1,41 @@
+# Generated by Django 3.1.8 on 2026-10-18 06:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0011_questioncalibration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='quiz.question', verbose_name='Questão')),
+                ('seen', models.PositiveIntegerField(default=0, verbose_name='Respostas')),
+                ('correct', models.PositiveIntegerField(default=0, verbose_name='Respostas Corretas')),
+            ],
+            options={
+                'verbose_name': 'Estatísticas da Questão',
+                'verbose_name_plural': 'Estatísticas das Questões',
+            },
+        ),
+        migrations.CreateModel(
+            name='QuizStats',
+            fields=[
+                ('quiz', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='quiz.quiz', verbose_name='Questionário')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Tentativas')),
+                ('completed', models.PositiveIntegerField(default=0, verbose_name='Concluídas')),
+                ('passed', models.PositiveIntegerField(default=0, verbose_name='Aprovações')),
+                ('score_sum', models.BigIntegerField(default=0)),
+                ('score_sq_sum', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Estatísticas do Questionário',
+                'verbose_name_plural': 'Estatísticas dos Questionários',
+            },
+        ),
+    ]
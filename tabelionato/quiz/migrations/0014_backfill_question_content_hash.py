@@ -0,0 +1,43 @@
+import hashlib
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def _content_hash(content):
+    normalized = " ".join(content.split()).casefold()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def forwards(apps, schema_editor):
+    """
+    Calcula ``content_hash`` das questões já cadastradas.
+    """
+    Question = apps.get_model("quiz", "Question")
+
+    last_pk = 0
+    while True:
+        batch = list(
+            Question.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .only("pk", "content")[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+
+        for question in batch:
+            question.content_hash = _content_hash(question.content)
+        Question.objects.bulk_update(batch, ["content_hash"])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0013_question_content_hash"),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
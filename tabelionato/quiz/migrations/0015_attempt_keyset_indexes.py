@@ -0,0 +1,21 @@
+# Generated by Django 3.1.8 on 2026-10-18 06:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0014_backfill_question_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attempt',
+            index=models.Index(condition=models.Q(complete=True), fields=['user', 'start', 'id'], name='quiz_attempt_user_done_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attempt',
+            index=models.Index(condition=models.Q(complete=True), fields=['start', 'id'], name='quiz_attempt_done_idx'),
+        ),
+    ]
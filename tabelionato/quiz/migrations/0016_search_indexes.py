@@ -0,0 +1,60 @@
+from django.db import migrations
+
+# Colunas e índices de busca textual, apenas no PostgreSQL (veja search.py).
+# As colunas são geradas pelo banco e não aparecem nos modelos.
+
+VECTOR = (
+    "setweight(to_tsvector('portuguese', quiz_unaccent(coalesce(%s, ''))), 'A') || "
+    "setweight(to_tsvector('portuguese', quiz_unaccent(coalesce(%s, ''))), 'B')"
+)
+
+FORWARDS = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # unaccent() não é IMMUTABLE e não pode ser usada em índices e colunas
+    # geradas; a versão com o dicionário explícito pode
+    "CREATE OR REPLACE FUNCTION quiz_unaccent(text) RETURNS text "
+    "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS "
+    "$$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$",
+    "ALTER TABLE quiz_question ADD COLUMN search_vector tsvector "
+    "GENERATED ALWAYS AS (%s) STORED" % (VECTOR % ("content", "explanation")),
+    "CREATE INDEX quiz_question_search_idx ON quiz_question USING gin (search_vector)",
+    "CREATE INDEX quiz_question_content_trgm_idx ON quiz_question "
+    "USING gin (quiz_unaccent(content) gin_trgm_ops)",
+    "ALTER TABLE quiz_quiz ADD COLUMN search_vector tsvector "
+    "GENERATED ALWAYS AS (%s) STORED" % (VECTOR % ("title", "description")),
+    "CREATE INDEX quiz_quiz_search_idx ON quiz_quiz USING gin (search_vector)",
+    "CREATE INDEX quiz_quiz_title_trgm_idx ON quiz_quiz "
+    "USING gin (quiz_unaccent(title) gin_trgm_ops)",
+]
+
+BACKWARDS = [
+    "DROP INDEX IF EXISTS quiz_quiz_title_trgm_idx",
+    "DROP INDEX IF EXISTS quiz_quiz_search_idx",
+    "ALTER TABLE quiz_quiz DROP COLUMN IF EXISTS search_vector",
+    "DROP INDEX IF EXISTS quiz_question_content_trgm_idx",
+    "DROP INDEX IF EXISTS quiz_question_search_idx",
+    "ALTER TABLE quiz_question DROP COLUMN IF EXISTS search_vector",
+    "DROP FUNCTION IF EXISTS quiz_unaccent(text)",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0015_attempt_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARDS), _run(BACKWARDS)),
+    ]
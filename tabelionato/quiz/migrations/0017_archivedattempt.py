@@ -0,0 +1,55 @@
+# Generated by Django 3.1.8 on 2026-10-18 07:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import tabelionato.quiz.models
+
+
+def external_storage(apps, schema_editor):
+    # As respostas já vêm comprimidas com zlib: no PostgreSQL, guardá-las
+    # fora da linha sem tentar comprimir de novo
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "ALTER TABLE quiz_archivedattempt "
+            "ALTER COLUMN responses_data SET STORAGE EXTERNAL"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quiz', '0016_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAttempt',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('max_score', models.PositiveIntegerField(verbose_name='Max Score')),
+                ('current_score', models.IntegerField(verbose_name='Current Score')),
+                ('complete', models.BooleanField(default=True, verbose_name='Complete')),
+                ('start', models.DateTimeField(verbose_name='Start')),
+                ('end', models.DateTimeField(verbose_name='End')),
+                ('responses_data', models.BinaryField(verbose_name='Responses')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attempts', to='quiz.quiz', verbose_name='Quiz')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attempts', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Tentativa Arquivada',
+                'verbose_name_plural': 'Tentativas Arquivadas',
+            },
+            bases=(tabelionato.quiz.models.AttemptResultMixin, models.Model),
+        ),
+        migrations.AddIndex(
+            model_name='archivedattempt',
+            index=models.Index(fields=['user', 'start', 'id'], name='quiz_archived_user_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedattempt',
+            index=models.Index(fields=['start', 'id'], name='quiz_archived_start_idx'),
+        ),
+        migrations.RunPython(external_storage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def remove_duplicates(apps, schema_editor):
+    """
+    Antes do índice único, apaga as tentativas em andamento que têm outra
+    mais nova em andamento para o mesmo usuário e questionário (a mesma
+    que <AttemptManager.user_attempt> usava).
+    """
+    Attempt = apps.get_model("quiz", "Attempt")
+    AttemptResponse = apps.get_model("quiz", "AttemptResponse")
+
+    newer = Attempt.objects.filter(
+        user_id=OuterRef("user_id"),
+        quiz_id=OuterRef("quiz_id"),
+        complete=False,
+        id__gt=OuterRef("pk"),
+    )
+    duplicates = list(
+        Attempt.objects.filter(complete=False)
+        .filter(Exists(newer))
+        .values_list("id", flat=True)
+    )
+    AttemptResponse.objects.filter(attempt_id__in=duplicates).delete()
+    Attempt.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0017_archivedattempt"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="attempt",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(complete=False),
+                fields=("user", "quiz"),
+                name="quiz_attempt_in_progress_uniq",
+            ),
+        ),
+    ]
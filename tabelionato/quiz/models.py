@@ -1,19 +1,32 @@
-import re, json
+import hashlib, re, json, zlib
 from datetime import datetime, timezone
-from django.db import models
-from django.db.models import Model
+from functools import partial
+from django.db import IntegrityError, models, transaction
+from django.db.models import (
+    F,
+    FilteredRelation,
+    Model,
+    Prefetch,
+    Q,
+    prefetch_related_objects,
+)
 from django.db.models.aggregates import Count
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
+from django.core.exceptions import ImproperlyConfigured
 from django.core.validators import (
     MinValueValidator,
     MaxValueValidator,
-    validate_comma_separated_integer_list,
     ValidationError,
 )
 
-from random import randint, random
+from random import randint
 from model_utils.managers import InheritanceManager
+from tabelionato.quiz.leaderboards import record_attempt
+from tabelionato.quiz.selection import build_pool, select_questions, validate_blueprint
+from tabelionato.utils.querysets import MergedQuerySet
 from tabelionato.utils.text_utils import remove_accents
 
 # Abstract Base Class: Metaclasse para classes abstratas
@@ -21,15 +34,53 @@ from tabelionato.utils.text_utils import remove_accents
 from abc import ABCMeta, abstractmethod
 
 
+def normalize_category(category):
+    """
+    Canonical form of a category name: without accents, in lower case and
+    with dashes instead of blanks, so "Registro de Imóveis" and
+    "registro de imoveis" are the same category.
+    """
+    return re.sub(r"\s+", "-", remove_accents(category).strip()).lower()
+
+
 class CategoryManager(models.Manager):
-    def new_category(self, category):
-        new_category = self.create(
-            category=re.sub("\W", remove_accents, category).lower()
-        )
+    def by_normalized_name(self):
+        """
+        Returns a dict {normalized name: <Category>} of all categories.
+        Names typed in the admin are kept as typed ("Registro de Imóveis"),
+        so existing categories are matched on the normalized form; if two
+        match, the oldest wins.
+        """
+        categories = {}
+        for category in self.exclude(category__isnull=True).order_by("-id"):
+            categories[normalize_category(category.category)] = category
+        return categories
 
-        new_category.save()
+    def new_category(self, category):
+        name = normalize_category(category)
+        existing = self.by_normalized_name().get(name)
+        if existing is not None:
+            return existing
+        new_category, created = self.get_or_create(category=name)
         return new_category
 
+    def get_or_create_many(self, categories):
+        """
+        Upserts several categories at once and returns a dict
+        {normalized name: <Category>}, reusing the existing categories
+        whose name has the same normalized form.
+        """
+        names = {normalize_category(category) for category in categories}
+        existing = self.by_normalized_name()
+        missing = names - set(existing)
+        if missing:
+            self.bulk_create(
+                [self.model(category=name) for name in missing],
+                ignore_conflicts=True,
+            )
+            existing = self.by_normalized_name()
+        return {name: existing[name] for name in names}
+
 
 class Category(models.Model):
     category = models.CharField(
@@ -45,6 +96,20 @@ class Category(models.Model):
     def __str__(self):
         return self.category
 
+    def clean(self):
+        if not self.category:
+            return
+        other = Category.objects.by_normalized_name().get(
+            normalize_category(self.category)
+        )
+        if other is not None and other.pk != self.pk:
+            raise ValidationError(
+                {
+                    "category": _("Já existe a categoria %(category)s.")
+                    % {"category": other.category}
+                }
+            )
+
 
 class Quiz(models.Model):
     title = models.CharField(verbose_name=_("Título"), max_length=60, blank=False)
@@ -146,6 +211,29 @@ class Quiz(models.Model):
         default=True,
     )
 
+    single_page = models.BooleanField(
+        verbose_name=_("Página única"),
+        help_text=_(
+            "Se sim, todas as questões serão exibidas"
+            " em uma única página e corrigidas"
+            " de uma só vez ao enviar."
+        ),
+        blank=False,
+        default=False,
+    )
+
+    blueprint = models.JSONField(
+        verbose_name=_("Blueprint"),
+        help_text=_(
+            "Regras de sorteio das questões, por exemplo"
+            ' [{"category": "registro", "difficulty": [1, 2], "count": 3}].'
+            " Se vazio, todas as questões são usadas."
+        ),
+        blank=True,
+        null=True,
+        validators=[validate_blueprint],
+    )
+
     date_added = models.DateTimeField(_("Data de Criação"), auto_now_add=True)
 
     def save(self, force_insert=False, force_update=False, *args, **kwargs):
@@ -172,7 +260,7 @@ class Quiz(models.Model):
         return self.title
 
     def get_questions(self):
-        return self.question_set.all().select_subclasses()
+        return self.question_set.all().select_related("category").select_subclasses()
 
     @property
     def get_max_score(self):
@@ -239,6 +327,24 @@ class Question(models.Model):
         blank=True,
     )
 
+    # Identifica o enunciado, usado para não importar a mesma questão
+    # duas vezes (veja importer.py)
+    content_hash = models.CharField(
+        max_length=64, blank=True, db_index=True, editable=False
+    )
+
+    @staticmethod
+    def make_content_hash(content):
+        normalized = " ".join(content.split()).casefold()
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.content_hash = self.make_content_hash(self.content)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "content" in update_fields:
+            kwargs["update_fields"] = set(update_fields) | {"content_hash"}
+        super(Question, self).save(*args, **kwargs)
+
     def get_question(self, question_id):
         if type(self.question_id) is int:
             return Question.objects.get_subclass(id=self.question_id)
@@ -252,19 +358,21 @@ class Question(models.Model):
             )
 
     def get_random_question(self):
-        size = Question.objects.count()
-        random_question = None
-
-        while not isinstance(random_question, Question):
-            random_id = random.randint(1, size)
-            try:
-                random_question = (
-                    Question.objects.filter(id=random_id).select_subclasses().first()
-                )
-            except Question.DoesNotExist:
-                pass
-
-        return random_question
+        """
+        Sorteia um id entre o menor e o maior existentes e retorna a primeira
+        questão a partir dele, usando o índice da chave primária.
+        """
+        bounds = Question.objects.aggregate(low=models.Min("id"), high=models.Max("id"))
+        if bounds["low"] is None:
+            return None
+
+        random_id = randint(bounds["low"], bounds["high"])
+        return (
+            Question.objects.filter(id__gte=random_id)
+            .order_by("id")
+            .select_subclasses()
+            .first()
+        )
 
     @abstractmethod
     def check_answer(self, guess):
@@ -294,38 +402,47 @@ class MultiChoiceQuestion(Question):
     Classe para questões de múltipla escolha
     """
 
-    def check_answer(self, guess):
+    def _answers(self):
+        # Usa as alternativas carregadas por <prefetch_answers>, se houver
+        return self.answer_set.all()
+
+    def _get_answer(self, guess):
         try:
             guess = int(guess)
-            return Answer.objects.get(id=guess).is_correct
-        except:
+        except (TypeError, ValueError):
+            return None
+        for answer in self._answers():
+            if answer.id == guess:
+                return answer
+        return None
+
+    def check_answer(self, guess):
+        answer = self._get_answer(guess)
+        if answer is None:
             raise TypeError(_("guess deve ser um <int> e não {0}".format(guess)))
+        return answer.is_correct
 
     def _randomize_order(self, queryset):
         return queryset.order_by("?")
 
     def get_correct_answer(self):
-        return Answer.objects.filter(question=self, is_correct=True)
+        return self.answer_set.filter(is_correct=True)
 
     def get_answer_list(self):
-        return [
-            (answer.id, answer.content)
-            for answer in list(Answer.objects.filter(question=self))
-        ]
+        return [(answer.id, answer.content) for answer in self._answers()]
 
     def get_answer_list_with_correct(self):
         return [
-            (answer.id, answer.content, answer.is_correct)
-            for answer in list(Answer.objects.filter(question=self))
+            (answer.id, answer.content, answer.is_correct) for answer in self._answers()
         ]
 
     def answer_choice_to_string(self, guess):
-        try:
-            return Answer.objects.get(id=int(guess)).content
-        except:
+        answer = self._get_answer(guess)
+        if answer is None:
             raise TypeError(
                 _("guess deve ser do tipo <int>, e não {0}".format(type(guess)))
             )
+        return answer.content
 
     class Meta:
         verbose_name = _("Questão de Múltipla Escolha")
@@ -335,6 +452,27 @@ class MultiChoiceQuestion(Question):
         return self.content[:20]
 
 
+TRUE_FALSE_LABELS = {True: "Verdadeiro", False: "Falso"}
+
+TRUE_FALSE_GUESSES = {"1": True, "true": True, "0": False, "false": False}
+
+
+def true_false_guess(guess):
+    """
+    Converts the answer to a true or false question to a bool. The form
+    sends "1" or "0" (see ``get_answer_list``) and older attempts stored
+    "True" or "False". Raises TypeError for anything else.
+    """
+    if isinstance(guess, bool):
+        return guess
+    try:
+        return TRUE_FALSE_GUESSES[str(guess).strip().lower()]
+    except KeyError:
+        raise TypeError(
+            _("Resposta inválida para verdadeiro ou falso: {0}".format(guess))
+        )
+
+
 class TrueFalseQuestion(Question):
     """
     Classe para questões de verdadeiro ou false,
@@ -351,10 +489,7 @@ class TrueFalseQuestion(Question):
     )
 
     def check_answer(self, guess):
-        if guess == self.is_correct:
-            return True
-        else:
-            return False
+        return true_false_guess(guess) == self.is_correct
 
     def get_answer_list(self):
         return [(1, "Verdadeiro"), (0, "Falso")]
@@ -370,7 +505,7 @@ class TrueFalseQuestion(Question):
         return self.is_correct
 
     def answer_choice_to_string(self, guess):
-        return str(guess is True)
+        return TRUE_FALSE_LABELS[true_false_guess(guess)]
 
     class Meta:
         verbose_name = _("Questão de Verdadeiro ou Falso")
@@ -412,14 +547,44 @@ class Answer(models.Model):
         return self.content + ": " + str(self.is_correct)
 
 
-class AttemptManager(models.Manager):
-    def new_attempt(self, user, quiz):
-        if quiz.random_order is True:
-            question_set = quiz.question_set.all().select_subclasses().order_by("?")
-        else:
-            question_set = quiz.question_set.all().select_subclasses()
+def prefetch_answers(questions):
+    """
+    Loads, in a single query, the answers of the multiple choice questions
+    among ``questions`` (already cast to their subclasses), so that
+    ``check_answer``, ``get_answer_list`` and the other answer methods stop
+    querying the database. Returns ``questions``.
+    """
+    prefetch_related_objects(
+        [q for q in questions if isinstance(q, MultiChoiceQuestion)],
+        Prefetch("answer_set", queryset=Answer.objects.order_by("id")),
+    )
+    return questions
 
-        question_set = [item.id for item in question_set]
+
+def percent_correct(score, max_score):
+    """
+    Percentage (0 to 100) of ``max_score`` represented by ``score``.
+    """
+    if max_score < 1:
+        return 0  # prevent divide by zero error
+
+    if score > max_score:
+        return 100
+
+    return max(int(round((float(score) / max_score) * 100)), 0)
+
+
+class AttemptManager(models.Manager):
+    def new_attempt(self, user, quiz, seed=None):
+        # ``quiz`` pode ser um <Quiz> ou um <QuizSnapshot>, ambos expõem
+        # ``get_questions`` e os mesmos atributos de configuração
+        question_set = select_questions(
+            build_pool(quiz.get_questions()),
+            blueprint=quiz.blueprint,
+            max_questions=quiz.max_questions,
+            random_order=quiz.random_order is True,
+            seed=seed,
+        )
 
         if len(question_set) == 0:
             raise ImproperlyConfigured(
@@ -427,52 +592,140 @@ class AttemptManager(models.Manager):
                 "Please configure questions properly"
             )
 
-        if quiz.max_questions and quiz.max_questions < len(question_set):
-            question_set = question_set[: quiz.max_questions]
-
-        questions = ",".join(map(str, question_set)) + ","
-
         new_attempt = self.create(
             user=user,
-            quiz=quiz,
-            question_order=questions,
-            question_list=questions,
-            incorrect_questions="",
+            quiz_id=quiz.id,
+            max_score=len(question_set),
             current_score=0,
             complete=False,
-            user_answers="{}",
         )
+        AttemptResponse.objects.bulk_create(
+            AttemptResponse(attempt=new_attempt, position=position, question_id=qid)
+            for position, qid in enumerate(question_set)
+        )
+        if quiz.store_result:
+            # Fora da transação da requisição, para que um pico de inícios
+            # não enfileire no lock da linha de estatísticas do questionário
+            transaction.on_commit(
+                partial(QuizStats.objects.add, {quiz.id: {"attempts": 1}})
+            )
         return new_attempt
 
+    def with_archive(self):
+        """
+        Live and archived attempts together, as a <MergedQuerySet> that
+        accepts the same filters, ordering and keyset pagination. Only
+        completed attempts are ever archived.
+        """
+        return MergedQuerySet(self.all(), ArchivedAttempt.objects.all())
+
     def user_attempt(self, user, quiz):
+        """
+        Returns the attempt in progress of ``user`` at ``quiz``, creating it
+        if there is none, or False if the quiz allows a single attempt and
+        the user already completed it.
+
+        Looking for both among the live attempts takes a single query;
+        before creating an attempt, a single attempt quiz also looks for a
+        completed one in the archive. Concurrent requests cannot create two
+        attempts in progress: the unique index
+        quiz_attempt_in_progress_uniq rejects the second, which then reads
+        the attempt created by the first.
+        """
+        attempts = self.filter(user=user, quiz_id=quiz.id)
+        if quiz.single_attempt is not True:
+            attempts = attempts.filter(complete=False)
+        # Com single_attempt, uma concluída vem antes da em andamento
+        attempt = attempts.order_by("-complete").first()
+        if attempt is not None:
+            return False if attempt.complete else attempt
         if (
             quiz.single_attempt is True
-            and self.filter(user=user, quiz=quiz, complete=True).exists()
+            and ArchivedAttempt.objects.filter(user=user, quiz_id=quiz.id).exists()
         ):
-
             return False
 
         try:
-            attempt = self.get(user=user, quiz=quiz, complete=False)
-        except Attempt.DoesNotExist:
-            attempt = self.new_attempt(user, quiz)
-        except Attempt.MultipleObjectsReturned:
-            attempt = self.filter(user=user, quiz=quiz, complete=False)[0]
-        return attempt
+            with transaction.atomic():
+                return self.new_attempt(user, quiz)
+        except IntegrityError:
+            return self.get(user=user, quiz_id=quiz.id, complete=False)
 
 
-class Attempt(models.Model):
+class AttemptResultMixin:
+    """
+    Results of an attempt, shared by <Attempt> and <ArchivedAttempt>.
+    """
+
+    @property
+    def get_current_score(self):
+        return self.current_score
+
+    @property
+    def get_max_score(self):
+        return self.max_score
+
+    @property
+    def get_percent_correct(self):
+        return percent_correct(self.current_score, self.max_score)
+
+    @property
+    def check_if_passed(self):
+        return self.get_percent_correct >= self.quiz.pass_mark
+
+    @property
+    def result_message(self):
+        if self.check_if_passed:
+            return self.quiz.success_text
+        else:
+            return self.quiz.fail_text
+
+    def _load_questions(self, responses, with_answers, snapshot):
+        """
+        Questions of ``responses``, a list of (question pk, answer) in
+        order, from the snapshot if given or else from the database.
+        """
+        question_ids = [question_id for question_id, _ in responses]
+        user_answers = dict(responses)
+
+        if snapshot is not None:
+            questions = snapshot.get_questions(question_ids)
+            if with_answers:
+                questions = [
+                    question.with_user_answer(user_answers[question.id])
+                    for question in questions
+                ]
+            return questions
+
+        positions = {question_id: i for i, question_id in enumerate(question_ids)}
+        questions = sorted(
+            Question.objects.filter(quiz=self.quiz_id, id__in=question_ids)
+            .select_related("category")
+            .select_subclasses(),
+            key=lambda q: positions[q.id],
+        )
+        prefetch_answers(questions)
+
+        if with_answers:
+            for question in questions:
+                question.user_answer = user_answers[question.id]
+
+        return questions
+
+    @property
+    def questions_with_user_answers(self):
+        return {q: q.user_answer for q in self.get_questions(with_answers=True)}
+
+
+class Attempt(AttemptResultMixin, models.Model):
     """
     Used to store the progress of logged in users attempt a quiz.
     Replaces the session system used by anon users.
-    Question_order is a list of integer pks of all the questions in the
-    quiz, in order.
-    Question_list is a list of integers which represent id's of
-    the unanswered questions in csv format.
-    Incorrect_questions is a list in the same format.
-    Attempt deleted when quiz finished unless quiz.exam_paper is true.
-    User_answers is a json object in which the question PK is stored
-    with the answer the user gave.
+    The questions of the attempt, in order, are stored as <AttemptResponse>
+    rows, one per question, holding the answer the user gave and whether
+    it was correct. A row without ``answered_at`` is still unanswered.
+    Max_score is the number of questions of the attempt.
+    Attempt deleted when quiz finished unless quiz.store_result is true.
     """
 
     user = models.ForeignKey(
@@ -481,24 +734,7 @@ class Attempt(models.Model):
 
     quiz = models.ForeignKey(Quiz, verbose_name=_("Quiz"), on_delete=models.CASCADE)
 
-    question_order = models.CharField(
-        validators=[validate_comma_separated_integer_list],
-        max_length=1024,
-        verbose_name=_("Question Order"),
-    )
-
-    question_list = models.CharField(
-        validators=[validate_comma_separated_integer_list],
-        max_length=1024,
-        verbose_name=_("Question List"),
-    )
-
-    incorrect_questions = models.CharField(
-        validators=[validate_comma_separated_integer_list],
-        max_length=1024,
-        blank=True,
-        verbose_name=_("Incorrect questions"),
-    )
+    max_score = models.PositiveIntegerField(default=0, verbose_name=_("Max Score"))
 
     current_score = models.IntegerField(verbose_name=_("Current Score"))
 
@@ -506,10 +742,6 @@ class Attempt(models.Model):
         default=False, blank=False, verbose_name=_("Complete")
     )
 
-    user_answers = models.TextField(
-        blank=True, default="{}", verbose_name=_("User Answers")
-    )
-
     start = models.DateTimeField(auto_now_add=True, verbose_name=_("Start"))
 
     end = models.DateTimeField(null=True, blank=True, verbose_name=_("End"))
@@ -518,6 +750,37 @@ class Attempt(models.Model):
 
     class Meta:
         permissions = (("view_attempts", _("Can see completed exams.")),)
+        constraints = [
+            # Uma tentativa em andamento por usuário e questionário; também
+            # serve à busca de <AttemptManager.user_attempt>
+            models.UniqueConstraint(
+                fields=["user", "quiz"],
+                condition=Q(complete=False),
+                name="quiz_attempt_in_progress_uniq",
+            ),
+        ]
+        indexes = [
+            # Paginação por chave das tentativas concluídas (veja pagination.py)
+            models.Index(
+                fields=["user", "start", "id"],
+                condition=Q(complete=True),
+                name="quiz_attempt_user_done_idx",
+            ),
+            models.Index(
+                fields=["start", "id"],
+                condition=Q(complete=True),
+                name="quiz_attempt_done_idx",
+            ),
+        ]
+
+    def _pending_responses(self):
+        return self.responses.filter(answered_at__isnull=True).order_by("position")
+
+    def get_first_question_id(self):
+        """
+        Returns the pk of the next question, or None if there is none left.
+        """
+        return self._pending_responses().values_list("question_id", flat=True).first()
 
     def get_first_question(self):
         """
@@ -525,65 +788,142 @@ class Attempt(models.Model):
         If no question is found, returns False
         Does NOT remove the question from the front of the list.
         """
-        if not self.question_list:
+        question_id = self.get_first_question_id()
+        if question_id is None:
             return False
 
-        first, _ = self.question_list.split(",", 1)
-        question_id = int(first)
         return Question.objects.get_subclass(id=question_id)
 
-    def remove_first_question(self):
-        if not self.question_list:
-            return
-
-        _, others = self.question_list.split(",", 1)
-        self.question_list = others
-        self.save()
+    def get_unanswered_question_ids(self):
+        return list(self._pending_responses().values_list("question_id", flat=True))
 
     def add_to_score(self, points):
+        Attempt.objects.filter(pk=self.pk).update(
+            current_score=F("current_score") + int(points)
+        )
         self.current_score += int(points)
-        self.save()
-
-    @property
-    def get_current_score(self):
-        return self.current_score
 
     def _question_ids(self):
-        return [int(n) for n in self.question_order.split(",") if n]
+        return list(
+            self.responses.order_by("position").values_list("question_id", flat=True)
+        )
 
-    @property
-    def get_percent_correct(self):
-        dividend = float(self.current_score)
-        divisor = len(self._question_ids())
-        if divisor < 1:
-            return 0  # prevent divide by zero error
+    def mark_quiz_complete(self):
+        self._complete()
 
-        if dividend > divisor:
-            return 100
+    def _complete(self, **fields):
+        """
+        Completes the attempt with a conditional UPDATE, so the statistics
+        of the quiz and its questions and the leaderboards are updated only
+        once even if the attempt is completed twice. ``fields`` are saved
+        along.
+        """
+        self.complete = True
+        self.end = datetime.now(timezone.utc)
 
-        correct = int(round((dividend / divisor) * 100))
+        with transaction.atomic():
+            completed = Attempt.objects.filter(pk=self.pk, complete=False).update(
+                complete=True, end=self.end, **fields
+            )
+            if completed:
+                self._record_stats()
 
-        if correct >= 1:
-            return correct
-        else:
-            return 0
+    def _record_stats(self):
+        """
+        Queues the statistics and leaderboard updates of the completed
+        attempt for after the commit, outside the request transaction, so
+        a burst of completions does not queue on the lock of the stats row
+        of the quiz. Quizzes without store_result delete the attempt at the
+        end and the rebuild (see stats.py) never sees it, so they are left
+        out, as when the attempt is started.
+        """
+        if not self.quiz.store_result:
+            return
 
-    def mark_quiz_complete(self):
-        self.complete = True
-        self.end = datetime.now(timezone.utc)
-        self.save()
+        percent = self.get_percent_correct
+        responses = self.responses.filter(is_correct__isnull=False).values_list(
+            "question_id", "question__category_id", "is_correct"
+        )
+        question_stats = {}
+        category_scores = {}
+        for question_id, category_id, is_correct in responses:
+            question_stats[question_id] = {"seen": 1, "correct": int(is_correct)}
+            if is_correct and category_id:
+                category_scores[category_id] = category_scores.get(category_id, 0) + 1
+
+        transaction.on_commit(
+            partial(
+                QuizStats.objects.add,
+                {
+                    self.quiz_id: {
+                        "completed": 1,
+                        "passed": int(percent >= self.quiz.pass_mark),
+                        "score_sum": percent,
+                        "score_sq_sum": percent * percent,
+                    }
+                },
+            )
+        )
+        transaction.on_commit(partial(QuestionStats.objects.add, question_stats))
+        # Rankings no Redis (veja leaderboards.py)
+        transaction.on_commit(
+            partial(
+                record_attempt,
+                self.user_id,
+                self.quiz_id,
+                self.current_score,
+                percent,
+                category_scores,
+                self.end,
+            )
+        )
+
+    def _adjust_stats(self, question, points):
+        """
+        Applies to the statistics a correction of ``points`` made to a
+        completed attempt.
+        """
+        old = percent_correct(self.current_score - points, self.max_score)
+        new = self.get_percent_correct
+        pass_mark = self.quiz.pass_mark
+        QuizStats.objects.add(
+            {
+                self.quiz_id: {
+                    "passed": int(new >= pass_mark) - int(old >= pass_mark),
+                    "score_sum": new - old,
+                    "score_sq_sum": new * new - old * old,
+                }
+            }
+        )
+        QuestionStats.objects.add({question.id: {"correct": points}})
+
+    def record_answer(self, question, guess, is_correct):
+        """
+        Stores the answer given to ``question``: a single UPDATE on its
+        response row, plus an atomic increment of the score if correct.
+        Only an unanswered question is recorded, so a replayed or concurrent
+        POST does not score twice. Returns whether the answer was recorded.
+        """
+        recorded = self.responses.filter(
+            question_id=question.id, answered_at__isnull=True
+        ).update(
+            answer=str(guess),
+            is_correct=is_correct is True,
+            answered_at=datetime.now(timezone.utc),
+        )
+        if recorded == 1 and is_correct is True:
+            self.add_to_score(1)
+        return recorded == 1
 
     def add_incorrect_question(self, question):
         """
-        Adds uid of incorrect question to the list.
+        Marks the question as incorrect.
         The question object must be passed in.
         """
-        if len(self.incorrect_questions) > 0:
-            self.incorrect_questions += ","
-        self.incorrect_questions += str(question.id) + ","
+        self.responses.filter(question_id=question.id).update(is_correct=False)
         if self.complete:
             self.add_to_score(-1)
-        self.save()
+            self._adjust_stats(question, -1)
 
     @property
     def get_incorrect_questions(self):
@@ -591,67 +931,421 @@ class Attempt(models.Model):
         Returns a list of non empty integers, representing the pk of
         questions
         """
-        return [int(q) for q in self.incorrect_questions.split(",") if q]
+        return list(
+            self.responses.filter(is_correct=False)
+            .order_by("position")
+            .values_list("question_id", flat=True)
+        )
 
     def remove_incorrect_question(self, question):
-        current = self.get_incorrect_questions
-        current.remove(question.id)
-        self.incorrect_questions = ",".join(map(str, current))
+        self.responses.filter(question_id=question.id).update(is_correct=True)
         self.add_to_score(1)
-        self.save()
+        if self.complete:
+            self._adjust_stats(question, 1)
 
-    @property
-    def check_if_passed(self):
-        return self.get_percent_correct >= self.quiz.pass_mark
+    def get_user_answers(self):
+        """
+        Returns a dict in which the question pk is stored with the answer
+        the user gave.
+        """
+        return dict(
+            self.responses.filter(answered_at__isnull=False).values_list(
+                "question_id", "answer"
+            )
+        )
 
-    @property
-    def result_message(self):
-        if self.check_if_passed:
-            return self.quiz.success_text
-        else:
-            return self.quiz.fail_text
+    def grade_answers(self, questions, guesses):
+        """
+        Grades every question of the attempt in a single pass and completes
+        it.
+        ``questions`` are the attempt questions (usually from a
+        <QuizSnapshot>, which already holds the answer key) and ``guesses``
+        maps each question pk to the answer the user gave.
+        The response rows are written with one bulk update.
+        Returns a dict {category pk: [score, possible]} for
+        <Progress.update_scores>.
+        """
+        now = datetime.now(timezone.utc)
+        responses = {r.question_id: r for r in self._pending_responses()}
+        category_scores = {}
 
-    def add_user_answer(self, question, guess):
-        current = json.loads(self.user_answers)
-        current[question.id] = guess
-        self.user_answers = json.dumps(current)
-        self.save()
+        for question in questions:
+            response = responses.get(question.id)
+            if response is None:
+                continue
 
-    def get_questions(self, with_answers=False):
-        question_ids = self._question_ids()
-        questions = sorted(
-            self.quiz.question_set.filter(id__in=question_ids).select_subclasses(),
-            key=lambda q: question_ids.index(q.id),
-        )
+            guess = guesses.get(question.id)
+            is_correct = guess is not None and question.check_answer(guess) is True
 
-        if with_answers:
-            user_answers = json.loads(self.user_answers)
-            for question in questions:
-                question.user_answer = user_answers[str(question.id)]
+            if is_correct:
+                self.current_score += 1
 
-        return questions
+            response.answer = None if guess is None else str(guess)
+            response.is_correct = is_correct
+            response.answered_at = now
 
-    @property
-    def questions_with_user_answers(self):
-        return {q: q.user_answer for q in self.get_questions(with_answers=True)}
+            if question.category_id:
+                score = category_scores.setdefault(question.category_id, [0, 0])
+                score[0] += int(is_correct)
+                score[1] += 1
 
-    @property
-    def get_max_score(self):
-        return len(self._question_ids())
+        AttemptResponse.objects.bulk_update(
+            responses.values(), ["answer", "is_correct", "answered_at"]
+        )
+
+        self._complete(current_score=self.current_score)
+
+        return category_scores
+
+    def get_questions(self, with_answers=False, snapshot=None):
+        """
+        Returns the questions of the attempt, in order.
+        If a compiled <QuizSnapshot> is given, the questions are read from it
+        instead of the database.
+        """
+        responses = self.responses.order_by("position").values_list(
+            "question_id", "answer"
+        )
+        return self._load_questions(list(responses), with_answers, snapshot)
 
     def progress(self):
         """
         Returns the number of questions answered so far and the total number of
         questions.
         """
-        answered = len(json.loads(self.user_answers))
+        answered = self.responses.filter(answered_at__isnull=False).count()
         total = self.get_max_score
         return answered, total
 
 
+class AttemptResponse(models.Model):
+    """
+    One row per question of an <Attempt>, in the order they are presented.
+    Answer is the choice the user gave, as sent by the form, and
+    Is_correct is only set once the question is answered.
+    """
+
+    attempt = models.ForeignKey(
+        Attempt,
+        related_name="responses",
+        verbose_name=_("Attempt"),
+        on_delete=models.CASCADE,
+    )
+
+    position = models.PositiveIntegerField(verbose_name=_("Position"))
+
+    question = models.ForeignKey(
+        Question, verbose_name=_("Question"), on_delete=models.CASCADE
+    )
+
+    answer = models.CharField(
+        max_length=20, null=True, blank=True, verbose_name=_("Answer")
+    )
+
+    is_correct = models.BooleanField(null=True, verbose_name=_("Correct"))
+
+    answered_at = models.DateTimeField(
+        null=True, blank=True, verbose_name=_("Answered at")
+    )
+
+    class Meta:
+        verbose_name = _("Resposta da Tentativa")
+        verbose_name_plural = _("Respostas das Tentativas")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["attempt", "position"], name="quiz_response_position_uniq"
+            ),
+            models.UniqueConstraint(
+                fields=["attempt", "question"], name="quiz_response_question_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["attempt", "position"],
+                condition=models.Q(answered_at__isnull=True),
+                name="quiz_response_pending_idx",
+            ),
+            models.Index(
+                fields=["question", "is_correct"], name="quiz_response_question_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return "%s - %s" % (self.attempt_id, self.question_id)
+
+
+class ArchivedAttempt(AttemptResultMixin, models.Model):
+    """
+    A completed <Attempt> moved out of the live tables by
+    archive_attempts (see archive.py). It keeps the id and the columns of
+    the attempt, so the same filters work on both (see
+    <AttemptManager.with_archive>), and its responses compressed in
+    Responses_data, as a JSON list of
+    [position, question pk, answer, is_correct, answered_at].
+    """
+
+    id = models.IntegerField(primary_key=True, verbose_name=_("ID"))
+
+    user = models.ForeignKey(
+        get_user_model(),
+        related_name="archived_attempts",
+        verbose_name=_("User"),
+        on_delete=models.CASCADE,
+    )
+
+    quiz = models.ForeignKey(
+        Quiz,
+        related_name="archived_attempts",
+        verbose_name=_("Quiz"),
+        on_delete=models.CASCADE,
+    )
+
+    max_score = models.PositiveIntegerField(verbose_name=_("Max Score"))
+
+    current_score = models.IntegerField(verbose_name=_("Current Score"))
+
+    # Sempre verdadeiro: existe para que os filtros de <Attempt> valham aqui
+    complete = models.BooleanField(default=True, verbose_name=_("Complete"))
+
+    start = models.DateTimeField(verbose_name=_("Start"))
+
+    end = models.DateTimeField(verbose_name=_("End"))
+
+    responses_data = models.BinaryField(verbose_name=_("Responses"))
+
+    class Meta:
+        verbose_name = _("Tentativa Arquivada")
+        verbose_name_plural = _("Tentativas Arquivadas")
+        indexes = [
+            models.Index(
+                fields=["user", "start", "id"], name="quiz_archived_user_start_idx"
+            ),
+            models.Index(fields=["start", "id"], name="quiz_archived_start_idx"),
+        ]
+
+    def __str__(self):
+        return "%s - %s" % (self.user_id, self.quiz_id)
+
+    @staticmethod
+    def pack_responses(responses):
+        data = json.dumps(responses, separators=(",", ":"), cls=DjangoJSONEncoder)
+        return zlib.compress(data.encode("utf-8"), 9)
+
+    @staticmethod
+    def unpack_responses(data):
+        return json.loads(zlib.decompress(bytes(data)))
+
+    @cached_property
+    def responses_list(self):
+        return self.unpack_responses(self.responses_data)
+
+    def get_user_answers(self):
+        return {
+            question_id: answer
+            for _, question_id, answer, _, answered_at in self.responses_list
+            if answered_at is not None
+        }
+
+    @property
+    def get_incorrect_questions(self):
+        return [
+            question_id
+            for _, question_id, _, is_correct, _ in self.responses_list
+            if is_correct is False
+        ]
+
+    def get_questions(self, with_answers=False, snapshot=None):
+        responses = [
+            (question_id, answer)
+            for _, question_id, answer, _, _ in self.responses_list
+        ]
+        return self._load_questions(responses, with_answers, snapshot)
+
+    def progress(self):
+        answered = sum(1 for row in self.responses_list if row[4] is not None)
+        return answered, self.get_max_score
+
+
+class QuestionCalibration(models.Model):
+    """
+    Sufficient statistics of a question accumulated by the difficulty
+    recalibration (see calibration.py): how many times it was answered,
+    how many of those were correct, and the sum and sum of squares of the
+    abilities of the users who answered it.
+    P_value and Rasch_difficulty are the last estimates.
+    """
+
+    question = models.OneToOneField(
+        Question,
+        primary_key=True,
+        related_name="calibration",
+        verbose_name=_("Questão"),
+        on_delete=models.CASCADE,
+    )
+
+    seen = models.PositiveIntegerField(default=0, verbose_name=_("Respostas"))
+
+    correct = models.PositiveIntegerField(
+        default=0, verbose_name=_("Respostas Corretas")
+    )
+
+    ability_sum = models.FloatField(default=0)
+
+    ability_sq_sum = models.FloatField(default=0)
+
+    p_value = models.FloatField(null=True, blank=True, verbose_name=_("Valor p"))
+
+    rasch_difficulty = models.FloatField(
+        null=True, blank=True, verbose_name=_("Dificuldade (logits)")
+    )
+
+    class Meta:
+        verbose_name = _("Calibração da Questão")
+        verbose_name_plural = _("Calibrações das Questões")
+
+    def __str__(self):
+        return "%s: %s/%s" % (self.question_id, self.correct, self.seen)
+
+
+class CalibrationState(models.Model):
+    """
+    Watermark of an incremental job: the (end, id) of the last completed
+    <Attempt> already processed.
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+
+    last_end = models.DateTimeField(null=True, blank=True)
+
+    last_attempt_id = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return "%s: %s" % (self.name, self.last_end)
+
+
+class StatsManager(models.Manager):
+    def add(self, counts):
+        """
+        Adds ``counts`` ({pk: {field: delta}}) to the statistics rows with
+        F() expressions, creating the missing rows first. Rows that get the
+        same deltas are updated together, so the number of queries does
+        not grow with the number of rows.
+        """
+        counts = {
+            pk: {field: delta for field, delta in deltas.items() if delta}
+            for pk, deltas in counts.items()
+        }
+        counts = {pk: deltas for pk, deltas in counts.items() if deltas}
+        if not counts:
+            return
+
+        existing = set(self.filter(pk__in=counts).values_list("pk", flat=True))
+        missing = [self.model(pk=pk) for pk in counts if pk not in existing]
+        if missing:
+            self.bulk_create(missing, ignore_conflicts=True)
+
+        groups = {}
+        for pk, deltas in counts.items():
+            groups.setdefault(tuple(sorted(deltas.items())), []).append(pk)
+        for deltas, pks in groups.items():
+            self.filter(pk__in=pks).update(
+                **{field: F(field) + delta for field, delta in deltas}
+            )
+
+
+class QuizStats(models.Model):
+    """
+    Aggregated statistics of a quiz, kept up to date as attempts are
+    started and completed (see <Attempt.mark_quiz_complete>). The counts
+    are added after the commit, and only for quizzes that store results;
+    purged attempts are discounted.
+    The score of an attempt is its percentage of correct answers, so
+    attempts with a different number of questions can be compared.
+    Rebuilt from the attempts by the rebuild_quiz_stats command.
+    """
+
+    quiz = models.OneToOneField(
+        Quiz,
+        primary_key=True,
+        related_name="stats",
+        verbose_name=_("Questionário"),
+        on_delete=models.CASCADE,
+    )
+
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_("Tentativas"))
+
+    completed = models.PositiveIntegerField(default=0, verbose_name=_("Concluídas"))
+
+    passed = models.PositiveIntegerField(default=0, verbose_name=_("Aprovações"))
+
+    score_sum = models.BigIntegerField(default=0)
+
+    score_sq_sum = models.BigIntegerField(default=0)
+
+    objects = StatsManager()
+
+    class Meta:
+        verbose_name = _("Estatísticas do Questionário")
+        verbose_name_plural = _("Estatísticas dos Questionários")
+
+    def __str__(self):
+        return "%s: %s/%s" % (self.quiz_id, self.completed, self.attempts)
+
+    @property
+    def mean_score(self):
+        if not self.completed:
+            return None
+        return self.score_sum / self.completed
+
+    @property
+    def score_stddev(self):
+        if not self.completed:
+            return None
+        variance = self.score_sq_sum / self.completed - self.mean_score**2
+        return max(variance, 0) ** 0.5
+
+    @property
+    def pass_rate(self):
+        return percent_correct(self.passed, self.completed)
+
+
+class QuestionStats(models.Model):
+    """
+    How many times a question was answered in completed attempts, and how
+    many of those answers were correct.
+    """
+
+    question = models.OneToOneField(
+        Question,
+        primary_key=True,
+        related_name="stats",
+        verbose_name=_("Questão"),
+        on_delete=models.CASCADE,
+    )
+
+    seen = models.PositiveIntegerField(default=0, verbose_name=_("Respostas"))
+
+    correct = models.PositiveIntegerField(
+        default=0, verbose_name=_("Respostas Corretas")
+    )
+
+    objects = StatsManager()
+
+    class Meta:
+        verbose_name = _("Estatísticas da Questão")
+        verbose_name_plural = _("Estatísticas das Questões")
+
+    def __str__(self):
+        return "%s: %s/%s" % (self.question_id, self.correct, self.seen)
+
+    @property
+    def percent_correct(self):
+        return percent_correct(self.correct, self.seen)
+
+
 class ProgressManager(models.Manager):
     def new_progress(self, user):
-        new_progress = self.create(user=user, score="")
+        new_progress = self.create(user=user)
         new_progress.save()
         return new_progress
 
@@ -661,12 +1355,6 @@ class Progress(models.Model):
         get_user_model(), verbose_name=_("Usuário"), on_delete=models.CASCADE
     )
 
-    score = models.CharField(
-        validators=[validate_comma_separated_integer_list],
-        max_length=1024,
-        verbose_name=_("Pontuação"),
-    )
-
     quiz = models.ForeignKey(
         Quiz, verbose_name=_("Questionário"), on_delete=models.CASCADE, null=True
     )
@@ -695,43 +1383,26 @@ class Progress(models.Model):
         the third is the percentage correct.
         The dict will have one key for every category that you have defined
         """
-        score_before = self.score
         output = {}
 
-        for cat in Category.objects.all():
-            to_find = re.escape(cat.category) + r",(\d+),(\d+),"
-            #  group 1 is score, group 2 is highest possible
-
-            match = re.search(to_find, self.score, re.IGNORECASE)
-
-            if match:
-                score = int(match.group(1))
-                possible = int(match.group(2))
-
-                try:
-                    percent = int(round((float(score) / float(possible)) * 100))
-                except:
-                    percent = 0
-
-                output[cat.category] = [score, possible, percent]
-
-            else:
-                self.score += cat.category + ",0,0,"
-                output[cat.category] = [0, 0]
+        for category, score, possible in ProgressCategoryScore.objects.for_user(
+            self.user_id
+        ):
+            try:
+                percent = int(round((float(score) / float(possible)) * 100))
+            except (TypeError, ZeroDivisionError):
+                percent = 0
 
-        if len(self.score) > len(score_before):
-            self.save()
+            output[category] = [score or 0, possible or 0, percent]
 
         return output
 
     def update_score(self, question, score_to_add=0, possible_to_add=0):
-        category_test = Category.objects.filter(category=question.category).exists()
-
         if any(
             [
                 item is False
                 for item in [
-                    category_test,
+                    question.category_id is not None,
                     score_to_add,
                     possible_to_add,
                     isinstance(score_to_add, int),
@@ -741,31 +1412,115 @@ class Progress(models.Model):
         ):
             return _("error"), _("A categoria não existe ou a pontuação está incorreta")
 
-        to_find = (
-            re.escape(str(question.category)) + r",(?P<score>\d+),(?P<possible>\d+),"
+        self.update_scores(
+            {question.category_id: [abs(score_to_add), abs(possible_to_add)]}
         )
 
-        match = re.search(to_find, self.score, re.IGNORECASE)
+    def update_scores(self, category_scores):
+        """
+        Applies several category scores at once.
+        ``category_scores`` is a dict {category pk: [score, possible]}.
+        """
+        ProgressCategoryScore.objects.add_scores(self.user_id, category_scores)
 
-        if match:
-            updated_score = int(match.group("score")) + abs(score_to_add)
-            updated_possible = int(match.group("possible")) + abs(possible_to_add)
+    def show_exams(self):
+        return (
+            Attempt.objects.with_archive()
+            .filter(user_id=self.user_id, complete=True)
+            .select_related("quiz")
+            .order_by("-start", "-id")
+        )
 
-            new_score = ",".join(
-                [str(question.category), str(updated_score), str(updated_possible), ""]
-            )
+    def __str__(self):
+        return self.user.username
 
-            self.score = self.score.replace(match.group(), new_score)
-            self.save()
 
-        else:
-            self.score += ",".join(
-                [str(question.category), str(score_to_add), str(possible_to_add), ""]
+class ProgressCategoryScoreManager(models.Manager):
+    def for_user(self, user_id):
+        """
+        Returns (category, correct, possible) for every category, in one
+        query: categories without a score for the user come with None.
+        """
+        return (
+            Category.objects.annotate(
+                user_score=FilteredRelation(
+                    "progresscategoryscore",
+                    condition=Q(progresscategoryscore__user_id=user_id),
+                )
             )
-            self.save()
+            .order_by("category")
+            .values_list("category", "user_score__correct", "user_score__possible")
+        )
 
-    def show_exams(self):
-        return Attempt.objects.filter(user=self.user, complete=True).order_by("-start")
+    def add_scores(self, user_id, category_scores):
+        """
+        Adds ``category_scores`` ({category pk: [score, possible]}) to the
+        user's totals with F() expressions, so concurrent requests never
+        overwrite each other. Rows that do not exist yet are created with
+        ``ignore_conflicts`` (in case another request creates them
+        meanwhile) and updated again.
+        """
+        missing = {}
+        for category_id, (score, possible) in category_scores.items():
+            if category_id is None:
+                continue
+            if not self._increment(user_id, category_id, score, possible):
+                missing[category_id] = (score, possible)
+
+        if missing:
+            self.bulk_create(
+                [self.model(user_id=user_id, category_id=cid) for cid in missing],
+                ignore_conflicts=True,
+            )
+            for category_id, (score, possible) in missing.items():
+                self._increment(user_id, category_id, score, possible)
+
+    def _increment(self, user_id, category_id, score, possible):
+        return self.filter(user_id=user_id, category_id=category_id).update(
+            correct=F("correct") + score, possible=F("possible") + possible
+        )
+
+
+class ProgressCategoryScore(models.Model):
+    """
+    Score of a user in one category: questions answered correctly and
+    questions answered.
+    """
+
+    user = models.ForeignKey(
+        get_user_model(),
+        related_name="category_scores",
+        verbose_name=_("Usuário"),
+        on_delete=models.CASCADE,
+    )
+
+    category = models.ForeignKey(
+        Category, verbose_name=_("Categoria"), on_delete=models.CASCADE
+    )
+
+    correct = models.PositiveIntegerField(
+        default=0, verbose_name=_("Respostas Corretas")
+    )
+
+    possible = models.PositiveIntegerField(
+        default=0, verbose_name=_("Pontuação Possível")
+    )
+
+    objects = ProgressCategoryScoreManager()
+
+    class Meta:
+        verbose_name = _("Pontuação por Categoria")
+        verbose_name_plural = _("Pontuações por Categoria")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "category"], name="quiz_progress_category_uniq"
+            ),
+        ]
 
     def __str__(self):
-        return self.user.username + " - " + self.score
+        return "%s - %s: %s/%s" % (
+            self.user_id,
+            self.category_id,
+            self.correct,
+            self.possible,
+        )
@@ -0,0 +1,190 @@
+"""
+Paginação por chave (keyset) das listas de tentativas.
+
+Em vez de ``OFFSET`` e ``COUNT(*)``, cada página guarda um cursor com os
+valores da ordenação do seu primeiro e do seu último item, e a página
+seguinte é buscada com ``WHERE (start, id) < cursor``. Com um índice na
+mesma ordem, qualquer página custa o mesmo que a primeira.
+
+A ordenação deve terminar num campo único (normalmente ``id``) e todos os
+campos devem ter a mesma direção. O total de itens é opcional e
+aproximado: fica em cache por alguns minutos.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+COUNT_TIMEOUT = 60 * 5
+
+
+class KeysetPage:
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return "<KeysetPage of %s items>" % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0])
+
+
+class KeysetPaginator:
+    """
+    Pagina ``queryset`` pela ``ordering``, ``per_page`` itens por página.
+    Com ``count_cache_key``, ``count`` devolve o total guardado em cache.
+    """
+
+    def __init__(
+        self,
+        queryset,
+        per_page,
+        ordering=("-start", "-id"),
+        count_cache_key=None,
+        count_timeout=COUNT_TIMEOUT,
+    ):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip("-") for name in self.ordering]
+        self.descending = self.ordering[0].startswith("-")
+        self.count_cache_key = count_cache_key
+        self.count_timeout = count_timeout
+
+    @cached_property
+    def count(self):
+        if self.count_cache_key is None:
+            return None
+        return cache.get_or_set(
+            self.count_cache_key, self.queryset.count, self.count_timeout
+        )
+
+    def encode_cursor(self, obj):
+        values = [getattr(obj, name) for name in self.fields]
+        values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+        data = json.dumps(values).encode("utf-8")
+        return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, cursor):
+        """
+        Retorna os valores guardados no cursor, ou None se ele for inválido.
+        """
+        if not cursor:
+            return None
+        try:
+            data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            values = json.loads(data.decode("utf-8"))
+            if not isinstance(values, list) or len(values) != len(self.fields):
+                return None
+            opts = self.queryset.model._meta
+            values = [
+                opts.get_field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            return None
+        if any(value is None for value in values):
+            return None
+        return values
+
+    def _beyond(self, values, backwards):
+        """
+        Filtro dos itens que vêm depois de ``values`` na ordenação (antes,
+        se ``backwards``).
+        """
+        lookup = "lt" if self.descending != backwards else "gt"
+        condition = Q()
+        equal = {}
+        for name, value in zip(self.fields, values):
+            condition |= Q(**equal, **{"%s__%s" % (name, lookup): value})
+            equal[name] = value
+        return condition
+
+    def page(self, after=None, before=None):
+        """
+        Página seguinte ao cursor ``after`` ou anterior ao cursor
+        ``before``. Sem cursor válido, retorna a primeira página.
+        """
+        backwards = False
+        values = self.decode_cursor(after)
+        if values is None:
+            values = self.decode_cursor(before)
+            backwards = values is not None
+
+        queryset = self.queryset.order_by(*self.ordering)
+        if values is not None:
+            queryset = queryset.filter(self._beyond(values, backwards))
+        if backwards:
+            queryset = queryset.reverse()
+
+        items = list(queryset[: self.per_page + 1])
+        more = len(items) > self.per_page
+        items = items[: self.per_page]
+
+        if backwards:
+            items.reverse()
+            return KeysetPage(items, self, has_next=True, has_previous=more)
+        return KeysetPage(items, self, has_next=more, has_previous=values is not None)
+
+    def page_from_request(self, request):
+        return self.page(
+            after=request.GET.get("after"), before=request.GET.get("before")
+        )
+
+
+class KeysetPaginationMixin:
+    """
+    Troca a paginação de uma ListView pela paginação por chave. Os cursores
+    vêm dos parâmetros ``after`` e ``before``.
+    """
+
+    paginate_by = 50
+    keyset_ordering = ("-start", "-id")
+
+    def get_count_cache_key(self):
+        return None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(
+            queryset,
+            page_size,
+            ordering=self.keyset_ordering,
+            count_cache_key=self.get_count_cache_key(),
+        )
+        page = paginator.page_from_request(self.request)
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,85 @@
+"""
+Busca textual de questões e questionários.
+
+No PostgreSQL, as tabelas de questões e de questionários têm uma coluna
+``search_vector`` (tsvector gerado em português, sem acentos, com peso A
+para o enunciado ou título e B para a explicação ou descrição), com índice
+GIN, e índices de trigramas sobre o texto sem acentos para encontrar
+palavras com erros de digitação. Veja a migração ``0016_search_indexes``.
+
+A busca combina as duas coisas: casa a consulta com o tsvector
+(``websearch_to_tsquery``, que aceita "frases", OR e -exclusão) ou, por
+similaridade de palavras, com o texto; o resultado é ordenado pela soma do
+``ts_rank`` com a similaridade.
+
+Nos demais bancos (SQLite, nos testes e no desenvolvimento) a busca usa
+``icontains``.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db import connections
+from django.db.models import Q
+
+from .models import Question, Quiz
+
+CONFIG = "portuguese"
+
+QUESTION_FIELDS = ("content", "explanation")
+QUIZ_FIELDS = ("title", "description")
+
+
+def _is_postgres(queryset):
+    return connections[queryset.db].vendor == "postgresql"
+
+
+def _full_text(queryset, table, text_column, query):
+    vector = '"%s"."search_vector"' % table
+    text = 'quiz_unaccent("%s"."%s")' % (table, text_column)
+    tsquery = "websearch_to_tsquery('%s', quiz_unaccent(%%s))" % CONFIG
+
+    # Em ``extra`` o % do operador de similaridade precisa ser duplicado
+    return queryset.extra(
+        select={
+            "search_rank": "ts_rank(%s, %s) + word_similarity(quiz_unaccent(%%s), %s)"
+            % (vector, tsquery, text)
+        },
+        select_params=[query, query],
+        where=["(%s @@ %s OR quiz_unaccent(%%s) <%%%% %s)" % (vector, tsquery, text)],
+        params=[query, query],
+        order_by=["-search_rank"],
+    )
+
+
+def _contains(queryset, fields, query):
+    return queryset.filter(
+        reduce(or_, (Q(**{"%s__icontains" % field: query}) for field in fields))
+    )
+
+
+def search_questions(queryset, query):
+    """
+    Filtra ``queryset`` (de <Question> ou de uma subclasse) pelas questões
+    que casam com ``query``, as mais relevantes primeiro.
+    """
+    query = query.strip()
+    if not query:
+        return queryset
+    if not _is_postgres(queryset):
+        return _contains(queryset, QUESTION_FIELDS, query)
+
+    # As subclasses (herança multi-tabela) já fazem JOIN com a tabela base
+    return _full_text(queryset, Question._meta.db_table, "content", query)
+
+
+def search_quizzes(queryset, query):
+    """
+    Filtra ``queryset`` de <Quiz> pelos questionários que casam com
+    ``query``, os mais relevantes primeiro.
+    """
+    query = query.strip()
+    if not query:
+        return queryset
+    if not _is_postgres(queryset):
+        return _contains(queryset, QUIZ_FIELDS, query)
+    return _full_text(queryset, Quiz._meta.db_table, "title", query)
@@ -0,0 +1,153 @@
+"""
+Seleção das questões de uma tentativa.
+
+As questões são sorteadas em Python, a partir do conjunto de questões já
+compilado do questionário (veja ``snapshots.py``), sem ``ORDER BY RANDOM()``
+no banco. O sorteio é sem reposição e aceita uma semente, de modo que a
+mesma semente gera sempre a mesma tentativa.
+
+Um questionário pode definir um *blueprint*: uma lista de regras, cada uma
+com quantas questões devem ser sorteadas de uma categoria e de uma faixa de
+dificuldade. Exemplo::
+
+    [
+        {"category": "registro", "difficulty": [1, 2], "count": 3},
+        {"category": "notas", "difficulty": 5, "count": 1},
+        {"count": 2},
+    ]
+
+Chaves ausentes aceitam qualquer valor. As regras são aplicadas em ordem e
+uma questão nunca é sorteada duas vezes.
+"""
+from collections import namedtuple
+from random import Random
+
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+
+PoolItem = namedtuple("PoolItem", ["id", "category_id", "category", "difficulty"])
+
+RULE_KEYS = {"category", "difficulty", "count"}
+
+
+def build_pool(questions):
+    """
+    Monta o conjunto sorteável a partir de questões do banco ou de um
+    <QuizSnapshot>, mantendo a ordem original.
+    """
+    return [
+        PoolItem(
+            question.id,
+            question.category_id,
+            str(question.category).lower() if question.category else None,
+            question.difficulty,
+        )
+        for question in questions
+    ]
+
+
+def _is_int(value):
+    # bool é subclasse de int, mas true não é uma quantidade
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _difficulty_band(difficulty):
+    if difficulty is None:
+        return None
+    if isinstance(difficulty, int):
+        return difficulty, difficulty
+    low, high = difficulty
+    return low, high
+
+
+def _matches(item, rule):
+    category = rule.get("category")
+    if category is not None:
+        if isinstance(category, int):
+            if item.category_id != category:
+                return False
+        elif item.category != str(category).lower():
+            return False
+
+    band = _difficulty_band(rule.get("difficulty"))
+    if band is not None and not band[0] <= item.difficulty <= band[1]:
+        return False
+
+    return True
+
+
+def validate_blueprint(blueprint):
+    if blueprint in (None, ""):
+        return
+    if not isinstance(blueprint, list):
+        raise ValidationError(_("O blueprint deve ser uma lista de regras."))
+
+    for rule in blueprint:
+        if not isinstance(rule, dict) or not set(rule) <= RULE_KEYS:
+            raise ValidationError(_("Regra inválida: %(rule)s"), params={"rule": rule})
+
+        count = rule.get("count")
+        if not _is_int(count) or count < 1:
+            raise ValidationError(
+                _("'count' deve ser um inteiro positivo: %(rule)s"),
+                params={"rule": rule},
+            )
+
+        difficulty = rule.get("difficulty")
+        try:
+            band = _difficulty_band(difficulty)
+        except (TypeError, ValueError):
+            band = (0, 0)
+        if band is not None and not (
+            all(_is_int(d) for d in band) and 1 <= band[0] <= band[1] <= 5
+        ):
+            raise ValidationError(
+                _(
+                    "'difficulty' deve ser entre 1 e 5 ou uma faixa [min, max]: %(rule)s"
+                ),
+                params={"rule": rule},
+            )
+
+
+def select_questions(
+    pool, blueprint=None, max_questions=None, random_order=False, seed=None
+):
+    """
+    Retorna os ids das questões sorteadas do ``pool``.
+
+    Sem blueprint, todas as questões são usadas (embaralhadas se
+    ``random_order``). Com blueprint, cada regra sorteia ``count`` questões
+    entre as que ainda não foram escolhidas; regras sem questões suficientes
+    usam as que houver. O resultado é limitado a ``max_questions``.
+    """
+    rng = Random(seed)
+
+    if not blueprint:
+        if random_order:
+            limit = len(pool)
+            if max_questions:
+                limit = min(limit, max_questions)
+            return [item.id for item in rng.sample(pool, limit)]
+
+        selected = [item.id for item in pool]
+        return selected[:max_questions] if max_questions else selected
+
+    chosen = set()
+    selected = []
+    for rule in blueprint:
+        candidates = [
+            item for item in pool if item.id not in chosen and _matches(item, rule)
+        ]
+        drawn = rng.sample(candidates, min(rule["count"], len(candidates)))
+        chosen.update(item.id for item in drawn)
+        selected.extend(drawn)
+
+    if random_order:
+        rng.shuffle(selected)
+    else:
+        position = {item.id: i for i, item in enumerate(pool)}
+        selected.sort(key=lambda item: position[item.id])
+
+    if max_questions:
+        selected = selected[:max_questions]
+    return [item.id for item in selected]
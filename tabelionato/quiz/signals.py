@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import (
+    Answer,
+    Category,
+    MultiChoiceQuestion,
+    Question,
+    Quiz,
+    TrueFalseQuestion,
+)
+from .snapshots import invalidate_catalog, invalidate_quiz_snapshots
+
+QUESTION_MODELS = (Question, MultiChoiceQuestion, TrueFalseQuestion)
+
+
+def _invalidate_on_commit(quiz_ids):
+    quiz_ids = set(quiz_ids)
+    if quiz_ids:
+        transaction.on_commit(lambda: invalidate_quiz_snapshots(quiz_ids))
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(pre_delete, sender=Quiz)
+def quiz_changed(sender, instance, **kwargs):
+    _invalidate_on_commit([instance.pk])
+
+
+def question_changed(sender, instance, **kwargs):
+    _invalidate_on_commit(instance.quiz.values_list("id", flat=True))
+
+
+for model in QUESTION_MODELS:
+    post_save.connect(question_changed, sender=model)
+    pre_delete.connect(question_changed, sender=model)
+
+
+@receiver(post_save, sender=Answer)
+@receiver(pre_delete, sender=Answer)
+def answer_changed(sender, instance, **kwargs):
+    _invalidate_on_commit(
+        Quiz.objects.filter(question__id=instance.question_id).values_list(
+            "id", flat=True
+        )
+    )
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def category_changed(sender, instance, **kwargs):
+    # A lista de categorias muda mesmo sem questionários na categoria
+    transaction.on_commit(invalidate_catalog)
+    _invalidate_on_commit(
+        Quiz.objects.filter(Q(category=instance) | Q(question__category=instance))
+        .values_list("id", flat=True)
+        .distinct()
+    )
+
+
+@receiver(m2m_changed, sender=Question.quiz.through)
+def question_quiz_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # A alteração partiu do questionário: quiz.question_set.add(...)
+        if action.startswith("post_"):
+            _invalidate_on_commit([instance.pk])
+    elif action == "pre_clear":
+        _invalidate_on_commit(instance.quiz.values_list("id", flat=True))
+    elif action in ("post_add", "post_remove"):
+        _invalidate_on_commit(pk_set or ())
@@ -0,0 +1,437 @@
+"""
+Snapshots compilados dos questionários.
+
+Um <QuizSnapshot> é uma cópia imutável e versionada de um <Quiz>, com as
+questões em ordem, as alternativas e o gabarito. Ele é guardado no cache
+configurado em ``CACHES`` e servido às views de resolução e de resultado,
+que assim não precisam consultar questões e alternativas no banco.
+
+A versão de cada questionário é um token guardado no cache. Os sinais em
+``signals.py`` trocam esse token sempre que o questionário, suas questões,
+alternativas ou categorias mudam; snapshots de versões antigas deixam de
+ser lidos e expiram sozinhos. A versão do catálogo muda junto com a de
+qualquer questionário e com as categorias.
+
+As versões são o instante da mudança, em nanossegundos, e também servem
+de ETag e Last-Modified para as páginas do catálogo (veja views.py).
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+
+from .models import (
+    TRUE_FALSE_LABELS,
+    Answer,
+    MultiChoiceQuestion,
+    Quiz,
+    TrueFalseQuestion,
+    true_false_guess,
+)
+
+MULTI_CHOICE = "MultiChoiceQuestion"
+TRUE_FALSE = "TrueFalseQuestion"
+
+
+@dataclass(frozen=True)
+class AnswerSnapshot:
+    id: int
+    content: str
+    is_correct: bool
+
+    def __str__(self):
+        return self.content + ": " + str(self.is_correct)
+
+
+@dataclass(frozen=True)
+class QuestionSnapshot:
+    """
+    Questão compilada. Expõe a mesma interface de leitura de
+    <MultiChoiceQuestion> e <TrueFalseQuestion>, de modo que formulários
+    e templates funcionam com qualquer um dos dois.
+    """
+
+    id: int
+    kind: str
+    category: Optional[str]
+    category_id: Optional[int]
+    difficulty: int
+    content: str
+    explanation: str
+    answers: Tuple[AnswerSnapshot, ...] = ()
+    is_correct: Optional[bool] = None
+    user_answer: Any = None
+
+    @property
+    def pk(self):
+        return self.id
+
+    def with_user_answer(self, user_answer):
+        return replace(self, user_answer=user_answer)
+
+    def check_answer(self, guess):
+        if self.kind == TRUE_FALSE:
+            return true_false_guess(guess) == self.is_correct
+
+        try:
+            guess = int(guess)
+        except (TypeError, ValueError):
+            raise TypeError(_("guess deve ser um <int> e não {0}".format(guess)))
+        return any(a.id == guess and a.is_correct for a in self.answers)
+
+    def get_answer_list(self):
+        if self.kind == TRUE_FALSE:
+            return [(1, "Verdadeiro"), (0, "Falso")]
+        return [(answer.id, answer.content) for answer in self.answers]
+
+    def get_answer_list_with_correct(self):
+        if self.kind == TRUE_FALSE:
+            return [
+                (1, "Verdadeiro", self.is_correct),
+                (0, "Falso", not self.is_correct),
+            ]
+        return [(a.id, a.content, a.is_correct) for a in self.answers]
+
+    def get_correct_answer(self):
+        if self.kind == TRUE_FALSE:
+            return self.is_correct
+        return tuple(answer for answer in self.answers if answer.is_correct)
+
+    def answer_choice_to_string(self, guess):
+        if self.kind == TRUE_FALSE:
+            return TRUE_FALSE_LABELS[true_false_guess(guess)]
+
+        try:
+            guess = int(guess)
+        except (TypeError, ValueError):
+            raise TypeError(
+                _("guess deve ser do tipo <int>, e não {0}".format(type(guess)))
+            )
+        for answer in self.answers:
+            if answer.id == guess:
+                return answer.content
+        raise TypeError(_("A alternativa {0} não pertence à questão".format(guess)))
+
+    def __str__(self):
+        return self.content[:20]
+
+
+@dataclass(frozen=True)
+class QuizSnapshot:
+    """
+    Questionário compilado. Os atributos de configuração têm os mesmos
+    nomes dos campos de <Quiz>.
+    """
+
+    id: int
+    version: int
+    url: str
+    title: str
+    description: str
+    category: Optional[str]
+    category_id: Optional[int]
+    random_order: bool
+    max_questions: Optional[int]
+    answers_at_end: bool
+    store_result: bool
+    single_attempt: bool
+    pass_mark: int
+    success_text: str
+    fail_text: str
+    draft: bool
+    single_page: bool
+    blueprint: Optional[list]
+    questions: Tuple[QuestionSnapshot, ...] = ()
+    _by_id: Dict[int, QuestionSnapshot] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _answer_key: Dict[int, Any] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        object.__setattr__(self, "_by_id", {q.id: q for q in self.questions})
+        object.__setattr__(
+            self,
+            "_answer_key",
+            {
+                q.id: (
+                    q.is_correct
+                    if q.kind == TRUE_FALSE
+                    else frozenset(a.id for a in q.answers if a.is_correct)
+                )
+                for q in self.questions
+            },
+        )
+
+    def __getstate__(self):
+        # Os índices são refeitos ao carregar do cache
+        return {
+            k: v for k, v in self.__dict__.items() if k not in ("_by_id", "_answer_key")
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__post_init__()
+
+    def __str__(self):
+        return self.title
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def answer_key(self):
+        """
+        Dict com o gabarito: para cada questão, o conjunto de ids das
+        alternativas corretas ou o valor esperado (verdadeiro ou falso).
+        """
+        return self._answer_key
+
+    def check_answer(self, question_id, guess):
+        """
+        Corrige ``guess`` pelo gabarito, sem consultas. ``guess`` é o valor
+        enviado pelo formulário: o id da alternativa ou "1"/"0".
+        """
+        expected = self._answer_key[int(question_id)]
+        if isinstance(expected, bool):
+            return true_false_guess(guess) == expected
+        try:
+            return int(guess) in expected
+        except (TypeError, ValueError):
+            raise TypeError(_("guess deve ser um <int> e não {0}".format(guess)))
+
+    @property
+    def get_max_score(self):
+        return len(self.questions)
+
+    def get_question(self, question_id):
+        return self._by_id.get(int(question_id))
+
+    def get_questions(self, question_ids: Optional[Iterable[int]] = None):
+        """
+        Retorna as questões na ordem dos ids informados. Sem ids, retorna
+        todas as questões do questionário.
+        """
+        if question_ids is None:
+            return self.questions
+        return tuple(self._by_id[qid] for qid in question_ids if qid in self._by_id)
+
+
+def _timeout():
+    return getattr(settings, "QUIZ_SNAPSHOT_TIMEOUT", 60 * 60 * 24)
+
+
+def _version_key(quiz_id):
+    return "quiz:snapshot:version:%s" % quiz_id
+
+
+def _snapshot_key(quiz_id, version):
+    return "quiz:snapshot:%s:%s" % (quiz_id, version)
+
+
+def _url_key(url):
+    return "quiz:snapshot:url:%s" % url
+
+
+CATALOG_VERSION_KEY = "quiz:catalog:version"
+
+
+def _new_version():
+    return time.time_ns()
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        version = _new_version()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def get_snapshot_version(quiz_id):
+    return _get_version(_version_key(quiz_id))
+
+
+def get_catalog_version():
+    """
+    Versão do catálogo: muda sempre que algum questionário ou categoria
+    muda. Como as demais versões, é o instante da mudança em nanossegundos.
+    """
+    return _get_version(CATALOG_VERSION_KEY)
+
+
+def get_snapshot_version_by_url(url):
+    """
+    Versão do questionário do endereço ``url``, sem consultar o banco.
+    Retorna None se o endereço ainda não estiver no cache.
+    """
+    quiz_id = cache.get(_url_key(url))
+    if quiz_id is None:
+        return None
+    return get_snapshot_version(quiz_id)
+
+
+def invalidate_quiz_snapshots(quiz_ids):
+    """
+    Troca a versão dos questionários informados. Deve ser chamada depois
+    do commit das alterações, veja ``signals.py``.
+    """
+    version = _new_version()
+    versions = {_version_key(qid): version for qid in set(quiz_ids)}
+    versions[CATALOG_VERSION_KEY] = version
+    cache.set_many(versions, timeout=None)
+
+
+def invalidate_catalog():
+    cache.set(CATALOG_VERSION_KEY, _new_version(), timeout=None)
+
+
+def compile_quiz(quiz_id, version=0):
+    """
+    Monta o <QuizSnapshot> a partir do banco em três consultas: questionário,
+    questões (com subclasses) e alternativas. Retorna None se o questionário
+    não existir.
+    """
+    quiz = Quiz.objects.select_related("category").filter(id=quiz_id).first()
+    if quiz is None:
+        return None
+
+    questions = list(
+        quiz.question_set.select_related("category").select_subclasses().order_by("id")
+    )
+
+    answers = {}
+    multi_choice_ids = [q.id for q in questions if isinstance(q, MultiChoiceQuestion)]
+    if multi_choice_ids:
+        for answer in Answer.objects.filter(question_id__in=multi_choice_ids).order_by(
+            "id"
+        ):
+            answers.setdefault(answer.question_id, []).append(
+                AnswerSnapshot(
+                    id=answer.id, content=answer.content, is_correct=answer.is_correct
+                )
+            )
+
+    compiled = []
+    for question in questions:
+        is_true_false = isinstance(question, TrueFalseQuestion)
+        compiled.append(
+            QuestionSnapshot(
+                id=question.id,
+                kind=TRUE_FALSE if is_true_false else MULTI_CHOICE,
+                category=question.category.category if question.category else None,
+                category_id=question.category_id,
+                difficulty=question.difficulty,
+                content=question.content,
+                explanation=question.explanation,
+                answers=tuple(answers.get(question.id, ())),
+                is_correct=question.is_correct if is_true_false else None,
+            )
+        )
+
+    return QuizSnapshot(
+        id=quiz.id,
+        version=version,
+        url=quiz.url,
+        title=quiz.title,
+        description=quiz.description,
+        category=quiz.category.category if quiz.category else None,
+        category_id=quiz.category_id,
+        random_order=quiz.random_order,
+        max_questions=quiz.max_questions,
+        answers_at_end=quiz.answers_at_end,
+        store_result=quiz.store_result,
+        single_attempt=quiz.single_attempt,
+        pass_mark=quiz.pass_mark,
+        success_text=quiz.success_text,
+        fail_text=quiz.fail_text,
+        draft=quiz.draft,
+        single_page=quiz.single_page,
+        blueprint=quiz.blueprint,
+        questions=tuple(compiled),
+    )
+
+
+class LocalSnapshots:
+    """
+    LRU, em memória e por processo, dos snapshots já lidos do cache, para
+    não desserializar o questionário inteiro (e o gabarito) a cada
+    requisição. A chave inclui a versão, que continua sendo lida do cache
+    compartilhado: quando os sinais trocam a versão, a entrada antiga
+    deixa de ser usada e sai da LRU com o tempo.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            snapshot = self.entries.get(key)
+            if snapshot is not None:
+                self.entries.move_to_end(key)
+            return snapshot
+
+    def set(self, key, snapshot):
+        if self.maxsize < 1:
+            return
+        with self.lock:
+            self.entries[key] = snapshot
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_snapshots = LocalSnapshots(getattr(settings, "QUIZ_SNAPSHOT_LOCAL_SIZE", 64))
+
+
+def get_quiz_snapshot(quiz_id):
+    """
+    Retorna o snapshot da versão atual do questionário, da LRU local, do
+    cache ou compilado do banco, nessa ordem.
+    """
+    version = get_snapshot_version(quiz_id)
+    key = _snapshot_key(quiz_id, version)
+
+    snapshot = local_snapshots.get(key)
+    if snapshot is not None:
+        return snapshot
+
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = compile_quiz(quiz_id, version)
+        if snapshot is None:
+            return None
+        cache.set(key, snapshot, timeout=_timeout())
+    local_snapshots.set(key, snapshot)
+    return snapshot
+
+
+def get_quiz_snapshot_by_url(url):
+    quiz_id = cache.get(_url_key(url))
+    if quiz_id is not None:
+        snapshot = get_quiz_snapshot(quiz_id)
+        if snapshot is not None and snapshot.url == url:
+            return snapshot
+
+    quiz_id = Quiz.objects.filter(url=url).order_by("id").values_list("id", flat=True)
+    quiz_id = quiz_id.first()
+    if quiz_id is None:
+        cache.delete(_url_key(url))
+        return None
+
+    cache.set(_url_key(url), quiz_id, timeout=_timeout())
+    return get_quiz_snapshot(quiz_id)
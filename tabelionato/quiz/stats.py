@@ -0,0 +1,191 @@
+"""
+Reconstrução das estatísticas dos questionários e das questões.
+
+<QuizStats> e <QuestionStats> são mantidas incrementalmente pelas
+tentativas (veja <Attempt.mark_quiz_complete>). Este módulo as recalcula do
+zero a partir das tentativas guardadas, para popular as tabelas pela
+primeira vez ou corrigir divergências. As tentativas arquivadas (veja
+archive.py) entram junto com as vivas. Tentativas de questionários sem
+``store_result`` são apagadas ao final e não entram nem nas estatísticas
+incrementais nem na reconstrução.
+
+Os rankings (veja leaderboards.py) também são refeitos daqui.
+"""
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from . import leaderboards
+from .models import (
+    ArchivedAttempt,
+    Attempt,
+    AttemptResponse,
+    Question,
+    QuestionStats,
+    Quiz,
+    QuizStats,
+    percent_correct,
+)
+
+CHUNK_SIZE = 2000
+
+
+def _quiz_stats():
+    pass_marks = dict(Quiz.objects.values_list("id", "pass_mark"))
+    stats = {}
+
+    # Como nas atualizações incrementais: as em andamento de questionários
+    # sem store_result também não contam
+    attempts = (
+        Attempt.objects.with_archive()
+        .filter(quiz__store_result=True)
+        .values_list("quiz_id", "complete", "current_score", "max_score")
+        .order_by()
+    )
+    for quiz_id, complete, score, max_score in attempts.iterator(CHUNK_SIZE):
+        row = stats.setdefault(quiz_id, QuizStats(quiz_id=quiz_id))
+        row.attempts += 1
+        if not complete:
+            continue
+
+        percent = percent_correct(score, max_score)
+        row.completed += 1
+        row.passed += int(percent >= pass_marks[quiz_id])
+        row.score_sum += percent
+        row.score_sq_sum += percent * percent
+
+    return stats.values()
+
+
+def _archived_responses():
+    """
+    (tentativa, questão, acertou) das respostas corrigidas do arquivo.
+    """
+    archived = ArchivedAttempt.objects.values_list("id", "responses_data").order_by()
+    for attempt_id, data in archived.iterator(CHUNK_SIZE):
+        for _, question_id, _, is_correct, _ in ArchivedAttempt.unpack_responses(data):
+            if is_correct is not None:
+                yield attempt_id, question_id, is_correct
+
+
+def _question_stats():
+    rows = (
+        AttemptResponse.objects.filter(attempt__complete=True, is_correct__isnull=False)
+        .values_list("question_id")
+        .annotate(seen=Count("id"), correct=Count("id", filter=Q(is_correct=True)))
+        .order_by()
+    )
+    stats = {
+        question_id: QuestionStats(question_id=question_id, seen=seen, correct=correct)
+        for question_id, seen, correct in rows.iterator(CHUNK_SIZE)
+    }
+    for _, question_id, is_correct in _archived_responses():
+        row = stats.setdefault(question_id, QuestionStats(question_id=question_id))
+        row.seen += 1
+        row.correct += int(is_correct)
+    return stats.values()
+
+
+def rebuild_stats():
+    """
+    Apaga e recalcula todas as estatísticas numa única transação. Retorna
+    quantas linhas de cada tabela foram criadas.
+    """
+    with transaction.atomic():
+        QuizStats.objects.all().delete()
+        QuestionStats.objects.all().delete()
+
+        quizzes = QuizStats.objects.bulk_create(_quiz_stats(), batch_size=CHUNK_SIZE)
+        questions = QuestionStats.objects.bulk_create(
+            _question_stats(), batch_size=CHUNK_SIZE
+        )
+
+    return {"quizzes": len(quizzes), "questions": len(questions)}
+
+
+def _category_scores():
+    """
+    {tentativa: {categoria: acertos}} das tentativas concluídas.
+    """
+    rows = (
+        AttemptResponse.objects.filter(
+            attempt__complete=True,
+            attempt__end__isnull=False,
+            is_correct=True,
+            question__category__isnull=False,
+        )
+        .values_list("attempt_id", "question__category_id")
+        .annotate(correct=Count("id"))
+        .order_by()
+    )
+    scores = {}
+    for attempt_id, category_id, correct in rows.iterator(CHUNK_SIZE):
+        scores.setdefault(attempt_id, {})[category_id] = correct
+
+    if ArchivedAttempt.objects.exists():
+        categories = dict(
+            Question.objects.filter(category__isnull=False).values_list(
+                "id", "category_id"
+            )
+        )
+        for attempt_id, question_id, is_correct in _archived_responses():
+            category_id = categories.get(question_id)
+            if is_correct and category_id:
+                attempt = scores.setdefault(attempt_id, {})
+                attempt[category_id] = attempt.get(category_id, 0) + 1
+    return scores
+
+
+def _leaderboards():
+    """
+    {chave: (pontos por usuário, expiração)} dos rankings, como
+    <leaderboards.record_attempt> os deixaria. Períodos que já teriam
+    expirado ficam de fora.
+    """
+    now = timezone.now()
+    category_scores = _category_scores()
+    boards = {}
+
+    def add(scope, period, when, user_id, points, best=False):
+        ttl = leaderboards.PERIOD_TTL[period]
+        if ttl and (now - when).total_seconds() > ttl:
+            return
+        key = leaderboards.board_key(scope, period, when)
+        scores = boards.setdefault(key, ({}, ttl))[0]
+        if best:
+            scores[user_id] = max(scores.get(user_id, points), points)
+        else:
+            scores[user_id] = scores.get(user_id, 0) + points
+
+    attempts = (
+        Attempt.objects.with_archive()
+        .filter(complete=True, end__isnull=False)
+        .values_list("id", "user_id", "quiz_id", "current_score", "max_score", "end")
+    )
+    for attempt_id, user_id, quiz_id, score, max_score, end in attempts.iterator(
+        CHUNK_SIZE
+    ):
+        percent = percent_correct(score, max_score)
+        for period in leaderboards.PERIODS:
+            add(leaderboards.quiz_scope(quiz_id), period, end, user_id, percent, True)
+            add(leaderboards.GLOBAL, period, end, user_id, score)
+            for category_id, correct in category_scores.get(attempt_id, {}).items():
+                scope = leaderboards.category_scope(category_id)
+                add(scope, period, end, user_id, correct)
+
+    return boards
+
+
+def rebuild_leaderboards():
+    """
+    Refaz todos os rankings a partir das tentativas concluídas e apaga os
+    que não têm mais tentativas. Cada ranking é trocado de uma vez, então
+    as consultas nunca veem um ranking pela metade. Retorna quantos
+    rankings foram gravados.
+    """
+    backend = leaderboards.get_backend()
+    boards = _leaderboards()
+    for key, (scores, ttl) in boards.items():
+        backend.replace(key, scores, ttl)
+    backend.delete([key for key in backend.keys() if key not in boards])
+    return len(boards)
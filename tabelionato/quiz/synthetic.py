@@ -0,0 +1,505 @@
+"""
+Geração de dados sintéticos em volume de produção, para testes de carga.
+
+Tudo é sorteado a partir de uma semente, de modo que a mesma configuração
+gera sempre os mesmos dados. As distribuições procuram imitar o uso real:
+
+- a popularidade dos questionários e a atividade dos usuários seguem uma
+  lei de potência (poucos concentram a maior parte das tentativas);
+- cada usuário tem uma habilidade e cada questão uma dificuldade, e a
+  chance de acerto segue o modelo de Rasch (veja calibration.py);
+- 70% das tentativas estão concluídas, 20% em andamento, com parte das
+  questões respondidas, e 10% ainda sem resposta;
+- as tentativas se espalham pelos últimos ``days`` dias, em ordem de
+  ``id``, e duram alguns minutos.
+
+As linhas recebem ids explícitos, a partir do maior id existente, e são
+gravadas em lotes: com ``COPY FROM STDIN`` no PostgreSQL e ``executemany``
+nos demais bancos. Ao final as sequências são ajustadas e as pontuações
+por categoria e as estatísticas são recalculadas.
+"""
+import csv
+import io
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Count, Max, Q
+
+from .models import (
+    Answer,
+    Attempt,
+    AttemptResponse,
+    Category,
+    MultiChoiceQuestion,
+    Progress,
+    ProgressCategoryScore,
+    Question,
+    Quiz,
+    TrueFalseQuestion,
+)
+from .stats import rebuild_stats
+
+BATCH_SIZE = 5000
+
+ANSWERS_PER_QUESTION = 4
+
+# Proporção de tentativas concluídas, em andamento e sem resposta
+STATES = (0.7, 0.2, 0.1)
+COMPLETE, IN_PROGRESS, NOT_STARTED = range(3)
+
+# Expoente da lei de potência da popularidade e da atividade
+POPULARITY = 1.1
+
+# Segundos gastos por questão: média e desvio do logaritmo
+ANSWER_SECONDS = (math.log(30), 0.6)
+
+MULTI_CHOICE_SHARE = 0.6
+
+WORDS = (
+    "registro imóveis matrícula averbação escritura procuração tabelião "
+    "protesto título certidão emolumentos usucapião hipoteca alienação "
+    "fiduciária inventário partilha divórcio testamento ata notarial "
+    "reconhecimento firma autenticação prazo prenotação qualificação "
+    "cancelamento retificação loteamento condomínio incorporação"
+).split()
+
+
+@dataclass
+class LoadDataConfig:
+    users: int = 1000
+    categories: int = 20
+    quizzes: int = 50
+    questions: int = 2000
+    questions_per_quiz: int = 20
+    attempts: int = 10000
+    days: int = 365
+    seed: int = 0
+    batch_size: int = BATCH_SIZE
+    stats: bool = True
+
+
+def copy_rows(model, fields, rows):
+    """
+    Grava ``rows`` (tuplas com os valores de ``fields``) na tabela de
+    ``model``, sem passar pelo ORM. ``fields`` são nomes de campos; para
+    chaves estrangeiras, ``<campo>_id``.
+    """
+    if not rows:
+        return
+
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = ", ".join(quote(model._meta.get_field(name).column) for name in fields)
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows(
+                ["\\N" if value is None else value for value in row] for row in rows
+            )
+            buffer.seek(0)
+            cursor.copy_expert(
+                "COPY %s (%s) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+                % (table, columns),
+                buffer,
+            )
+        else:
+            cursor.executemany(
+                "INSERT INTO %s (%s) VALUES (%s)"
+                % (table, columns, ", ".join(["%s"] * len(fields))),
+                rows,
+            )
+
+
+def _next_id(model):
+    return (model.objects.aggregate(top=Max("pk"))["top"] or 0) + 1
+
+
+def _power_law(rng, n):
+    """
+    Pesos de ``n`` itens segundo uma lei de potência, em ordem aleatória.
+    """
+    weights = 1.0 / np.arange(1, n + 1) ** POPULARITY
+    rng.shuffle(weights)
+    return weights / weights.sum()
+
+
+def _text(rng, words, prefix):
+    return "%s: %s." % (prefix, " ".join(rng.choice(WORDS, words)))
+
+
+class LoadDataGenerator:
+    def __init__(self, config, progress=None):
+        self.config = config
+        self.rng = np.random.default_rng(config.seed)
+        self.progress = progress or (lambda model, count: None)
+        self.now = datetime.now(timezone.utc).replace(microsecond=0)
+
+    def _write(self, model, fields, rows):
+        batch_size = self.config.batch_size
+        for start in range(0, len(rows), batch_size):
+            copy_rows(model, fields, rows[start : start + batch_size])
+        self.progress(model, len(rows))
+
+    def run(self):
+        with transaction.atomic():
+            self.users()
+            self.categories()
+            self.quizzes()
+            self.questions()
+            self.attempts()
+            self.category_scores()
+            self.reset_sequences()
+
+        if self.config.stats:
+            rebuild_stats()
+
+    def users(self):
+        User = get_user_model()
+        first = _next_id(User)
+        self.user_ids = np.arange(first, first + self.config.users)
+        # Todos com a mesma senha inutilizável, gerar uma por usuário é caro
+        password = make_password(None)
+        self._write(
+            User,
+            ["id", "username", "password", "email", "name", "is_active"]
+            + ["is_staff", "is_superuser", "date_joined"],
+            [
+                (
+                    int(pk),
+                    "carga-%s" % pk,
+                    password,
+                    "carga-%s@example.com" % pk,
+                    "Usuário %s" % pk,
+                    True,
+                    False,
+                    False,
+                    self.now,
+                )
+                for pk in self.user_ids
+            ],
+        )
+        # Habilidade de cada usuário, na escala logit da dificuldade
+        self.ability = self.rng.normal(0.0, 1.2, len(self.user_ids))
+
+    def categories(self):
+        first = _next_id(Category)
+        self.category_ids = np.arange(first, first + self.config.categories)
+        self._write(
+            Category,
+            ["id", "category"],
+            [(int(pk), "Carga %s" % pk) for pk in self.category_ids],
+        )
+
+    def quizzes(self):
+        first = _next_id(Quiz)
+        self.quiz_ids = np.arange(first, first + self.config.quizzes)
+        self.quiz_category = self.rng.choice(self.category_ids, len(self.quiz_ids))
+        self._write(
+            Quiz,
+            ["id", "title", "description", "url", "category_id", "random_order"]
+            + ["max_questions", "answers_at_end", "store_result", "single_attempt"]
+            + ["pass_mark", "success_text", "fail_text", "draft", "single_page"]
+            + ["blueprint", "date_added"],
+            [
+                (
+                    int(pk),
+                    "Questionário %s" % pk,
+                    _text(self.rng, 8, "Simulado")[:150],
+                    "carga-%s" % pk,
+                    int(category_id),
+                    bool(self.rng.random() < 0.5),
+                    None,
+                    True,
+                    True,
+                    False,
+                    int(self.rng.choice([50, 60, 70])),
+                    "Parabéns!",
+                    "Tente novamente.",
+                    False,
+                    bool(self.rng.random() < 0.5),
+                    None,
+                    self.now,
+                )
+                for pk, category_id in zip(self.quiz_ids, self.quiz_category)
+            ],
+        )
+
+    def questions(self):
+        config = self.config
+        rng = self.rng
+        first = _next_id(Question)
+        ids = np.arange(first, first + config.questions)
+        category = rng.choice(self.category_ids, len(ids))
+        difficulty = np.clip(np.rint(rng.normal(3.0, 1.0, len(ids))), 1, 5)
+        # Dificuldade em logits, como na recalibração
+        self.logit = dict(zip(ids.tolist(), (difficulty - 3.0).tolist()))
+        multi = rng.random(len(ids)) < MULTI_CHOICE_SHARE
+
+        rows = []
+        for pk, category_id, level in zip(ids, category, difficulty):
+            content = _text(rng, 16, "Questão %s" % pk)
+            rows.append(
+                (
+                    int(pk),
+                    int(category_id),
+                    int(level),
+                    content,
+                    _text(rng, 10, "Explicação"),
+                    Question.make_content_hash(content),
+                )
+            )
+        self._write(
+            Question,
+            ["id", "category_id", "difficulty", "content", "explanation"]
+            + ["content_hash"],
+            rows,
+        )
+
+        self._write(
+            MultiChoiceQuestion,
+            ["question_ptr_id"],
+            [(int(pk),) for pk in ids[multi]],
+        )
+        true_false = ids[~multi]
+        is_true = rng.random(len(true_false)) < 0.5
+        self._write(
+            TrueFalseQuestion,
+            ["question_ptr_id", "is_correct"],
+            [(int(pk), bool(value)) for pk, value in zip(true_false, is_true)],
+        )
+        self.answers(ids[multi], dict(zip(true_false.tolist(), is_true.tolist())))
+        self.quiz_questions(ids, category)
+
+    def answers(self, multi_ids, true_false):
+        """
+        As alternativas de cada questão de múltipla escolha, uma correta.
+        Guarda, por questão, a resposta certa e as erradas, no formato em
+        que o formulário as envia.
+        """
+        first = _next_id(Answer)
+        correct = self.rng.integers(0, ANSWERS_PER_QUESTION, len(multi_ids))
+        self.right = {pk: [str(int(value))] for pk, value in true_false.items()}
+        self.wrong = {pk: [str(int(not value))] for pk, value in true_false.items()}
+
+        rows = []
+        pk = first
+        for question_id, right in zip(multi_ids.tolist(), correct.tolist()):
+            self.wrong[question_id] = []
+            for n in range(ANSWERS_PER_QUESTION):
+                rows.append(
+                    (pk, question_id, _text(self.rng, 5, "Alternativa"), n == right)
+                )
+                if n == right:
+                    self.right[question_id] = [str(pk)]
+                else:
+                    self.wrong[question_id].append(str(pk))
+                pk += 1
+        self._write(Answer, ["id", "question_id", "content", "is_correct"], rows)
+
+    def quiz_questions(self, ids, category):
+        """
+        Cada questionário recebe ``questions_per_quiz`` questões, de
+        preferência da sua categoria.
+        """
+        per_quiz = min(self.config.questions_per_quiz, len(ids))
+        by_category = {pk: ids[category == pk] for pk in self.category_ids}
+        self.quiz_question_ids = {}
+        rows = []
+        for quiz_id, category_id in zip(self.quiz_ids, self.quiz_category):
+            own = by_category[category_id]
+            chosen = self.rng.choice(own, min(per_quiz, len(own)), replace=False)
+            if len(chosen) < per_quiz:
+                others = np.setdiff1d(ids, chosen)
+                extra = self.rng.choice(others, per_quiz - len(chosen), replace=False)
+                chosen = np.concatenate([chosen, extra])
+            self.quiz_question_ids[int(quiz_id)] = chosen
+            rows.extend((int(quiz_id), int(pk)) for pk in chosen)
+        self._write(Question.quiz.through, ["quiz_id", "question_id"], rows)
+
+    def attempts(self):
+        config = self.config
+        rng = self.rng
+        first = _next_id(Attempt)
+        first_response = _next_id(AttemptResponse)
+        user_weights = _power_law(rng, len(self.user_ids))
+        quiz_weights = _power_law(rng, len(self.quiz_ids))
+
+        # Inícios em ordem crescente, para que o id acompanhe a data
+        offsets = np.sort(rng.random(config.attempts))[::-1] * config.days * 86400
+        self.user_attempts = set()
+        self.in_progress = set()
+
+        for start in range(0, config.attempts, config.batch_size):
+            size = min(config.batch_size, config.attempts - start)
+            attempt_ids = np.arange(first + start, first + start + size)
+            users = rng.choice(len(self.user_ids), size, p=user_weights)
+            quizzes = self.quiz_ids[
+                rng.choice(len(self.quiz_ids), size, p=quiz_weights)
+            ]
+            states = rng.choice(len(STATES), size, p=STATES)
+            first_response = self._attempt_batch(
+                attempt_ids,
+                users,
+                quizzes,
+                states,
+                offsets[start : start + size],
+                first_response,
+            )
+        self.progress(Attempt, config.attempts)
+
+    def _attempt_batch(self, attempt_ids, users, quizzes, states, offsets, first_pk):
+        rng = self.rng
+        attempts = []
+        responses = []
+        pk = first_pk
+
+        for attempt_id, user, quiz_id, state, offset in zip(
+            attempt_ids.tolist(),
+            users.tolist(),
+            quizzes.tolist(),
+            states.tolist(),
+            offsets.tolist(),
+        ):
+            # Uma só tentativa em andamento por usuário e questionário (veja
+            # quiz_attempt_in_progress_uniq): as repetidas saem concluídas
+            if state != COMPLETE:
+                pair = (user, quiz_id)
+                if pair in self.in_progress:
+                    state = COMPLETE
+                else:
+                    self.in_progress.add(pair)
+
+            question_ids = rng.permutation(self.quiz_question_ids[quiz_id]).tolist()
+            total = len(question_ids)
+            answered = {
+                COMPLETE: total,
+                IN_PROGRESS: int(rng.integers(1, total)) if total > 1 else 0,
+                NOT_STARTED: 0,
+            }[state]
+
+            logits = np.array([self.logit[pk] for pk in question_ids[:answered]])
+            chance = 1.0 / (1.0 + np.exp(logits - self.ability[user]))
+            hits = (rng.random(answered) < chance).tolist()
+            seconds = np.cumsum(rng.lognormal(*ANSWER_SECONDS, answered)).tolist()
+
+            started = self.now - timedelta(seconds=offset)
+            for position, question_id in enumerate(question_ids):
+                if position < answered:
+                    correct = hits[position]
+                    choices = self.right if correct else self.wrong
+                    options = choices[question_id]
+                    answer = options[int(rng.integers(len(options)))]
+                    answered_at = started + timedelta(seconds=seconds[position])
+                else:
+                    correct = answer = answered_at = None
+                responses.append(
+                    (
+                        pk,
+                        attempt_id,
+                        position,
+                        question_id,
+                        answer,
+                        correct,
+                        answered_at,
+                    )
+                )
+                pk += 1
+
+            ended = answered_at if state == COMPLETE else None
+            attempts.append(
+                (
+                    attempt_id,
+                    int(self.user_ids[user]),
+                    quiz_id,
+                    total,
+                    sum(hits),
+                    state == COMPLETE,
+                    started,
+                    ended,
+                )
+            )
+            self.user_attempts.add(int(self.user_ids[user]))
+
+        copy_rows(
+            Attempt,
+            ["id", "user_id", "quiz_id", "max_score", "current_score", "complete"]
+            + ["start", "end"],
+            attempts,
+        )
+        for start in range(0, len(responses), self.config.batch_size):
+            copy_rows(
+                AttemptResponse,
+                ["id", "attempt_id", "position", "question_id", "answer"]
+                + ["is_correct", "answered_at"],
+                responses[start : start + self.config.batch_size],
+            )
+        return pk
+
+    def category_scores(self):
+        """
+        <Progress> de cada usuário com tentativas e a pontuação por
+        categoria das tentativas concluídas, agregada no banco.
+        """
+        user_ids = sorted(self.user_attempts)
+        first = _next_id(Progress)
+        self._write(
+            Progress,
+            ["id", "user_id", "correct_answer", "wrong_answer"],
+            [(first + n, pk, "", "") for n, pk in enumerate(user_ids)],
+        )
+
+        scores = (
+            AttemptResponse.objects.filter(
+                attempt__complete=True,
+                attempt__user_id__in=user_ids,
+                question__category__isnull=False,
+            )
+            .values_list("attempt__user_id", "question__category_id")
+            .annotate(
+                correct=Count("id", filter=Q(is_correct=True)), possible=Count("id")
+            )
+            .order_by()
+        )
+        first = _next_id(ProgressCategoryScore)
+        self._write(
+            ProgressCategoryScore,
+            ["id", "user_id", "category_id", "correct", "possible"],
+            [(first + n, *row) for n, row in enumerate(scores.iterator())],
+        )
+
+    def reset_sequences(self):
+        """
+        Os ids foram gravados explicitamente, as sequências do PostgreSQL
+        precisam continuar a partir deles.
+        """
+        models = [
+            get_user_model(),
+            Category,
+            Quiz,
+            Question,
+            Question.quiz.through,
+            Answer,
+            Attempt,
+            AttemptResponse,
+            Progress,
+            ProgressCategoryScore,
+        ]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+
+
+def generate_load_data(config=None, progress=None):
+    """
+    Gera os dados descritos por ``config`` (um <LoadDataConfig>).
+    ``progress(model, count)`` é chamado após cada tabela gravada.
+    """
+    LoadDataGenerator(config or LoadDataConfig(), progress).run()
@@ -1,5 +1,7 @@
 from django import template
 
+from tabelionato.quiz.fragments import get_question_fragments
+
 register = template.Library()
 
 
@@ -15,6 +17,15 @@ def correct_answer_for_all(context, question):
     return {"answers": answers, "user_was_incorrect": user_was_incorrect}
 
 
+@register.simple_tag
+def question_fragments(quiz, questions):
+    """
+    Pares (questão, fragmentos em cache) da página de resultados, veja
+    fragments.py
+    """
+    return get_question_fragments(quiz, questions)
+
+
 @register.filter
 def answer_choice_to_string(question, answer):
     return question.answer_choice_to_string(answer)
@@ -27,5 +38,4 @@ def has_content(text):
 
 @register.filter
 def check_answer(value):
-    print(value[2])
     return value[2] is True
@@ -0,0 +1,292 @@
+"""
+Micro-benchmarks dos caminhos mais usados do app de questionários.
+
+Cada benchmark monta os dados com as fábricas de ``factories.py`` para um
+questionário de ``size`` questões (metade de múltipla escolha, metade de
+verdadeiro ou falso) e mede uma operação. Executados pelo comando
+``benchmark_quiz``, dentro de uma transação desfeita no final.
+
+Os resultados são gravados em JSON::
+
+    {
+        "version": 1,
+        "created": "2021-05-01T12:00:00+00:00",
+        "environment": {"python": "3.9.4", "django": "3.1.8", ...},
+        "results": {
+            "new_attempt[100]": {
+                "name": "new_attempt", "size": 100, "repeat": 5,
+                "min": 0.0123, "median": 0.0130, "mean": 0.0131,
+                "stdev": 0.0004, "queries": 9
+            },
+            ...
+        }
+    }
+
+Os tempos estão em segundos. Dois arquivos são comparados pela mediana de
+cada chave presente em ambos (veja ``compare``).
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+
+import django
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.utils import timezone
+
+from tabelionato.quiz.forms import QuizForm
+from tabelionato.quiz.models import Attempt, Category, Progress, prefetch_answers
+from tabelionato.quiz.snapshots import compile_quiz
+from tabelionato.quiz.tests.factories import (
+    CategoryFactory,
+    MultiChoiceQuestionFactory,
+    ProgressFactory,
+    QuizFactory,
+    TrueFalseQuestionFactory,
+)
+from tabelionato.users.tests.factories import UserFactory
+from tabelionato.utils.query_budget import QueryCounter
+
+FORMAT_VERSION = 1
+
+SIZES = (10, 100, 500)
+
+REPEAT = 5
+
+CATEGORIES = 10
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    """
+    Registra um benchmark. ``func(size)`` monta os dados e retorna a
+    função a ser medida.
+    """
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def build_quiz(size):
+    categories = [CategoryFactory() for _ in range(CATEGORIES)]
+    quiz = QuizFactory(category=categories[0])
+    for n in range(size):
+        factory = MultiChoiceQuestionFactory if n % 2 else TrueFalseQuestionFactory
+        factory(category=categories[n % CATEGORIES], quizzes=[quiz])
+    return quiz
+
+
+def answered_attempt(quiz):
+    attempt = Attempt.objects.new_attempt(UserFactory(), quiz)
+    for question in attempt.get_questions():
+        attempt.record_answer(question, "1", False)
+    return attempt
+
+
+@benchmark
+def new_attempt(size):
+    quiz = build_quiz(size)
+    user = UserFactory()
+
+    def run():
+        # Conclui a anterior: só pode haver uma em andamento por usuário
+        Attempt.objects.filter(user=user, quiz=quiz, complete=False).update(
+            complete=True
+        )
+        return Attempt.objects.new_attempt(user, quiz)
+
+    return run
+
+
+@benchmark
+def get_questions_with_answers(size):
+    attempt = answered_attempt(build_quiz(size))
+    return lambda: attempt.get_questions(with_answers=True)
+
+
+@benchmark
+def get_questions_with_answers_snapshot(size):
+    quiz = build_quiz(size)
+    attempt = answered_attempt(quiz)
+    snapshot = compile_quiz(quiz.id)
+    return lambda: attempt.get_questions(with_answers=True, snapshot=snapshot)
+
+
+@benchmark
+def update_score(size):
+    quiz = build_quiz(size)
+    progress = ProgressFactory()
+    questions = list(quiz.get_questions())
+
+    def run():
+        for question in questions:
+            progress.update_score(question, 1, 1)
+
+    return run
+
+
+@benchmark
+def list_all_cat_scores(size):
+    for _ in range(size):
+        CategoryFactory()
+    progress = ProgressFactory()
+    progress.update_scores(
+        {pk: [1, 2] for pk in Category.objects.values_list("pk", flat=True)}
+    )
+    return lambda: Progress.objects.get(pk=progress.pk).list_all_cat_scores
+
+
+def _guesses(questions):
+    return [(q, q.get_answer_list()[0][0]) for q in questions]
+
+
+@benchmark
+def check_answer(size):
+    guesses = _guesses(prefetch_answers(list(build_quiz(size).get_questions())))
+
+    def run():
+        for question, guess in guesses:
+            question.check_answer(guess)
+
+    return run
+
+
+@benchmark
+def check_answer_snapshot(size):
+    guesses = _guesses(compile_quiz(build_quiz(size).id).questions)
+
+    def run():
+        for question, guess in guesses:
+            question.check_answer(guess)
+
+    return run
+
+
+@benchmark
+def quiz_form_render(size):
+    snapshot = compile_quiz(build_quiz(size).id)
+    request = RequestFactory().get("/")
+    request.user = UserFactory()
+
+    def run():
+        form = QuizForm(snapshot.questions)
+        return render_to_string(
+            "quiz/quiz_single_page.html",
+            {"quiz": snapshot, "questions": snapshot.questions, "form": form},
+            request=request,
+        )
+
+    return run
+
+
+def measure(func, repeat=REPEAT):
+    """
+    Executa ``func`` uma vez para aquecer e depois ``repeat`` vezes.
+    Retorna os tempos, em segundos, e as consultas da primeira execução
+    medida.
+    """
+    func()
+
+    counter = QueryCounter()
+    timings = []
+    for n in range(repeat):
+        if n == 0:
+            with counter.capture():
+                start = time.perf_counter()
+                func()
+                timings.append(time.perf_counter() - start)
+        else:
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    return timings, counter.count
+
+
+def summarize(name, size, timings, queries):
+    return {
+        "name": name,
+        "size": size,
+        "repeat": len(timings),
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "queries": queries,
+    }
+
+
+def _git_revision():
+    try:
+        return (
+            subprocess.run(
+                ["git", "rev-parse", "HEAD"],
+                capture_output=True,
+                check=True,
+                text=True,
+            ).stdout.strip()
+            or None
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+        "machine": platform.machine(),
+        "git": _git_revision(),
+    }
+
+
+def run(names=None, sizes=SIZES, repeat=REPEAT, progress=None):
+    """
+    Executa os benchmarks ``names`` (todos, por padrão) para cada tamanho
+    e retorna o documento de resultados.
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        for size in sizes:
+            timings, queries = measure(BENCHMARKS[name](size), repeat)
+            key = "%s[%s]" % (name, size)
+            results[key] = summarize(name, size, timings, queries)
+            if progress:
+                progress(key, results[key])
+
+    return {
+        "version": FORMAT_VERSION,
+        "created": timezone.now().isoformat(),
+        "environment": environment(),
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=1.2):
+    """
+    Compara as medianas das chaves presentes nos dois documentos. Retorna
+    uma lista de (chave, mediana anterior, mediana atual, razão,
+    regrediu), em que ``regrediu`` indica razão acima de ``threshold``.
+    """
+    rows = []
+    for key, result in current["results"].items():
+        before = baseline.get("results", {}).get(key)
+        if before is None or not before["median"]:
+            continue
+        ratio = result["median"] / before["median"]
+        rows.append((key, before["median"], result["median"], ratio, ratio > threshold))
+    return rows
+
+
+def load(path):
+    with open(path, encoding="utf-8") as stream:
+        return json.load(stream)
+
+
+def dump(document, path):
+    with open(path, "w", encoding="utf-8") as stream:
+        json.dump(document, stream, indent=2, sort_keys=True)
+        stream.write("\n")
@@ -0,0 +1,52 @@
+import pytest
+from django.core.cache import cache
+
+from tabelionato.quiz.models import (
+    Answer,
+    Category,
+    MultiChoiceQuestion,
+    Quiz,
+    TrueFalseQuestion,
+)
+from tabelionato.quiz.leaderboards import get_backend
+from tabelionato.quiz.snapshots import local_snapshots
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    local_snapshots.clear()
+    get_backend().clear()
+    yield
+    cache.clear()
+    local_snapshots.clear()
+    get_backend().clear()
+
+
+@pytest.fixture
+def category() -> Category:
+    return Category.objects.create(category="registro")
+
+
+@pytest.fixture
+def quiz(category: Category) -> Quiz:
+    quiz = Quiz.objects.create(
+        title="Registro de Imóveis",
+        url="registro-de-imoveis",
+        category=category,
+        draft=False,
+    )
+
+    for number in range(2):
+        question = MultiChoiceQuestion.objects.create(
+            content="Questão %s" % number, category=category
+        )
+        question.quiz.add(quiz)
+        Answer.objects.create(question=question, content="Certa", is_correct=True)
+        Answer.objects.create(question=question, content="Errada", is_correct=False)
+
+    question = TrueFalseQuestion.objects.create(
+        content="Verdadeiro?", category=category, is_correct=True
+    )
+    question.quiz.add(quiz)
+    return quiz
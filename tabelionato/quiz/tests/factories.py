@@ -0,0 +1,117 @@
+from typing import Any, Sequence
+
+from factory import Faker, SubFactory, post_generation
+from factory import Sequence as FactorySequence
+from factory.django import DjangoModelFactory
+
+from tabelionato.quiz.models import (
+    Answer,
+    Attempt,
+    Category,
+    MultiChoiceQuestion,
+    Progress,
+    Quiz,
+    TrueFalseQuestion,
+)
+from tabelionato.users.tests.factories import UserFactory
+
+
+class CategoryFactory(DjangoModelFactory):
+
+    category = FactorySequence(lambda n: "categoria-%s" % n)
+
+    class Meta:
+        model = Category
+        django_get_or_create = ["category"]
+
+
+class QuizFactory(DjangoModelFactory):
+
+    title = FactorySequence(lambda n: "Questionário %s" % n)
+    url = FactorySequence(lambda n: "questionario-%s" % n)
+    description = Faker("sentence", locale="pt_BR")
+    category = SubFactory(CategoryFactory)
+    draft = False
+
+    class Meta:
+        model = Quiz
+
+
+class QuestionFactory(DjangoModelFactory):
+    """
+    Base das fábricas de questões. ``quizzes`` recebe os questionários aos
+    quais a questão pertence.
+    """
+
+    content = Faker("sentence", nb_words=12, locale="pt_BR")
+    explanation = Faker("sentence", locale="pt_BR")
+    category = SubFactory(CategoryFactory)
+    difficulty = 1
+
+    @post_generation
+    def quizzes(self, create: bool, extracted: Sequence[Any], **kwargs):
+        if create and extracted:
+            self.quiz.add(*extracted)
+
+
+class MultiChoiceQuestionFactory(QuestionFactory):
+    """
+    Cria ``answers`` alternativas (quatro por padrão), a primeira correta.
+    """
+
+    @post_generation
+    def answers(self, create: bool, extracted: Any, **kwargs):
+        if not create:
+            return
+        count = 4 if extracted is None else extracted
+        Answer.objects.bulk_create(
+            Answer(question=self, content="Alternativa %s" % n, is_correct=n == 0)
+            for n in range(count)
+        )
+
+    class Meta:
+        model = MultiChoiceQuestion
+
+
+class TrueFalseQuestionFactory(QuestionFactory):
+
+    is_correct = True
+
+    class Meta:
+        model = TrueFalseQuestion
+
+
+class AnswerFactory(DjangoModelFactory):
+
+    question = SubFactory(MultiChoiceQuestionFactory, answers=0)
+    content = Faker("sentence", nb_words=4, locale="pt_BR")
+    is_correct = False
+
+    class Meta:
+        model = Answer
+
+
+class AttemptFactory(DjangoModelFactory):
+    """
+    Cria a tentativa por <AttemptManager.new_attempt>, que também sorteia
+    as questões.
+    """
+
+    user = SubFactory(UserFactory)
+    quiz = SubFactory(QuizFactory)
+
+    class Meta:
+        model = Attempt
+
+    @classmethod
+    def _create(cls, model_class, user, quiz, **kwargs):
+        return model_class.objects.new_attempt(user, quiz, **kwargs)
+
+
+class ProgressFactory(DjangoModelFactory):
+
+    user = SubFactory(UserFactory)
+
+    class Meta:
+        model = Progress
+        django_get_or_create = ["user"]
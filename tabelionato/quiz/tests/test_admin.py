@@ -0,0 +1,81 @@
+import pytest
+from django.urls import reverse
+
+from tabelionato.quiz.admin import QuizAdminForm
+from tabelionato.quiz.models import Category, MultiChoiceQuestion, Quiz
+
+pytestmark = pytest.mark.django_db
+
+
+class TestQuestionPicker:
+    url = reverse("admin:quiz_quiz_questions")
+
+    @pytest.fixture
+    def bank(self, category: Category):
+        other = Category.objects.create(category="notas")
+        for number in range(30):
+            MultiChoiceQuestion.objects.create(
+                content="Banco %s" % number,
+                category=category if number % 2 else other,
+                difficulty=number % 5 + 1,
+            )
+        return other
+
+    def test_pages(self, bank, admin_client):
+        first = admin_client.get(self.url).json()
+        second = admin_client.get(self.url, {"page": 2}).json()
+
+        assert len(first["results"]) == 20 and first["pagination"]["more"]
+        assert len(second["results"]) == 10 and not second["pagination"]["more"]
+
+    def test_filters(self, bank: Category, admin_client):
+        data = admin_client.get(
+            self.url, {"category": bank.id, "difficulty": 3, "q": "banco"}
+        ).json()
+
+        ids = [result["id"] for result in data["results"]]
+        questions = MultiChoiceQuestion.objects.filter(id__in=ids)
+        assert len(ids) == 3
+        assert {(q.category_id, q.difficulty) for q in questions} == {(bank.id, 3)}
+
+    def test_requires_staff(self, user, client):
+        client.force_login(user)
+
+        assert client.get(self.url).status_code == 302
+
+
+class TestQuizAdminForm:
+    def data(self, quiz, questions):
+        return {
+            "title": quiz.title,
+            "description": quiz.description,
+            "url": quiz.url,
+            "category": quiz.category_id,
+            "pass_mark": 0,
+            "success_text": "",
+            "fail_text": "",
+            "questions": [question.id for question in questions],
+        }
+
+    def test_save_applies_the_difference(self, quiz: Quiz):
+        kept, dropped = list(quiz.question_set.order_by("id"))[:2]
+        new = MultiChoiceQuestion.objects.create(content="Nova")
+
+        form = QuizAdminForm(self.data(quiz, [kept, new]), instance=quiz)
+        assert form.is_valid(), form.errors
+        form.save()
+
+        assert set(quiz.question_set.values_list("id", flat=True)) == {kept.id, new.id}
+        assert not dropped.quiz.exists()
+
+    def test_change_page_renders_only_chosen_questions(self, quiz: Quiz, admin_client):
+        MultiChoiceQuestion.objects.create(content="Fora do questionário")
+        url = reverse("admin:quiz_quiz_change", args=[quiz.id])
+
+        response = admin_client.get(url)
+
+        content = response.content.decode()
+        assert response.status_code == 200
+        assert "Fora do questionário" not in content
+        assert "Questão 0" in content
+        assert 'class="question-picker"' in content
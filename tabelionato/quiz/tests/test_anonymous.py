@@ -0,0 +1,112 @@
+import pytest
+from django.core.cache import cache
+from django.test import RequestFactory
+from django.urls import reverse
+
+from tabelionato.quiz.anonymous import AnonymousAttempt, cookie_name
+from tabelionato.quiz.forms import QuizForm
+from tabelionato.quiz.models import Attempt, Quiz
+from tabelionato.quiz.snapshots import get_quiz_snapshot
+from tabelionato.utils.query_budget import assert_query_budget
+
+pytestmark = pytest.mark.django_db
+
+
+def correct_guess(question):
+    return next(
+        choice[0] for choice in question.get_answer_list_with_correct() if choice[2]
+    )
+
+
+def take_url(quiz):
+    return reverse("quiz:quiz_take", kwargs={"quiz_url": quiz.url})
+
+
+def test_take_without_database_writes(quiz: Quiz, client):
+    url = take_url(quiz)
+    response = client.get(url)
+    assert response.context["progress"] == (0, 3)
+    assert cookie_name(quiz.id) in response.cookies
+
+    # Com o snapshot em cache, responder não consulta nem grava no banco
+    # (fora os savepoints de ATOMIC_REQUESTS)
+    with assert_query_budget(0):
+        for _ in range(3):
+            question = response.context["question"]
+            response = client.post(url, {"answers": correct_guess(question)})
+
+    assert response.status_code == 200
+    assert response.context["score"] == 3
+    assert response.context["percent"] == 100
+    assert response.cookies[cookie_name(quiz.id)]["max-age"] == 0
+    assert Attempt.objects.count() == 0
+
+
+def test_resumes_from_cookie(quiz: Quiz, client):
+    url = take_url(quiz)
+    first = client.get(url).context["question"]
+    client.post(url, {"answers": correct_guess(first)})
+
+    response = client.get(url)
+
+    assert response.context["progress"] == (1, 3)
+    assert response.context["question"].id != first.id
+
+
+def test_single_page(quiz: Quiz, client):
+    quiz.single_page = True
+    quiz.save()
+    url = take_url(quiz)
+    questions = client.get(url).context["questions"]
+
+    response = client.post(
+        url,
+        {
+            QuizForm.field_name(question): correct_guess(question)
+            for question in questions
+        },
+    )
+
+    assert response.context["score"] == 3
+    assert Attempt.objects.count() == 0
+
+
+def test_tampered_cookie_starts_over(quiz: Quiz, client):
+    url = take_url(quiz)
+    response = client.get(url)
+    client.post(url, {"answers": correct_guess(response.context["question"])})
+    value = client.cookies[cookie_name(quiz.id)].value
+    client.cookies[cookie_name(quiz.id)] = value[:-1] + (
+        "A" if value[-1] != "A" else "B"
+    )
+
+    response = client.get(url)
+
+    assert response.context["progress"] == (0, 3)
+
+
+def test_cookie_belongs_to_quiz(quiz: Quiz):
+    snapshot = get_quiz_snapshot(quiz.id)
+    attempt = AnonymousAttempt.new(snapshot)
+    other = Quiz.objects.create(title="Outro", url="outro")
+    request = RequestFactory().get("/")
+    request.COOKIES[cookie_name(other.id)] = attempt.dumps()
+
+    assert AnonymousAttempt.load(request, get_quiz_snapshot(other.id)) is None
+
+
+def test_large_state_goes_to_cache(quiz: Quiz, settings):
+    settings.QUIZ_ANON_COOKIE_MAX_SIZE = 10
+    snapshot = get_quiz_snapshot(quiz.id)
+    attempt = AnonymousAttempt.new(snapshot)
+    question = snapshot.get_question(attempt.get_first_question_id())
+    attempt.record_answer(question, correct_guess(question), True)
+    request = RequestFactory().get("/")
+    request.COOKIES[cookie_name(quiz.id)] = attempt.dumps()
+
+    loaded = AnonymousAttempt.load(request, snapshot)
+
+    assert attempt.token is not None
+    assert cache.get("quiz:anon:%s" % attempt.token) is not None
+    assert loaded.progress() == (1, 3)
+    assert loaded.get_current_score == 1
@@ -0,0 +1,156 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from tabelionato.quiz.archive import archive_attempts, purge_stale_attempts
+from tabelionato.quiz.models import (
+    ArchivedAttempt,
+    Attempt,
+    AttemptResponse,
+    Progress,
+    QuestionStats,
+    Quiz,
+    QuizStats,
+)
+from tabelionato.quiz.pagination import KeysetPaginator
+from tabelionato.quiz.snapshots import get_quiz_snapshot
+from tabelionato.quiz.stats import rebuild_stats
+from tabelionato.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+def complete_attempt(quiz, user, days_ago):
+    attempt = Attempt.objects.new_attempt(user, quiz)
+    for n, question in enumerate(attempt.get_questions()):
+        attempt.record_answer(question, "1", n != 0)
+    attempt.mark_quiz_complete()
+    when = timezone.now() - timedelta(days=days_ago)
+    Attempt.objects.filter(pk=attempt.pk).update(start=when, end=when)
+    return attempt
+
+
+def test_archives_old_completed_attempts(quiz: Quiz, user: User):
+    old = complete_attempt(quiz, user, 200)
+    recent = complete_attempt(quiz, user, 10)
+    pending = Attempt.objects.new_attempt(user, quiz)
+    incorrect = old.get_incorrect_questions
+    answers = old.get_user_answers()
+    question_ids = [q.id for q in old.get_questions()]
+
+    assert archive_attempts() == 1
+
+    assert set(Attempt.objects.values_list("id", flat=True)) == {recent.id, pending.id}
+    assert not AttemptResponse.objects.filter(attempt_id=old.id).exists()
+    archived = ArchivedAttempt.objects.get()
+    assert archived.id == old.id
+    assert (archived.current_score, archived.max_score) == (2, 3)
+    assert archived.get_percent_correct == old.get_percent_correct
+    assert archived.get_incorrect_questions == incorrect == question_ids[:1]
+    assert archived.get_user_answers() == answers
+    assert archived.progress() == (3, 3)
+    questions = archived.get_questions(
+        with_answers=True, snapshot=get_quiz_snapshot(quiz.id)
+    )
+    assert [q.id for q in questions] == question_ids
+    assert [q.user_answer for q in questions] == ["1", "1", "1"]
+
+
+def test_history_merges_live_and_archived(quiz: Quiz, user: User):
+    expected = [complete_attempt(quiz, user, days).id for days in range(0, 400, 40)]
+    archive_attempts(timedelta(days=100), chunk_size=2)
+    assert ArchivedAttempt.objects.count() == 7
+
+    paginator = KeysetPaginator(Progress(user=user).show_exams(), 3)
+    page = paginator.page()
+    walked = list(page)
+    while page.has_next():
+        page = paginator.page(after=page.next_cursor)
+        walked.extend(page)
+
+    assert [attempt.id for attempt in walked] == expected
+    assert isinstance(walked[-1], ArchivedAttempt)
+    assert Attempt.objects.with_archive().filter(user=user).count() == 10
+
+
+def test_single_attempt_counts_archived(quiz: Quiz, user: User):
+    quiz.single_attempt = True
+    quiz.save()
+    complete_attempt(quiz, user, 200)
+    archive_attempts()
+
+    assert Attempt.objects.user_attempt(user, quiz) is False
+    assert not Attempt.objects.exists()
+
+
+def test_rebuild_stats_includes_archive(quiz: Quiz, user: User):
+    complete_attempt(quiz, user, 200)
+    complete_attempt(quiz, user, 1)
+    rebuild_stats()
+    before = (
+        list(QuizStats.objects.values_list()),
+        sorted(QuestionStats.objects.values_list()),
+    )
+
+    archive_attempts()
+    rebuild_stats()
+
+    assert list(QuizStats.objects.values_list()) == before[0]
+    assert sorted(QuestionStats.objects.values_list()) == before[1]
+
+
+def test_command(quiz: Quiz, user: User, capsys):
+    complete_attempt(quiz, user, 20)
+
+    call_command("archive_attempts", "--days", "10")
+
+    assert "1 tentativas arquivadas" in capsys.readouterr().out
+    assert ArchivedAttempt.objects.count() == 1
+
+
+def started(quiz, user, days_ago):
+    attempt = Attempt.objects.new_attempt(user, quiz)
+    Attempt.objects.filter(pk=attempt.pk).update(
+        start=timezone.now() - timedelta(days=days_ago)
+    )
+    return attempt
+
+
+class TestPurgeStaleAttempts:
+    def test_purges_abandoned(self, quiz: Quiz, user: User):
+        abandoned = started(quiz, user, 60)
+        # Começou há muito tempo, mas respondeu há pouco
+        active = started(quiz, User.objects.create(username="ativo"), 60)
+        active.record_answer(active.get_questions()[0], "1", True)
+        recent = started(quiz, User.objects.create(username="outro"), 1)
+        done = complete_attempt(quiz, User.objects.create(username="concluiu"), 60)
+
+        assert purge_stale_attempts(chunk_size=1, pause=0) == 1
+
+        assert set(Attempt.objects.values_list("id", flat=True)) == {
+            active.id,
+            recent.id,
+            done.id,
+        }
+        assert not AttemptResponse.objects.filter(attempt_id=abandoned.id).exists()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_purge_discounts_attempts(self, quiz: Quiz, user: User):
+        started(quiz, user, 60)
+        started(quiz, User.objects.create(username="outro"), 1)
+
+        purge_stale_attempts(pause=0)
+
+        assert QuizStats.objects.get(quiz=quiz).attempts == 1
+        rebuild_stats()
+        assert QuizStats.objects.get(quiz=quiz).attempts == 1
+
+    def test_command(self, quiz: Quiz, user: User, capsys):
+        started(quiz, user, 20)
+
+        call_command("purge_stale_attempts", "--days", "10", "--pause", "0")
+
+        assert "1 tentativas apagadas" in capsys.readouterr().out
+        assert not Attempt.objects.exists()
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from tabelionato.quiz.models import Answer, Attempt
+from tabelionato.quiz.tests import benchmarks
+from tabelionato.quiz.tests.factories import AttemptFactory
+
+pytestmark = pytest.mark.django_db
+
+
+def test_build_quiz_mixes_question_types():
+    quiz = benchmarks.build_quiz(6)
+    questions = list(quiz.get_questions().select_subclasses())
+
+    assert len(questions) == 6
+    assert {type(q).__name__ for q in questions} == {
+        "MultiChoiceQuestion",
+        "TrueFalseQuestion",
+    }
+    assert Answer.objects.filter(question__quiz=quiz, is_correct=True).count() == 3
+
+
+def test_attempt_factory_draws_questions():
+    attempt = AttemptFactory(quiz=benchmarks.build_quiz(4))
+
+    assert Attempt.objects.get(pk=attempt.pk).responses.count() == 4
+
+
+def test_run_every_benchmark(tmp_path):
+    document = benchmarks.run(sizes=[2], repeat=2)
+
+    assert document["version"] == benchmarks.FORMAT_VERSION
+    assert set(document["results"]) == {
+        "%s[2]" % name for name in benchmarks.BENCHMARKS
+    }
+    result = document["results"]["new_attempt[2]"]
+    assert result["repeat"] == 2
+    assert result["min"] <= result["median"]
+    assert result["queries"] > 0
+
+    path = tmp_path / "resultado.json"
+    benchmarks.dump(document, path)
+    assert benchmarks.load(path) == json.loads(json.dumps(document))
+
+
+def test_compare_flags_regressions():
+    def document(**medians):
+        return {"results": {key: {"median": m} for key, m in medians.items()}}
+
+    rows = benchmarks.compare(
+        document(a=1.0, b=1.0, c=0), document(a=1.1, b=1.5, c=1.0, d=1.0), 1.2
+    )
+
+    assert [(key, regressed) for key, *_, regressed in rows] == [
+        ("a", False),
+        ("b", True),
+    ]
+
+
+def test_benchmark_quiz_command(tmp_path):
+    baseline = tmp_path / "base.json"
+    call_command(
+        "benchmark_quiz",
+        "check_answer",
+        "--sizes=2",
+        "--repeat=1",
+        output=str(baseline),
+    )
+    assert not Attempt.objects.exists()
+
+    document = benchmarks.load(baseline)
+    for result in document["results"].values():
+        result["median"] /= 100
+    benchmarks.dump(document, baseline)
+
+    with pytest.raises(CommandError, match="check_answer"):
+        call_command(
+            "benchmark_quiz",
+            "check_answer",
+            "--sizes=2",
+            "--repeat=1",
+            compare=str(baseline),
+        )
+
+
+def test_benchmark_quiz_command_unknown():
+    with pytest.raises(CommandError, match="desconhecidos"):
+        call_command("benchmark_quiz", "nada")
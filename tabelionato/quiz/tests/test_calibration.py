@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from tabelionato.quiz.calibration import prox, recalibrate, to_difficulty_scale
+from tabelionato.quiz.models import Attempt, CalibrationState, Question, Quiz
+from tabelionato.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+LATER = timezone.now() + timedelta(hours=1)
+
+
+def take_quiz(quiz, number, outcomes):
+    """
+    Cria um usuário que conclui o questionário; ``outcomes`` diz, para cada
+    questão em ordem de id, se ele acertou.
+    """
+    user = User.objects.create(username="aluno%s" % number)
+    attempt = Attempt.objects.new_attempt(user, quiz)
+    for question, is_correct in zip(attempt.get_questions(), outcomes):
+        attempt.record_answer(question, "1", is_correct)
+    attempt.mark_quiz_complete()
+    return attempt
+
+
+@pytest.fixture
+def answered_quiz(quiz: Quiz) -> Quiz:
+    # Primeira questão sempre certa, segunda sempre errada, terceira meio a meio
+    for number in range(10):
+        take_quiz(quiz, number, [True, False, number % 2 == 0])
+    return quiz
+
+
+def test_prox_is_finite_for_extreme_scores():
+    logits = prox(0.0, 0.0, np.array([0, 5, 10]), np.array([10, 10, 10]))
+
+    assert np.all(np.isfinite(logits))
+    assert logits[0] < logits[1] == 0 < logits[2]
+
+
+def test_to_difficulty_scale():
+    assert to_difficulty_scale([-3, -1, 0, 1, 3]).tolist() == [1, 2, 3, 4, 5]
+
+
+def test_recalibrate(answered_quiz: Quiz):
+    result = recalibrate(min_responses=5, now=LATER)
+
+    assert result == {"attempts": 10, "responses": 30, "updated": 2}
+
+    easy, hard, even = Question.objects.filter(quiz=answered_quiz).order_by("id")
+    assert (easy.difficulty, hard.difficulty, even.difficulty) == (1, 5, 3)
+    assert easy.calibration.p_value == 1.0
+    assert hard.calibration.p_value == 0.0
+    assert easy.calibration.rasch_difficulty < 0 < hard.calibration.rasch_difficulty
+
+
+def test_recalibrate_is_incremental(answered_quiz: Quiz):
+    recalibrate(min_responses=5, now=LATER)
+
+    assert recalibrate(min_responses=5, now=LATER)["attempts"] == 0
+
+    take_quiz(answered_quiz, 99, [True, True, True])
+    result = recalibrate(min_responses=5, now=LATER)
+    hard = Question.objects.filter(quiz=answered_quiz).order_by("id")[1]
+
+    assert result["attempts"] == 1
+    assert hard.calibration.seen == 11
+    assert hard.calibration.correct == 1
+
+
+def test_recalibrate_skips_recent_attempts(answered_quiz: Quiz):
+    result = recalibrate(min_responses=5)
+
+    assert result["attempts"] == 0
+    assert CalibrationState.objects.get().last_end is None
+
+
+def test_recalibrate_respects_min_responses(answered_quiz: Quiz):
+    result = recalibrate(now=LATER)
+
+    assert result["updated"] == 0
+    assert not Question.objects.filter(quiz=answered_quiz, difficulty=5).exists()
+
+
+def test_recalibrate_full(answered_quiz: Quiz):
+    recalibrate(min_responses=5, now=LATER)
+    call_command("recalibrate_difficulty", "--full", "--min-responses=5")
+
+    state = CalibrationState.objects.get()
+    # As tentativas recentes ficam para a próxima execução
+    assert state.last_end is None
+    assert not Question.objects.filter(calibration__isnull=False).exists()
@@ -0,0 +1,74 @@
+import pytest
+from django.core.cache import cache
+
+from tabelionato.quiz import fragments
+from tabelionato.quiz.fragments import get_question_fragments
+from tabelionato.quiz.models import Quiz
+from tabelionato.quiz.snapshots import get_quiz_snapshot, invalidate_quiz_snapshots
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    calls = []
+    render = fragments.render_question_fragments
+
+    def counting(question):
+        calls.append(question.id)
+        return render(question)
+
+    monkeypatch.setattr(fragments, "render_question_fragments", counting)
+    return calls
+
+
+def test_fragments_rendered_once(quiz: Quiz, renders):
+    snapshot = get_quiz_snapshot(quiz.id)
+
+    rows = get_question_fragments(snapshot, snapshot.questions)
+    again = get_question_fragments(snapshot, snapshot.questions)
+
+    assert len(renders) == 3
+    assert [q.id for q, _ in rows] == [q.id for q, _ in again]
+    question, fragment = rows[0]
+    assert fragment == again[0][1]
+    assert question.content in fragment.header
+    assert "Certa" in fragment.answers
+    assert "text-success" in fragment.answers
+
+
+def test_fragments_follow_quiz_version(quiz: Quiz, renders):
+    get_question_fragments(*_snapshot_questions(quiz))
+
+    invalidate_quiz_snapshots([quiz.id])
+    get_question_fragments(*_snapshot_questions(quiz))
+
+    assert len(renders) == 6
+
+
+def test_fragments_read_in_one_call(quiz: Quiz, monkeypatch):
+    snapshot, questions = _snapshot_questions(quiz)
+    get_question_fragments(snapshot, questions)
+
+    calls = []
+    get_many = cache.get_many
+    monkeypatch.setattr(
+        cache, "get_many", lambda keys: calls.append(keys) or get_many(keys)
+    )
+    get_question_fragments(snapshot, questions)
+
+    assert len(calls) == 1
+
+
+def test_fragments_without_version(quiz: Quiz, renders):
+    questions = list(quiz.get_questions().select_subclasses())
+
+    get_question_fragments(quiz, questions)
+    get_question_fragments(quiz, questions)
+
+    assert len(renders) == 6
+
+
+def _snapshot_questions(quiz):
+    snapshot = get_quiz_snapshot(quiz.id)
+    return snapshot, snapshot.questions
@@ -0,0 +1,160 @@
+import io
+import json
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+
+from tabelionato.quiz.importer import CSV, import_questions
+from tabelionato.quiz.models import (
+    Answer,
+    Category,
+    MultiChoiceQuestion,
+    Question,
+    Quiz,
+    TrueFalseQuestion,
+)
+from tabelionato.quiz.snapshots import get_quiz_snapshot
+
+pytestmark = pytest.mark.django_db
+
+RECORDS = [
+    {
+        "type": "multichoice",
+        "content": "Qual o prazo do registro?",
+        "category": "Registro de Imóveis",
+        "difficulty": 2,
+        "quizzes": ["registro-de-imoveis"],
+        "answers": [
+            {"content": "30 dias", "correct": True},
+            {"content": "60 dias"},
+        ],
+    },
+    {
+        "type": "truefalse",
+        "content": "A escritura é pública?",
+        "category": "registro de imoveis",
+        "is_correct": True,
+    },
+]
+
+
+def jsonl(records):
+    return io.StringIO("\n".join(json.dumps(record) for record in records))
+
+
+def test_import_jsonl(quiz: Quiz):
+    result = import_questions(jsonl(RECORDS))
+
+    assert (result.read, result.created, result.skipped) == (2, 2, 0)
+    assert result.errors == []
+
+    multi = MultiChoiceQuestion.objects.get(content="Qual o prazo do registro?")
+    true_false = TrueFalseQuestion.objects.get(content="A escritura é pública?")
+    assert multi.difficulty == 2
+    assert true_false.is_correct is True
+    assert multi.category == true_false.category
+    assert multi.category.category == "registro-de-imoveis"
+    assert list(multi.get_correct_answer().values_list("content", flat=True)) == [
+        "30 dias"
+    ]
+    assert list(multi.quiz.all()) == [quiz]
+    assert len(get_quiz_snapshot(quiz.id).questions) == 4
+
+
+def test_reimport_is_idempotent(quiz: Quiz):
+    import_questions(jsonl(RECORDS))
+    result = import_questions(jsonl(RECORDS + RECORDS))
+
+    assert (result.created, result.skipped) == (0, 4)
+    assert Question.objects.count() == 5
+    assert Answer.objects.count() == 6
+
+
+def test_dry_run_reports_errors(quiz: Quiz):
+    invalid = [
+        {"type": "multichoice", "content": "Sem certa", "answers": ["a", "b"]},
+        {"type": "truefalse", "content": "Sem gabarito"},
+        {"type": "essay", "content": "?"},
+        {"type": "truefalse", "content": "X", "is_correct": 1, "quizzes": ["nao"]},
+    ]
+    stream = io.StringIO(jsonl(RECORDS + invalid).getvalue() + "\n{quebrado")
+
+    result = import_questions(stream, dry_run=True)
+
+    assert result.created == 2
+    assert [line for line, _ in result.errors] == [3, 4, 5, 6, 7]
+    assert Question.objects.count() == 3
+    assert not Category.objects.filter(category="registro-de-imoveis").exists()
+
+
+def test_import_csv(quiz: Quiz):
+    stream = io.StringIO(
+        "type,content,category,answers,is_correct,quizzes\n"
+        'multichoice,"Primeira, com vírgula",Notas,*Certa|Errada,,'
+        "registro-de-imoveis\n"
+        "truefalse,Segunda,Notas,,falso,\n"
+    )
+
+    result = import_questions(stream, format=CSV, batch_size=1)
+
+    assert (result.created, result.errors) == (2, [])
+    assert TrueFalseQuestion.objects.get(content="Segunda").is_correct is False
+    question = MultiChoiceQuestion.objects.get(content="Primeira, com vírgula")
+    assert question.get_answer_list_with_correct()[0][1:] == ("Certa", True)
+
+
+def test_import_command(quiz: Quiz, tmp_path):
+    path = tmp_path / "questoes.jsonl"
+    path.write_text(jsonl(RECORDS).getvalue(), encoding="utf-8")
+    out = io.StringIO()
+
+    call_command("import_questions", str(path), stdout=out)
+
+    assert "2 questões criadas" in out.getvalue()
+
+
+def test_admin_upload(quiz: Quiz, admin_client):
+    url = reverse("admin:quiz_multichoicequestion_import")
+    changelist = admin_client.get(reverse("admin:quiz_multichoicequestion_changelist"))
+    assert url in changelist.content.decode()
+
+    upload = SimpleUploadedFile(
+        "questoes.jsonl", jsonl(RECORDS).getvalue().encode("utf-8")
+    )
+
+    response = admin_client.post(url, {"file": upload})
+
+    assert response.status_code == 200
+    assert response.context["result"].created == 2
+    assert Question.objects.count() == 5
+
+
+def test_new_category_normalizes_name():
+    first = Category.objects.new_category("Registro de Imóveis")
+    second = Category.objects.new_category("  registro de imoveis ")
+
+    assert first == second
+    assert first.category == "registro-de-imoveis"
+
+
+def test_reuses_categories_named_in_admin():
+    admin_category = Category.objects.create(category="Registro de Imóveis")
+
+    assert Category.objects.new_category("registro de imoveis") == admin_category
+    assert (
+        Category.objects.get_or_create_many(["Registro de Imóveis", "Protesto"])[
+            "registro-de-imoveis"
+        ]
+        == admin_category
+    )
+    assert Category.objects.count() == 2
+
+
+def test_category_clean_rejects_same_normalized_name():
+    Category.objects.new_category("Registro de Imóveis")
+
+    with pytest.raises(ValidationError):
+        Category(category="REGISTRO DE IMOVEIS").full_clean()
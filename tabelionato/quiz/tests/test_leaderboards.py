@@ -0,0 +1,133 @@
+from datetime import datetime, timezone
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from tabelionato.quiz import leaderboards
+from tabelionato.quiz.models import Attempt, Quiz
+from tabelionato.quiz.snapshots import get_quiz_snapshot
+from tabelionato.quiz.stats import rebuild_leaderboards
+from tabelionato.users.models import User
+from tabelionato.users.tests.factories import UserFactory
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def complete(user, quiz, correct):
+    """
+    Conclui uma tentativa de ``user`` acertando as ``correct`` primeiras
+    questões.
+    """
+    snapshot = get_quiz_snapshot(quiz.id)
+    attempt = Attempt.objects.new_attempt(user, snapshot)
+    guesses = {}
+    for n, question in enumerate(snapshot.get_questions(attempt._question_ids())):
+        choices = question.get_answer_list_with_correct()
+        guesses[question.id] = next(c[0] for c in choices if c[2] == (n < correct))
+    attempt.grade_answers(snapshot.questions, guesses)
+    return attempt
+
+
+def test_results_not_stored_stay_out(quiz: Quiz, user: User):
+    quiz.store_result = False
+    quiz.save()
+
+    complete(user, quiz, 3)
+
+    assert leaderboards.top(leaderboards.quiz_scope(quiz.id)) == []
+    assert leaderboards.top(leaderboards.GLOBAL) == []
+
+
+def test_period_name():
+    when = datetime(2021, 1, 1, 12, tzinfo=timezone.utc)
+
+    assert leaderboards.period_name(leaderboards.WEEK, when) == "week:2020-W53"
+    assert leaderboards.period_name(leaderboards.MONTH, when) == "month:2021-01"
+    assert leaderboards.period_name(leaderboards.ALL, when) == "all"
+
+
+def test_completion_updates_boards(quiz: Quiz, user: User):
+    other = UserFactory()
+    complete(user, quiz, 1)
+    complete(user, quiz, 2)
+    complete(other, quiz, 3)
+    scope = leaderboards.quiz_scope(quiz.id)
+
+    # No questionário vale a melhor porcentagem; no geral, a soma
+    assert leaderboards.top(scope) == [(other.id, 100), (user.id, 67)]
+    assert dict(leaderboards.top(leaderboards.GLOBAL, leaderboards.WEEK)) == {
+        user.id: 3,
+        other.id: 3,
+    }
+    assert leaderboards.rank(scope, user.id) == (2, 67)
+    assert leaderboards.rank(scope, UserFactory().id) == (None, None)
+    category = leaderboards.category_scope(quiz.category_id)
+    assert dict(leaderboards.top(category, leaderboards.MONTH)) == {
+        user.id: 3,
+        other.id: 3,
+    }
+
+
+def test_completed_twice_counts_once(quiz: Quiz, user: User):
+    attempt = complete(user, quiz, 3)
+
+    attempt.mark_quiz_complete()
+
+    assert leaderboards.top(leaderboards.GLOBAL) == [(user.id, 3)]
+
+
+def test_rebuild_matches_incremental(quiz: Quiz, user: User):
+    complete(user, quiz, 1)
+    complete(UserFactory(), quiz, 2)
+    backend = leaderboards.get_backend()
+    incremental = {key: dict(board) for key, board in backend.boards.items()}
+    backend.clear()
+    backend.replace("quiz:leaderboard:quiz:0:all", {1: 1}, None)
+
+    assert rebuild_leaderboards() == len(incremental)
+    assert backend.boards == incremental
+
+
+def test_rebuild_command(quiz: Quiz, user: User, capsys):
+    complete(user, quiz, 3)
+    leaderboards.get_backend().clear()
+
+    call_command("rebuild_leaderboards")
+
+    assert "rankings reconstruídos" in capsys.readouterr().out
+    assert leaderboards.top(leaderboards.GLOBAL) == [(user.id, 3)]
+
+
+class TestLeaderboardView:
+    def test_global(self, quiz: Quiz, user: User, client):
+        complete(user, quiz, 2)
+        client.force_login(user)
+
+        response = client.get(reverse("quiz:leaderboard"), {"periodo": "semana"})
+
+        assert response.status_code == 200
+        assert response.context["ranking"] == [(1, user, 2)]
+        assert response.context["my_rank"] == (1, 2)
+        assert response.context["period"] == "semana"
+
+    def test_quiz_and_category(self, quiz: Quiz, user: User, client):
+        complete(user, quiz, 3)
+
+        response = client.get(
+            reverse("quiz:quiz_leaderboard", kwargs={"quiz_url": quiz.url})
+        )
+        assert response.context["ranking"] == [(1, user, 100)]
+        assert "100%" in response.content.decode()
+
+        response = client.get(
+            reverse("quiz:category_leaderboard", kwargs={"category_name": "registro"})
+        )
+        assert response.context["ranking"] == [(1, user, 3)]
+
+    def test_unknown_quiz(self, client):
+        response = client.get(
+            reverse("quiz:quiz_leaderboard", kwargs={"quiz_url": "inexistente"})
+        )
+
+        assert response.status_code == 404
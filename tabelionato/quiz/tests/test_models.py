@@ -0,0 +1,199 @@
+import pytest
+from django.db import IntegrityError, transaction
+from django.db.models import QuerySet
+
+from tabelionato.quiz.models import (
+    Attempt,
+    AttemptResponse,
+    Category,
+    MultiChoiceQuestion,
+    Progress,
+    ProgressCategoryScore,
+    Quiz,
+    prefetch_answers,
+)
+from tabelionato.quiz.tests.factories import MultiChoiceQuestionFactory
+from tabelionato.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+class TestAttempt:
+    def test_new_attempt_creates_responses(self, quiz: Quiz, user: User):
+        attempt = Attempt.objects.new_attempt(user, quiz)
+
+        assert attempt.max_score == 3
+        assert list(attempt.responses.values_list("position", flat=True)) == [0, 1, 2]
+        assert attempt.progress() == (0, 3)
+
+    def test_user_attempt_resumes(
+        self, quiz: Quiz, user: User, django_assert_num_queries
+    ):
+        attempt = Attempt.objects.new_attempt(user, quiz)
+
+        with django_assert_num_queries(1):
+            assert Attempt.objects.user_attempt(user, quiz) == attempt
+
+    def test_user_attempt_single_attempt(
+        self, quiz: Quiz, user: User, django_assert_num_queries
+    ):
+        quiz.single_attempt = True
+        quiz.save()
+        attempt = Attempt.objects.user_attempt(user, quiz)
+        attempt.mark_quiz_complete()
+
+        with django_assert_num_queries(1):
+            assert Attempt.objects.user_attempt(user, quiz) is False
+
+    def test_one_attempt_in_progress(self, quiz: Quiz, user: User):
+        Attempt.objects.new_attempt(user, quiz)
+
+        with pytest.raises(IntegrityError), transaction.atomic():
+            Attempt.objects.new_attempt(user, quiz)
+
+    def test_user_attempt_concurrent_start(self, quiz: Quiz, user: User, monkeypatch):
+        attempt = Attempt.objects.new_attempt(user, quiz)
+        # Outra requisição criou a tentativa depois da nossa consulta
+        monkeypatch.setattr(QuerySet, "first", lambda self: None)
+
+        assert Attempt.objects.user_attempt(user, quiz) == attempt
+        assert Attempt.objects.filter(user=user).count() == 1
+
+    def test_record_answer(self, quiz: Quiz, user: User, django_assert_num_queries):
+        attempt = Attempt.objects.new_attempt(user, quiz)
+        first = attempt.get_first_question()
+
+        with django_assert_num_queries(2):
+            attempt.record_answer(first, "10", True)
+
+        attempt.refresh_from_db()
+        assert attempt.current_score == 1
+        assert attempt.progress() == (1, 3)
+        assert attempt.get_first_question_id() != first.id
+        assert attempt.get_user_answers() == {first.id: "10"}
+
+    def test_record_answer_once(self, quiz: Quiz, user: User):
+        attempt = Attempt.objects.new_attempt(user, quiz)
+        first = attempt.get_first_question()
+
+        assert attempt.record_answer(first, "10", True) is True
+        # POST repetido para a mesma questão
+        assert attempt.record_answer(first, "11", True) is False
+
+        attempt.refresh_from_db()
+        assert attempt.current_score == 1
+        assert attempt.get_user_answers() == {first.id: "10"}
+
+    def test_incorrect_questions(self, quiz: Quiz, user: User):
+        attempt = Attempt.objects.new_attempt(user, quiz)
+        question = attempt.get_first_question()
+        attempt.record_answer(question, "1", False)
+
+        assert attempt.get_incorrect_questions == [question.id]
+
+        attempt.remove_incorrect_question(question)
+
+        assert attempt.get_incorrect_questions == []
+        assert Attempt.objects.get(pk=attempt.pk).current_score == 1
+
+    def test_get_questions_with_answers(self, quiz: Quiz, user: User):
+        attempt = Attempt.objects.new_attempt(user, quiz)
+        for question in attempt.get_questions():
+            attempt.record_answer(question, "1", False)
+
+        questions = attempt.get_questions(with_answers=True)
+
+        assert [q.id for q in questions] == attempt._question_ids()
+        assert all(q.user_answer == "1" for q in questions)
+        assert AttemptResponse.objects.filter(attempt=attempt).count() == 3
+
+    def test_get_questions_prefetches_answers(
+        self, quiz: Quiz, user: User, django_assert_num_queries
+    ):
+        MultiChoiceQuestionFactory.create_batch(10, quizzes=[quiz])
+        attempt = Attempt.objects.new_attempt(user, quiz)
+
+        # Respostas, questões e alternativas, qualquer que seja o tamanho
+        with django_assert_num_queries(3):
+            questions = attempt.get_questions(with_answers=True)
+
+        assert len(questions) == 13
+        with django_assert_num_queries(0):
+            for question in questions:
+                if not isinstance(question, MultiChoiceQuestion):
+                    continue
+                choices = question.get_answer_list_with_correct()
+                correct = [choice for choice in choices if choice[2]][0]
+                assert question.check_answer(correct[0]) is True
+                assert question.answer_choice_to_string(correct[0]) == correct[1]
+                assert question.get_answer_list() == [c[:2] for c in choices]
+
+
+class TestMultiChoiceQuestion:
+    def test_answer_methods(self, quiz: Quiz, django_assert_num_queries):
+        question = MultiChoiceQuestionFactory(answers=3)
+        first, second, _ = question.get_answer_list()
+
+        assert question.check_answer(str(first[0])) is True
+        assert question.check_answer(second[0]) is False
+        assert question.answer_choice_to_string(second[0]) == second[1]
+        assert list(question.get_correct_answer()) == [question.answer_set.first()]
+
+    def test_foreign_answer_rejected(self, quiz: Quiz):
+        question = MultiChoiceQuestionFactory()
+        other = MultiChoiceQuestionFactory()
+
+        with pytest.raises(TypeError):
+            question.check_answer(other.get_answer_list()[0][0])
+        with pytest.raises(TypeError):
+            question.answer_choice_to_string("x")
+
+    def test_prefetch_answers(self, django_assert_num_queries):
+        questions = MultiChoiceQuestionFactory.create_batch(5)
+
+        with django_assert_num_queries(1):
+            prefetch_answers(questions)
+
+        with django_assert_num_queries(0):
+            assert all(len(q.get_answer_list()) == 4 for q in questions)
+
+
+class TestProgress:
+    def test_update_score(self, quiz: Quiz, user: User):
+        progress = Progress.objects.new_progress(user)
+        question = quiz.question_set.first()
+
+        progress.update_score(question, 1, 1)
+        progress.update_score(question, 0, 1)
+
+        score = ProgressCategoryScore.objects.get(user=user)
+        assert (score.correct, score.possible) == (1, 2)
+
+    def test_update_score_without_category(self, quiz: Quiz, user: User):
+        progress = Progress.objects.new_progress(user)
+        question = quiz.question_set.first()
+        question.category = None
+
+        assert progress.update_score(question, 1, 1)[0] == "error"
+        assert not ProgressCategoryScore.objects.exists()
+
+    def test_list_all_cat_scores(
+        self, category: Category, user: User, django_assert_num_queries
+    ):
+        other = Category.objects.create(category="notas")
+        progress = Progress.objects.new_progress(user)
+        progress.update_scores({category.id: [1, 4]})
+
+        with django_assert_num_queries(1):
+            scores = progress.list_all_cat_scores
+
+        assert scores == {"notas": [0, 0, 0], "registro": [1, 4, 25]}
+        assert other.category in scores
+
+
+def test_get_random_question(quiz: Quiz):
+    question = quiz.question_set.first()
+
+    random_question = question.get_random_question()
+
+    assert random_question.id in quiz.question_set.values_list("id", flat=True)
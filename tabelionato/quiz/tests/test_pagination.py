@@ -0,0 +1,78 @@
+import pytest
+from django.test import RequestFactory
+from django.utils import timezone
+
+from tabelionato.quiz.models import Attempt, Quiz
+from tabelionato.quiz.pagination import KeysetPaginator
+from tabelionato.quiz.views import quizUserProgressView
+from tabelionato.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def attempts(quiz: Quiz, user: User):
+    for _ in range(25):
+        Attempt.objects.new_attempt(user, quiz).mark_quiz_complete()
+    # Metade com o mesmo início, para o desempate pelo id
+    ids = list(Attempt.objects.order_by("id").values_list("id", flat=True))
+    Attempt.objects.filter(id__in=ids[:12]).update(start=timezone.now())
+    return list(Attempt.objects.order_by("-start", "-id").values_list("id", flat=True))
+
+
+def ids(page):
+    return [attempt.id for attempt in page]
+
+
+def test_walks_forward_and_backward(attempts):
+    paginator = KeysetPaginator(Attempt.objects.all(), 10)
+
+    pages = [paginator.page()]
+    while pages[-1].has_next():
+        pages.append(paginator.page(after=pages[-1].next_cursor))
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert sum((ids(page) for page in pages), []) == attempts
+    assert not pages[0].has_previous() and pages[-1].has_previous()
+
+    previous = paginator.page(before=pages[-1].previous_cursor)
+    assert ids(previous) == ids(pages[1])
+    assert previous.has_next() and previous.has_previous()
+
+    first = paginator.page(before=previous.previous_cursor)
+    assert ids(first) == ids(pages[0])
+    assert not first.has_previous()
+
+
+def test_deep_pages_cost_one_query(attempts, django_assert_num_queries):
+    paginator = KeysetPaginator(Attempt.objects.all(), 10)
+    cursor = paginator.page(after=paginator.page().next_cursor).next_cursor
+
+    with django_assert_num_queries(1):
+        paginator.page(after=cursor)
+
+
+def test_invalid_cursor_returns_first_page(attempts):
+    paginator = KeysetPaginator(Attempt.objects.all(), 10)
+
+    for cursor in ["lixo", "WzFd", "WyJ4IiwgMV0"]:
+        assert ids(paginator.page(after=cursor)) == attempts[:10]
+
+
+def test_cached_count(attempts, django_assert_num_queries):
+    queryset = Attempt.objects.all()
+    assert KeysetPaginator(queryset, 10, count_cache_key="contagem").count == 25
+
+    with django_assert_num_queries(0):
+        assert KeysetPaginator(queryset, 10, count_cache_key="contagem").count == 25
+    assert KeysetPaginator(queryset, 10).count is None
+
+
+def test_progress_view(attempts, user: User):
+    request = RequestFactory().get("/", {"after": "lixo"})
+    request.user = user
+
+    response = quizUserProgressView(request)
+
+    assert response.status_code == 200
+    assert "?after=" in response.content.decode()
@@ -0,0 +1,42 @@
+import pytest
+from django.urls import reverse
+
+from tabelionato.quiz.models import MultiChoiceQuestion, Quiz
+from tabelionato.quiz.search import search_questions, search_quizzes
+
+pytestmark = pytest.mark.django_db
+
+
+def test_search_questions(quiz: Quiz):
+    question = MultiChoiceQuestion.objects.filter(quiz=quiz).first()
+    question.explanation = "Artigo 1.245 do Código Civil"
+    question.save()
+
+    found = search_questions(MultiChoiceQuestion.objects.all(), " código civil ")
+
+    assert list(found) == [question]
+    assert search_questions(MultiChoiceQuestion.objects.all(), "").count() == 2
+
+
+def test_search_quizzes(quiz: Quiz):
+    Quiz.objects.create(title="Notas", url="notas", description="Tabelionato")
+
+    assert list(search_quizzes(Quiz.objects.all(), "registro")) == [quiz]
+
+
+def test_search_view_hides_drafts(quiz: Quiz, client):
+    Quiz.objects.create(title="Registro rascunho", url="rascunho", draft=True)
+
+    response = client.get(reverse("quiz:quiz_search"), {"q": "registro"})
+
+    assert response.status_code == 200
+    assert list(response.context["quiz_list"]) == [quiz]
+
+
+def test_admin_search(quiz: Quiz, admin_client):
+    url = reverse("admin:quiz_multichoicequestion_changelist")
+
+    response = admin_client.get(url, {"q": "Questão 1"})
+
+    assert response.status_code == 200
+    assert [q.content for q in response.context["cl"].result_list] == ["Questão 1"]
@@ -0,0 +1,82 @@
+import pytest
+from django.core.exceptions import ValidationError
+
+from tabelionato.quiz.models import Attempt, Quiz
+from tabelionato.quiz.selection import (
+    PoolItem,
+    select_questions,
+    validate_blueprint,
+)
+from tabelionato.users.models import User
+
+POOL = [
+    PoolItem(id, 1 if id <= 10 else 2, "registro" if id <= 10 else "notas", d)
+    for id, d in zip(range(1, 21), [1, 2, 3, 4, 5] * 4)
+]
+
+
+def test_keeps_order_without_random_order():
+    assert select_questions(POOL, max_questions=3) == [1, 2, 3]
+
+
+def test_seeded_sampling_is_reproducible():
+    first = select_questions(POOL, random_order=True, max_questions=5, seed=42)
+    second = select_questions(POOL, random_order=True, max_questions=5, seed=42)
+
+    assert first == second
+    assert len(set(first)) == 5
+
+
+def test_blueprint():
+    blueprint = [
+        {"category": "registro", "difficulty": [1, 2], "count": 3},
+        {"category": 2, "difficulty": 5, "count": 1},
+        {"count": 2},
+    ]
+
+    selected = select_questions(POOL, blueprint=blueprint, seed=1)
+    items = {item.id: item for item in POOL}
+
+    assert len(selected) == len(set(selected)) == 6
+    assert selected == sorted(selected)
+    assert [
+        items[qid].category == "registro" and items[qid].difficulty <= 2
+        for qid in selected
+    ].count(True) >= 3
+    assert any(
+        items[qid].category_id == 2 and items[qid].difficulty == 5 for qid in selected
+    )
+
+
+def test_blueprint_with_too_few_questions():
+    blueprint = [{"category": "registro", "difficulty": 5, "count": 10}]
+
+    assert select_questions(POOL, blueprint=blueprint) == [5, 10]
+
+
+@pytest.mark.parametrize(
+    "blueprint",
+    [
+        {"count": 1},
+        [{"count": 0}],
+        [{"count": 1, "difficulty": [4, 2]}],
+        [{"count": 1, "difficulty": 6}],
+        [{"count": 1, "level": 1}],
+        [{"count": True}],
+        [{"count": 1, "difficulty": True}],
+        [{"count": 1, "difficulty": [True, 2]}],
+    ],
+)
+def test_validate_blueprint_rejects(blueprint):
+    with pytest.raises(ValidationError):
+        validate_blueprint(blueprint)
+
+
+@pytest.mark.django_db
+def test_new_attempt_uses_blueprint(quiz: Quiz, user: User):
+    quiz.blueprint = [{"difficulty": 1, "count": 2}]
+    quiz.save()
+
+    attempt = Attempt.objects.new_attempt(user, quiz, seed=3)
+
+    assert attempt.max_score == 2
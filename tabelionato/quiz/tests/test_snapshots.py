@@ -0,0 +1,182 @@
+import pickle
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+
+from tabelionato.quiz.models import (
+    Answer,
+    Attempt,
+    Quiz,
+    TrueFalseQuestion,
+    true_false_guess,
+)
+from tabelionato.quiz.snapshots import (
+    TRUE_FALSE,
+    LocalSnapshots,
+    compile_quiz,
+    get_quiz_snapshot,
+    get_quiz_snapshot_by_url,
+    get_snapshot_version,
+    invalidate_quiz_snapshots,
+)
+from tabelionato.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+def test_compile_quiz(quiz: Quiz):
+    snapshot = compile_quiz(quiz.id)
+
+    assert snapshot.title == quiz.title
+    assert snapshot.category == "registro"
+    assert [q.id for q in snapshot.questions] == sorted(
+        quiz.question_set.values_list("id", flat=True)
+    )
+
+    multi_choice, _, true_false = snapshot.questions
+    correct = Answer.objects.get(question_id=multi_choice.id, is_correct=True)
+    assert snapshot.answer_key[multi_choice.id] == frozenset([correct.id])
+    assert snapshot.answer_key[true_false.id] is True
+    assert multi_choice.check_answer(str(correct.id)) is True
+    assert multi_choice.answer_choice_to_string(correct.id) == "Certa"
+    assert true_false.get_answer_list() == [(1, "Verdadeiro"), (0, "Falso")]
+
+
+def test_snapshot_pickles(quiz: Quiz):
+    snapshot = pickle.loads(pickle.dumps(compile_quiz(quiz.id)))
+
+    question = snapshot.questions[0]
+    assert snapshot.get_question(question.id) == question
+
+
+def test_snapshot_served_from_cache(quiz: Quiz, django_assert_num_queries):
+    get_quiz_snapshot_by_url(quiz.url)
+
+    with django_assert_num_queries(0):
+        snapshot = get_quiz_snapshot_by_url(quiz.url)
+
+    assert snapshot.id == quiz.id
+
+
+@pytest.mark.django_db(transaction=True)
+def test_snapshot_invalidated_on_answer_change(quiz: Quiz):
+    snapshot = get_quiz_snapshot(quiz.id)
+    answer = Answer.objects.filter(question__quiz=quiz).first()
+
+    answer.content = "Alterada"
+    answer.save()
+
+    assert get_snapshot_version(quiz.id) != snapshot.version
+    updated = get_quiz_snapshot(quiz.id)
+    assert "Alterada" in [a.content for q in updated.questions for a in q.answers]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_snapshot_invalidated_on_m2m_change(quiz: Quiz):
+    snapshot = get_quiz_snapshot(quiz.id)
+
+    quiz.question_set.remove(quiz.question_set.first())
+
+    assert len(get_quiz_snapshot(quiz.id).questions) == len(snapshot.questions) - 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_snapshot_follows_url_change(quiz: Quiz):
+    get_quiz_snapshot_by_url(quiz.url)
+
+    quiz.url = "novo-endereco"
+    quiz.save()
+
+    assert get_quiz_snapshot_by_url("registro-de-imoveis") is None
+    assert get_quiz_snapshot_by_url("novo-endereco").id == quiz.id
+
+
+def test_quiz_take(quiz: Quiz, user: User, client):
+    client.force_login(user)
+    url = reverse("quiz:quiz_take", kwargs={"quiz_url": quiz.url})
+
+    response = client.get(url)
+    assert response.status_code == 200
+
+    for _ in range(3):
+        question = response.context["question"]
+        response = client.post(url, {"answers": question.get_answer_list()[0][0]})
+        assert response.status_code == 200
+
+    attempt = Attempt.objects.get(user=user, quiz=quiz)
+    assert attempt.complete is True
+    # A primeira alternativa é a certa em todas, inclusive "Verdadeiro"
+    assert attempt.current_score == 3
+    assert len(response.context["questions"]) == 3
+
+
+@pytest.mark.parametrize(
+    "guess,expected",
+    [
+        ("1", True),
+        ("0", False),
+        ("True", True),
+        ("false", False),
+        (True, True),
+        (0, False),
+    ],
+)
+def test_true_false_guess(guess, expected):
+    assert true_false_guess(guess) is expected
+
+
+def test_true_false_guess_rejects_other_values():
+    with pytest.raises(TypeError):
+        true_false_guess("talvez")
+
+
+def test_true_false_question(quiz: Quiz):
+    question = TrueFalseQuestion.objects.get(quiz=quiz)
+
+    assert question.check_answer("1") is True
+    assert question.check_answer("0") is False
+    assert question.answer_choice_to_string("1") == "Verdadeiro"
+
+
+def test_check_answer_by_answer_key(quiz: Quiz, django_assert_num_queries):
+    get_quiz_snapshot(quiz.id)
+
+    with django_assert_num_queries(0):
+        snapshot = get_quiz_snapshot(quiz.id)
+        for question in snapshot.questions:
+            choices = question.get_answer_list_with_correct()
+            right = next(choice[0] for choice in choices if choice[2])
+            wrong = next(choice[0] for choice in choices if not choice[2])
+            assert snapshot.check_answer(question.id, str(right)) is True
+            assert snapshot.check_answer(question.id, str(wrong)) is False
+            assert question.check_answer(str(right)) is True
+
+    true_false = [q for q in snapshot.questions if q.kind == TRUE_FALSE][0]
+    assert true_false.answer_choice_to_string("0") == "Falso"
+
+
+def test_snapshot_kept_in_process(quiz: Quiz, monkeypatch):
+    first = get_quiz_snapshot(quiz.id)
+
+    reads = []
+    get = cache.get
+    monkeypatch.setattr(cache, "get", lambda key, *a: reads.append(key) or get(key, *a))
+
+    assert get_quiz_snapshot(quiz.id) is first
+    # Só a versão é lida do cache compartilhado
+    assert reads == ["quiz:snapshot:version:%s" % quiz.id]
+
+    invalidate_quiz_snapshots([quiz.id])
+    assert get_quiz_snapshot(quiz.id) is not first
+
+
+def test_local_snapshots_bounded():
+    local = LocalSnapshots(2)
+    for key in "abc":
+        local.set(key, key.upper())
+    local.get("b")
+    local.set("d", "D")
+
+    assert list(local.entries) == ["b", "d"]
+    assert local.get("a") is None
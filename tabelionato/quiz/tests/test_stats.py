@@ -0,0 +1,121 @@
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+
+from tabelionato.quiz.models import Attempt, QuestionStats, Quiz, QuizStats
+from tabelionato.quiz.stats import rebuild_stats
+from tabelionato.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+def complete_attempt(quiz, user, outcomes):
+    attempt = Attempt.objects.new_attempt(user, quiz)
+    for question, is_correct in zip(attempt.get_questions(), outcomes):
+        attempt.record_answer(question, "1", is_correct)
+    attempt.mark_quiz_complete()
+    return attempt
+
+
+def snapshot_stats(quiz):
+    quiz_stats = QuizStats.objects.get(quiz=quiz)
+    return (
+        (
+            quiz_stats.attempts,
+            quiz_stats.completed,
+            quiz_stats.passed,
+            quiz_stats.score_sum,
+            quiz_stats.score_sq_sum,
+        ),
+        sorted(QuestionStats.objects.values_list("question_id", "seen", "correct")),
+    )
+
+
+# As estatísticas são atualizadas depois do commit
+@pytest.mark.django_db(transaction=True)
+def test_stats_follow_attempts(quiz: Quiz, user: User):
+    quiz.pass_mark = 50
+    quiz.save()
+    other = User.objects.create(username="outro")
+
+    attempt = complete_attempt(quiz, user, [True, True, False])
+    complete_attempt(quiz, other, [False, False, False])
+    Attempt.objects.new_attempt(other, quiz)
+
+    # Concluir de novo não conta duas vezes
+    attempt.mark_quiz_complete()
+
+    stats = QuizStats.objects.get(quiz=quiz)
+    assert (stats.attempts, stats.completed, stats.passed) == (3, 2, 1)
+    assert stats.score_sum == 67
+    assert stats.mean_score == 33.5
+    assert stats.score_stddev == 33.5
+    assert stats.pass_rate == 50
+
+    first = attempt.get_questions()[0]
+    assert (first.stats.seen, first.stats.correct) == (2, 1)
+
+
+# As estatísticas são atualizadas depois do commit
+@pytest.mark.django_db(transaction=True)
+def test_marking_corrections_update_stats(quiz: Quiz, user: User):
+    attempt = complete_attempt(quiz, user, [True, True, True])
+    question = attempt.get_questions()[0]
+
+    attempt.add_incorrect_question(question)
+
+    stats = QuizStats.objects.get(quiz=quiz)
+    assert stats.score_sum == 67
+    assert stats.score_sq_sum == 67 * 67
+    assert QuestionStats.objects.get(question=question).correct == 0
+
+    attempt.remove_incorrect_question(question)
+
+    assert QuizStats.objects.get(quiz=quiz).score_sum == 100
+    assert QuestionStats.objects.get(question=question).correct == 1
+
+
+# As estatísticas são atualizadas depois do commit
+@pytest.mark.django_db(transaction=True)
+def test_rebuild_matches_incremental_stats(quiz: Quiz, user: User):
+    complete_attempt(quiz, user, [True, False, True])
+    complete_attempt(quiz, User.objects.create(username="outro"), [False] * 3)
+    Attempt.objects.new_attempt(user, quiz)
+    incremental = snapshot_stats(quiz)
+
+    QuizStats.objects.all().delete()
+    call_command("rebuild_quiz_stats")
+
+    assert snapshot_stats(quiz) == incremental
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stats_updated_after_commit(quiz: Quiz, user: User):
+    with transaction.atomic():
+        complete_attempt(quiz, user, [True, True, True])
+        assert not QuizStats.objects.exists()
+        assert not QuestionStats.objects.exists()
+
+    stats = QuizStats.objects.get(quiz=quiz)
+    assert (stats.attempts, stats.completed, stats.score_sum) == (1, 1, 100)
+    assert QuestionStats.objects.count() == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_results_not_stored_match_rebuild(quiz: Quiz, user: User):
+    quiz.store_result = False
+    quiz.save()
+    # Como em <QuizTake>, a tentativa é apagada ao final
+    complete_attempt(quiz, user, [True, True, False]).delete()
+    Attempt.objects.new_attempt(user, quiz)
+    live = (
+        list(QuizStats.objects.values_list()),
+        sorted(QuestionStats.objects.values_list()),
+    )
+
+    rebuild_stats()
+
+    assert live == (
+        list(QuizStats.objects.values_list()),
+        sorted(QuestionStats.objects.values_list()),
+    )
@@ -0,0 +1,94 @@
+import pytest
+from django.core.management import CommandError, call_command
+from django.db.models import Count, Q
+
+from tabelionato.quiz.models import (
+    Answer,
+    Attempt,
+    AttemptResponse,
+    MultiChoiceQuestion,
+    Progress,
+    ProgressCategoryScore,
+    Question,
+    Quiz,
+    QuizStats,
+    TrueFalseQuestion,
+)
+from tabelionato.quiz.synthetic import LoadDataConfig, generate_load_data
+from tabelionato.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+CONFIG = dict(
+    users=20, categories=3, quizzes=4, questions=40, questions_per_quiz=5, attempts=200
+)
+
+
+def attempt_rows(ids):
+    return list(
+        Attempt.objects.filter(id__in=ids)
+        .order_by("id")
+        .values_list("max_score", "current_score", "complete")
+    )
+
+
+def test_generate_load_data():
+    generate_load_data(LoadDataConfig(batch_size=30, **CONFIG))
+
+    assert User.objects.count() == 20
+    assert Quiz.objects.count() == 4
+    assert MultiChoiceQuestion.objects.count() + TrueFalseQuestion.objects.count() == 40
+    assert Answer.objects.filter(is_correct=True).count() == (
+        MultiChoiceQuestion.objects.count()
+    )
+    assert Attempt.objects.count() == 200
+    assert AttemptResponse.objects.count() == 200 * 5
+
+    attempts = Attempt.objects.annotate(
+        answered=Count("responses", filter=Q(responses__answered_at__isnull=False)),
+        correct=Count("responses", filter=Q(responses__is_correct=True)),
+    )
+    for attempt in attempts:
+        assert attempt.current_score == attempt.correct
+        assert attempt.complete == (attempt.answered == attempt.max_score)
+        assert attempt.complete == (attempt.end is not None)
+    assert 0 < Attempt.objects.filter(complete=True).count() < 200
+
+    assert Progress.objects.count() == (
+        Attempt.objects.values("user").distinct().count()
+    )
+    assert ProgressCategoryScore.objects.exists()
+    assert sum(s.completed for s in QuizStats.objects.all()) == (
+        Attempt.objects.filter(complete=True).count()
+    )
+
+    # Os ids seguintes vêm das sequências, depois dos gerados
+    question = MultiChoiceQuestion.objects.create(content="Nova questão")
+    assert question.id > Question.objects.exclude(id=question.id).latest("id").id
+
+
+def test_generate_load_data_is_reproducible():
+    generate_load_data(LoadDataConfig(seed=7, stats=False, **CONFIG))
+    first = list(Attempt.objects.values_list("id", flat=True))
+    generate_load_data(LoadDataConfig(seed=7, stats=False, **CONFIG))
+    second = Attempt.objects.exclude(id__in=first).values_list("id", flat=True)
+
+    assert attempt_rows(first) == attempt_rows(second)
+    assert not QuizStats.objects.exists()
+
+
+def test_generate_load_data_command():
+    call_command(
+        "generate_load_data",
+        "--users=5",
+        "--categories=2",
+        "--quizzes=2",
+        "--questions=10",
+        "--attempts=10",
+        "--no-stats",
+    )
+
+    assert Attempt.objects.count() == 10
+
+    with pytest.raises(CommandError):
+        call_command("generate_load_data", "--quizzes=0")
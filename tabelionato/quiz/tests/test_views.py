@@ -0,0 +1,296 @@
+import asyncio
+import csv
+import io
+import zipfile
+from xml.etree import ElementTree
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.urls import resolve, reverse
+
+from tabelionato.quiz.forms import QuizForm
+from tabelionato.quiz.models import Attempt, Category, Progress, Quiz
+from tabelionato.quiz.snapshots import TRUE_FALSE
+from tabelionato.users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+class TestReadViews:
+    @pytest.mark.parametrize(
+        "name", ["quiz_list", "quiz_detail", "category_index", "category"]
+    )
+    def test_views_are_async(self, name):
+        url = {
+            "quiz_list": reverse("quiz:quiz_list"),
+            "quiz_detail": reverse("quiz:quiz_detail", kwargs={"quiz_url": "x"}),
+            "category_index": reverse("quiz:category_index"),
+            "category": reverse(
+                "quiz:quiz_category_list_matching", kwargs={"category_name": "x"}
+            ),
+        }[name]
+
+        assert asyncio.iscoroutinefunction(resolve(url).func)
+
+    def test_quiz_list(self, quiz: Quiz, user: User, client):
+        client.force_login(user)
+
+        response = client.get(reverse("quiz:quiz_list"))
+
+        assert response.status_code == 200
+        assert response.context["quiz_list"] == [quiz]
+        assert "Registro de Imóveis" in response.content.decode()
+
+    def test_quiz_detail(self, quiz: Quiz, client):
+        url = reverse("quiz:quiz_detail", kwargs={"quiz_url": quiz.url})
+
+        response = client.get(url)
+
+        assert response.status_code == 200
+        assert response.context["quiz"].id == quiz.id
+        assert client.get(url.replace(quiz.url, "outro")).status_code == 404
+
+    def test_quiz_detail_rejects_post(self, quiz: Quiz, client):
+        url = reverse("quiz:quiz_detail", kwargs={"quiz_url": quiz.url})
+
+        assert client.post(url).status_code == 405
+
+    def test_categories(self, quiz: Quiz, client):
+        response = client.get(reverse("quiz:category_index"))
+
+        assert response.status_code == 200
+        assert [c.category for c in response.context["category_list"]] == ["registro"]
+
+        response = client.get(
+            reverse(
+                "quiz:quiz_category_list_matching",
+                kwargs={"category_name": "registro"},
+            )
+        )
+        assert response.status_code == 200
+        assert list(response.context["object_list"]) == [quiz]
+
+        quiz.draft = True
+        quiz.save()
+        response = client.get(
+            reverse(
+                "quiz:quiz_category_list_matching",
+                kwargs={"category_name": "registro"},
+            )
+        )
+        assert list(response.context["object_list"]) == []
+
+    def test_unknown_category(self, client):
+        url = reverse(
+            "quiz:quiz_category_list_matching", kwargs={"category_name": "nada"}
+        )
+
+        assert client.get(url).status_code == 404
+
+
+class TestConditionalGet:
+    def test_quiz_list_not_modified(
+        self, quiz: Quiz, client, django_assert_num_queries
+    ):
+        url = reverse("quiz:quiz_list")
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response["ETag"].startswith('W/"')
+        assert response["Last-Modified"]
+        assert "Cookie" in response["Vary"]
+
+        with django_assert_num_queries(0):
+            response = client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        assert response.status_code == 304
+        assert response.content == b""
+
+    def test_quiz_detail_not_modified(
+        self, quiz: Quiz, user: User, client, django_assert_num_queries
+    ):
+        client.force_login(user)
+        url = reverse("quiz:quiz_detail", kwargs={"quiz_url": quiz.url})
+        response = client.get(url)
+        assert "private" in response["Cache-Control"]
+
+        with django_assert_num_queries(0):
+            response = client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        assert response.status_code == 304
+
+    def test_etag_depends_on_session(self, quiz: Quiz, user: User, client):
+        url = reverse("quiz:quiz_list")
+        etag = client.get(url)["ETag"]
+
+        client.force_login(user)
+
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_if_modified_since(self, quiz: Quiz, client):
+        url = reverse("quiz:category_index")
+        last_modified = client.get(url)["Last-Modified"]
+
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        assert response.status_code == 304
+
+    @pytest.mark.django_db(transaction=True)
+    def test_changes_invalidate(self, quiz: Quiz, client):
+        urls = [
+            reverse("quiz:quiz_list"),
+            reverse("quiz:quiz_detail", kwargs={"quiz_url": quiz.url}),
+            reverse(
+                "quiz:quiz_category_list_matching",
+                kwargs={"category_name": "registro"},
+            ),
+        ]
+        etags = [client.get(url)["ETag"] for url in urls]
+
+        quiz.title = "Novo título"
+        quiz.save()
+
+        for url, etag in zip(urls, etags):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 200
+            assert response["ETag"] != etag
+
+    @pytest.mark.django_db(transaction=True)
+    def test_new_category_invalidates_index(self, client):
+        url = reverse("quiz:category_index")
+        etag = client.get(url)["ETag"]
+
+        Category.objects.new_category("Protesto")
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert "protesto" in response.content.decode()
+
+    def test_missing_quiz_has_no_validators(self, client):
+        url = reverse("quiz:quiz_detail", kwargs={"quiz_url": "nada"})
+
+        response = client.get(url)
+
+        assert response.status_code == 404
+        assert "ETag" not in response
+
+
+class TestQuizTakeSinglePage:
+    @pytest.fixture(autouse=True)
+    def single_page(self, quiz: Quiz):
+        quiz.single_page = True
+        quiz.save()
+
+    def test_renders_every_question(self, quiz: Quiz, user: User, client):
+        client.force_login(user)
+        url = reverse("quiz:quiz_take", kwargs={"quiz_url": quiz.url})
+
+        response = client.get(url)
+
+        assert response.status_code == 200
+        assert isinstance(response.context["form"], QuizForm)
+        assert len(response.context["questions"]) == quiz.question_set.count()
+
+    def test_grades_in_one_post(self, quiz: Quiz, user: User, client):
+        client.force_login(user)
+        url = reverse("quiz:quiz_take", kwargs={"quiz_url": quiz.url})
+        questions = client.get(url).context["questions"]
+
+        # Alternativas certas nas de múltipla escolha e "Falso" na de
+        # verdadeiro ou falso, cujo enunciado é verdadeiro
+        data = {
+            QuizForm.field_name(question): question.get_answer_list()[0][0]
+            for question in questions
+        }
+        true_false = [q for q in questions if q.kind == TRUE_FALSE][0]
+        data[QuizForm.field_name(true_false)] = "0"
+        response = client.post(url, data)
+
+        assert response.status_code == 200
+        assert response.context["score"] == 2
+        assert response.content.decode().count("fa-times-circle") == 1
+        assert "Sua resposta está incorreta" in response.content.decode()
+        attempt = Attempt.objects.get(user=user, quiz=quiz)
+        assert attempt.complete is True
+        assert len(attempt.get_incorrect_questions) == 1
+        progress = Progress.objects.get(user=user)
+        assert progress.list_all_cat_scores == {"registro": [2, 3, 67]}
+
+    def test_missing_answers_rerender(self, quiz: Quiz, user: User, client):
+        client.force_login(user)
+        url = reverse("quiz:quiz_take", kwargs={"quiz_url": quiz.url})
+        client.get(url)
+
+        response = client.post(url, {})
+
+        assert response.status_code == 200
+        assert response.context["form"].errors
+        assert Attempt.objects.get(user=user, quiz=quiz).complete is False
+
+
+class TestQuizMarkingExport:
+    url = reverse("quiz:quiz_marking_export")
+
+    @pytest.fixture
+    def marker(self, user: User, client) -> User:
+        user.user_permissions.add(Permission.objects.get(codename="view_attempts"))
+        client.force_login(user)
+        return user
+
+    @pytest.fixture
+    def attempts(self, quiz: Quiz, marker: User):
+        other = User.objects.create(username="outro")
+        for user, outcomes in [(marker, [True, True, False]), (other, [False] * 3)]:
+            attempt = Attempt.objects.new_attempt(user, quiz)
+            for question, is_correct in zip(attempt.get_questions(), outcomes):
+                attempt.record_answer(question, "1", is_correct)
+            attempt.mark_quiz_complete()
+        Attempt.objects.new_attempt(other, quiz)
+
+    def test_requires_permission(self, user: User, client):
+        client.force_login(user)
+
+        assert client.get(self.url).status_code == 302
+
+    def test_csv(self, attempts, client):
+        response = client.get(self.url, {"user_filter": "outro"})
+
+        assert response.streaming
+        content = b"".join(response.streaming_content).decode("utf-8-sig")
+        rows = list(csv.reader(io.StringIO(content)))
+        assert len(rows) == 2
+        assert rows[1][1:3] == ["outro", "Registro de Imóveis"]
+        assert rows[1][5:] == ["0", "3", "0"]
+
+    def test_xlsx(self, attempts, client):
+        response = client.get(self.url, {"format": "xlsx"})
+
+        content = b"".join(response.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            assert archive.testzip() is None
+            sheet = archive.read("xl/worksheets/sheet1.xml").decode("utf-8")
+        assert sheet.count("<row>") == 3
+        assert "<c><v>67</v></c>" in sheet
+
+    def test_csv_neutralizes_formulas(self, attempts, quiz: Quiz, client):
+        User.objects.filter(username="outro").update(username="=HYPERLINK(1)")
+        Quiz.objects.filter(pk=quiz.pk).update(title="@SUM(A1)")
+
+        response = client.get(self.url, {"user_filter": "=HYPERLINK"})
+
+        content = b"".join(response.streaming_content).decode("utf-8-sig")
+        rows = list(csv.reader(io.StringIO(content)))
+        assert rows[1][1:3] == ["'=HYPERLINK(1)", "'@SUM(A1)"]
+
+    def test_xlsx_strips_control_characters(self, attempts, quiz: Quiz, client):
+        Quiz.objects.filter(pk=quiz.pk).update(title="Registro\x00\x1b <1>")
+
+        response = client.get(self.url, {"format": "xlsx"})
+
+        content = b"".join(response.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            sheet = archive.read("xl/worksheets/sheet1.xml").decode("utf-8")
+        ElementTree.fromstring(sheet)
+        assert "<t>Registro &lt;1&gt;</t>" in sheet
+
+    def test_unknown_format(self, marker: User, client):
+        assert client.get(self.url, {"format": "pdf"}).status_code == 404
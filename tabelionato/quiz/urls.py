@@ -4,20 +4,46 @@ from .views import (
     QuizListView,
     QuizDetailView,
     CategoryListView,  # CategoryDetailView,
+    ViewQuizListByCategory,
     # QuizMarkingList, QuizMarkingDetail,
+    QuizMarkingExport,
     # quizUserProgressView,
     QuizTake,
+    QuizSearchView,
+    LeaderboardView,
 )
 
 app_name = "quiz"
 
 urlpatterns = [
     path("list/", view=QuizListView.as_view(), name="quiz_list"),
+    path("busca/", view=QuizSearchView.as_view(), name="quiz_search"),
+    path("ranking/", view=LeaderboardView.as_view(), name="leaderboard"),
+    path(
+        "ranking/categoria/<str:category_name>/",
+        view=LeaderboardView.as_view(),
+        name="category_leaderboard",
+    ),
     path("<slug:quiz_url>/", RedirectView.as_view(url="detail")),
     path("<slug:quiz_url>/detail/", view=QuizDetailView.as_view(), name="quiz_detail"),
     path("<slug:quiz_url>/take/", view=QuizTake.as_view(), name="quiz_take"),
-    path("categoria/index/", view=CategoryListView, name="category_index"),
+    path(
+        "<slug:quiz_url>/ranking/",
+        view=LeaderboardView.as_view(),
+        name="quiz_leaderboard",
+    ),
+    path("categoria/index/", view=CategoryListView.as_view(), name="category_index"),
+    path(
+        "categoria/<str:category_name>/",
+        view=ViewQuizListByCategory.as_view(),
+        name="quiz_category_list_matching",
+    ),
     # path("categoria/<slug:category_name>/", view=CategoryDetailView.as_view(), name="category_detail"),
+    path(
+        "pontuacao/exportar/",
+        view=QuizMarkingExport.as_view(),
+        name="quiz_marking_export",
+    ),
     # path("pontuacao/", view=QuizMarkingList.as_view(), name="quiz_marking_list"),
     # path("pontuacao/<slug:attempt>/", view=QuizMarkingDetail.as_view(), name="quiz_marking_detail"),
     # path("/", view=.as_view(), name=""),
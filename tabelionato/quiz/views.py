@@ -1,16 +1,30 @@
 # from django.shortcuts import render
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 
+from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required, permission_required
+from django.conf import settings
 from django.contrib import messages
-from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers,
+)
 from django.utils.decorators import method_decorator
-from django.views.generic import DetailView, ListView, TemplateView
+from django.utils.http import http_date
+from django.views.generic import DetailView, ListView, TemplateView, View
 from django.views.generic.edit import FormView
-
-from .forms import QuestionForm
+from asgiref.sync import sync_to_async
+
+from . import leaderboards
+from .anonymous import AnonymousAttempt
+from .export import CONTENT_TYPES, STREAMS, attempt_rows
+from .forms import QuestionForm, QuizForm
+from .pagination import KeysetPaginationMixin, KeysetPaginator
+from .search import search_quizzes
 from .models import (
     Quiz,
     Category,
@@ -18,13 +32,21 @@ from .models import (
     Attempt,
     Question,
 )
+from .snapshots import (
+    get_catalog_version,
+    get_quiz_snapshot,
+    get_quiz_snapshot_by_url,
+    get_snapshot_version_by_url,
+)
 
+import asyncio
+import hashlib
 import random
 
 
 class QuizMarkerMixin(object):
-    @login_required
-    @permission_required("quiz.view_attempts")
+    @method_decorator(login_required)
+    @method_decorator(permission_required("quiz.view_attempts"))
     def dispatch(self, *args, **kwargs):
         return super(QuizMarkerMixin, self).dispatch(*args, **kwargs)
 
@@ -39,77 +61,265 @@ class AttemptFilterTitleMixin(object):
         return queryset
 
 
-class QuizListView(ListView):
-    model = Quiz
-    slug_field = "url"
-    slug_url_kwarg = "quiz_url"
+class AsyncView(View):
+    """
+    View assíncrona. O Django 3.1 só trata como assíncronas as views que
+    são corrotinas, o que ``View.as_view`` não marca; os métodos ``get``,
+    ``post`` etc. das subclasses devem ser ``async def``.
+
+    O ORM e o cache ainda são síncronos: as consultas devem ser feitas com
+    ``sync_to_async``, inclusive a do usuário, antes de renderizar. Como
+    ``ATOMIC_REQUESTS`` não se aplica a views assíncronas, elas não rodam
+    numa transação e devem apenas ler.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view._is_coroutine = asyncio.coroutines._is_coroutine
+        return transaction.non_atomic_requests(view)
+
+    async def http_method_not_allowed(self, request, *args, **kwargs):
+        return super().http_method_not_allowed(request, *args, **kwargs)
+
+    async def options(self, request, *args, **kwargs):
+        return super().options(request, *args, **kwargs)
+
+    async def render(self, context):
+        # Carrega o usuário, e a sessão, fora do laço de eventos: o
+        # template lê ``user`` pelo processador de contexto
+        await sync_to_async(lambda: self.request.user.is_authenticated)()
+        return render(self.request, self.template_name, context)
+
+
+class ConditionalAsyncView(AsyncView):
+    """
+    Responde a GETs condicionais (If-None-Match e If-Modified-Since) com 304
+    sem consultar o banco nem renderizar, a partir da versão do conteúdo
+    devolvida por ``get_version`` (veja snapshots.py). ``get`` pode trocar
+    ``self.version`` pela versão que de fato renderizou.
+
+    A página também depende do usuário, das mensagens e do idioma, então o
+    ETag (fraco) inclui os cookies de sessão e de mensagens e o idioma, e a
+    resposta varia por Cookie.
+    """
+
+    version = None
+
+    def get_version(self):
+        raise NotImplementedError
+
+    def get_etag(self):
+        cookies = self.request.COOKIES
+        key = "%s:%s:%s:%s" % (
+            self.version,
+            cookies.get(settings.SESSION_COOKIE_NAME, ""),
+            cookies.get(getattr(settings, "MESSAGES_COOKIE_NAME", "messages"), ""),
+            getattr(self.request, "LANGUAGE_CODE", ""),
+        )
+        return 'W/"%s"' % hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def get_last_modified(self):
+        return self.version // 10**9
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return await super().dispatch(request, *args, **kwargs)
+
+        self.version = await sync_to_async(self.get_version)()
+        if self.version is not None:
+            response = get_conditional_response(
+                request,
+                etag=self.get_etag(),
+                last_modified=self.get_last_modified(),
+            )
+            if response is not None:
+                return self.add_validators(response)
+
+        return self.add_validators(await super().dispatch(request, *args, **kwargs))
+
+    def add_validators(self, response):
+        if self.version is not None and response.status_code in (200, 304):
+            response.setdefault("ETag", self.get_etag())
+            response.setdefault("Last-Modified", http_date(self.get_last_modified()))
+        patch_vary_headers(response, ("Cookie",))
+        if self.request.COOKIES.get(settings.SESSION_COOKIE_NAME):
+            patch_cache_control(response, private=True)
+        return response
+
+
+class QuizListView(ConditionalAsyncView):
     template_name = "quiz/quiz_list.html"
 
+    def get_version(self):
+        return get_catalog_version()
 
-class QuizDetailView(DetailView):
-    model = Quiz
-    slug_field = "url"
-    slug_url_kwarg = "quiz_url"
-    template_name = "quiz/quiz_detail.html"
+    async def get(self, request, *args, **kwargs):
+        quiz_list = await sync_to_async(list)(
+            Quiz.objects.select_related("category").order_by("id")
+        )
+        return await self.render({"quiz_list": quiz_list, "object_list": quiz_list})
 
-    # @permission_required('quiz.change_quiz')
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
 
-        return context
+class QuizDetailView(ConditionalAsyncView):
+    """
+    Página de apresentação do questionário, servida pelo snapshot em cache
+    (veja snapshots.py)
+    """
 
+    template_name = "quiz/quiz_detail.html"
+
+    def get_version(self):
+        return get_snapshot_version_by_url(self.kwargs["quiz_url"])
 
-class CategoryListView(ListView):
-    model = Category
+    async def get(self, request, *args, **kwargs):
+        quiz = await sync_to_async(get_quiz_snapshot_by_url)(kwargs["quiz_url"])
+        if quiz is None:
+            raise Http404
+        self.version = quiz.version
+        return await self.render({"quiz": quiz, "object": quiz})
 
 
-class ViewQuizListByCategory(ListView):
+class QuizSearchView(ListView):
+    """
+    Busca pública dos questionários publicados, pelo título e pela
+    descrição (veja search.py)
+    """
+
     model = Quiz
-    template_name = "quiz/view_quiz_category.html"
+    template_name = "quiz/quiz_search.html"
+    max_results = 50
 
-    def dispatch(self, request, *args, **kwargs):
-        self.category = get_object_or_404(
-            Category, category=self.kwargs["category_name"]
-        )
+    def get_queryset(self):
+        self.query = self.request.GET.get("q", "").strip()
+        if not self.query:
+            return Quiz.objects.none()
 
-        return super(ViewQuizListByCategory, self).dispatch(request, *args, **kwargs)
+        queryset = Quiz.objects.filter(draft=False).select_related("category")
+        return search_quizzes(queryset, self.query)[: self.max_results]
 
     def get_context_data(self, **kwargs):
-        context = super(ViewQuizListByCategory, self).get_context_data(**kwargs)
+        context = super(QuizSearchView, self).get_context_data(**kwargs)
+        context["query"] = self.query
+        return context
+
+
+class CategoryListView(ConditionalAsyncView):
+    template_name = "quiz/category_list.html"
+
+    def get_version(self):
+        return get_catalog_version()
+
+    async def get(self, request, *args, **kwargs):
+        category_list = await sync_to_async(list)(
+            Category.objects.exclude(category__isnull=True).order_by("category")
+        )
+        return await self.render(
+            {"category_list": category_list, "object_list": category_list}
+        )
 
-        context["category"] = self.category
+
+class ViewQuizListByCategory(ConditionalAsyncView):
+    template_name = "quiz/view_quiz_category.html"
+
+    def get_version(self):
+        return get_catalog_version()
+
+    def get_quizzes(self, category_name):
+        category = get_object_or_404(Category, category=category_name)
+        quizzes = Quiz.objects.filter(category=category, draft=False).order_by("id")
+        return category, list(quizzes)
+
+    async def get(self, request, *args, **kwargs):
+        category, quizzes = await sync_to_async(self.get_quizzes)(
+            kwargs["category_name"]
+        )
+        return await self.render({"category": category, "object_list": quizzes})
+
+
+class LeaderboardView(AsyncView):
+    """
+    Ranking geral, de uma categoria ou de um questionário, na semana, no
+    mês ou desde sempre (veja leaderboards.py)
+    """
+
+    template_name = "quiz/leaderboard.html"
+    size = 10
+    periods = (
+        ("semana", leaderboards.WEEK, "Semana"),
+        ("mes", leaderboards.MONTH, "Mês"),
+        ("geral", leaderboards.ALL, "Geral"),
+    )
+
+    def get_scope(self):
+        if "quiz_url" in self.kwargs:
+            quiz = get_quiz_snapshot_by_url(self.kwargs["quiz_url"])
+            if quiz is None or quiz.draft:
+                raise Http404
+            return leaderboards.quiz_scope(quiz.id), {"quiz": quiz}
+        if "category_name" in self.kwargs:
+            category = get_object_or_404(
+                Category, category=self.kwargs["category_name"]
+            )
+            return leaderboards.category_scope(category.id), {"category": category}
+        return leaderboards.GLOBAL, {}
+
+    def get_board(self, period):
+        scope, context = self.get_scope()
+        rows = leaderboards.top(scope, period, self.size)
+        users = get_user_model().objects.in_bulk([user_id for user_id, _ in rows])
+        context["ranking"] = [
+            (position, users[user_id], score)
+            for position, (user_id, score) in enumerate(rows, 1)
+            if user_id in users
+        ]
+        if self.request.user.is_authenticated:
+            context["my_rank"] = leaderboards.rank(scope, self.request.user.pk, period)
         return context
 
-    def get_queryset(self):
-        queryset = super(ViewQuizListByCategory, self).get_queryset()
-        return queryset.filter(category=self.category, draft=False)
+    async def get(self, request, *args, **kwargs):
+        name = request.GET.get("periodo", "geral")
+        period = {key: value for key, value, _ in self.periods}.get(name)
+        if period is None:
+            name, period = "geral", leaderboards.ALL
+
+        context = await sync_to_async(self.get_board)(period)
+        context.update(
+            {"period": name, "periods": [(k, label) for k, _, label in self.periods]}
+        )
+        return await self.render(context)
 
 
 @login_required
 def quizUserProgressView(request):
     paginate_by = 8
     progress, c = Progress.objects.get_or_create(user=request.user)
-    all_exams = progress.show_exams()
-    paginator = Paginator(all_exams, paginate_by)
-    page = request.GET.get("page")
-
-    try:
-        exams_pages = paginator.get_page(page)
-    except PageNotAnInteger:
-        exams_pages = paginator.page(1)
-    except EmptyPage:
-        exams_pages = paginator.page(paginator.num_pages)
+    paginator = KeysetPaginator(
+        progress.show_exams(),
+        paginate_by,
+        count_cache_key="quiz:progress:exams:%s" % request.user.pk,
+    )
+    exams_pages = paginator.page_from_request(request)
 
     context = {"cat_scores": progress.list_all_cat_scores, "exams": exams_pages}
 
     return render(request, "quiz/progress_list.html", context)
 
 
-class QuizMarkingList(QuizMarkerMixin, AttemptFilterTitleMixin, ListView):
+class QuizMarkingList(
+    QuizMarkerMixin, AttemptFilterTitleMixin, KeysetPaginationMixin, ListView
+):
     model = Attempt
+    # Inclui as tentativas arquivadas (veja archive.py)
+    queryset = Attempt.objects.with_archive()
 
     def get_queryset(self):
-        queryset = super(QuizMarkingList, self).get_queryset().filter(complete=True)
+        queryset = (
+            super(QuizMarkingList, self)
+            .get_queryset()
+            .filter(complete=True)
+            .select_related("user", "quiz")
+        )
 
         user_filter = self.request.GET.get("user_filter")
         if user_filter:
@@ -121,6 +331,27 @@ class QuizMarkingList(QuizMarkerMixin, AttemptFilterTitleMixin, ListView):
         pass
 
 
+class QuizMarkingExport(QuizMarkingList):
+    """
+    Exporta as tentativas filtradas de <QuizMarkingList> em CSV ou XLSX,
+    em fluxo (veja export.py)
+    """
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get("format", "csv")
+        if export_format not in STREAMS:
+            raise Http404
+
+        rows = attempt_rows(self.get_queryset())
+        response = StreamingHttpResponse(
+            STREAMS[export_format](rows), content_type=CONTENT_TYPES[export_format]
+        )
+        response["Content-Disposition"] = (
+            'attachment; filename="tentativas.%s"' % export_format
+        )
+        return response
+
+
 @login_required
 class QuizMarkingDetail(QuizMarkerMixin, DetailView):
     model = Attempt
@@ -140,14 +371,13 @@ class QuizMarkingDetail(QuizMarkerMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         context = super(QuizMarkingDetail, self).get_context_data(**kwargs)
-        context["questions"] = context["attempt"].get_questions(with_answers=True)
+        attempt = context["attempt"]
+        context["questions"] = attempt.get_questions(
+            with_answers=True, snapshot=get_quiz_snapshot(attempt.quiz_id)
+        )
         return context
 
 
-# TODO QuizTake de página única, igual a versão anterior,
-#      mas utilizando o AttemptManager
-
-
 class QuizTake(FormView):
     form_class = QuestionForm
     slug_field = "url"
@@ -155,7 +385,10 @@ class QuizTake(FormView):
     template_name = "quiz/question.html"
 
     def dispatch(self, request, *args, **kwargs):
-        self.quiz = get_object_or_404(Quiz, url=self.kwargs["quiz_url"])
+        # Questionário compilado, servido pelo cache (veja snapshots.py)
+        self.quiz = get_quiz_snapshot_by_url(self.kwargs["quiz_url"])
+        if self.quiz is None:
+            raise Http404
         if self.quiz.draft and not request.user.has_perm("quiz.change_quiz"):
             raise PermissionDenied
 
@@ -163,33 +396,64 @@ class QuizTake(FormView):
 
         if self.logged_in_user:
             self.attempt = Attempt.objects.user_attempt(request.user, self.quiz)
+        else:
+            # Anônimos: a tentativa fica num cookie assinado, sem gravar
+            # nada no banco (veja anonymous.py)
+            self.attempt = AnonymousAttempt.from_request(request, self.quiz)
         if self.attempt is False:
             return render(request, "quiz/quiz_unavailable.html")
 
-        return super(QuizTake, self).dispatch(request, *args, **kwargs)
+        response = super(QuizTake, self).dispatch(request, *args, **kwargs)
+        if not self.logged_in_user:
+            self.attempt.save(request, response)
+        return response
+
+    def get_template_names(self):
+        if self.quiz.single_page:
+            return ["quiz/quiz_single_page.html"]
+        return super(QuizTake, self).get_template_names()
 
     def get_form(self, form_class=QuestionForm):
-        if self.logged_in_user:
-            self.question = self.attempt.get_first_question()
-            self.progress = self.attempt.progress()
+        if self.quiz.single_page:
+            # Modo de página única: todas as questões restantes de uma vez
+            self.questions = self.quiz.get_questions(
+                self.attempt.get_unanswered_question_ids()
+            )
+            return QuizForm(self.questions, **super().get_form_kwargs())
+
+        self.question = self.get_first_question()
+        self.progress = self.attempt.progress()
         return form_class(**self.get_form_kwargs())
 
+    def get_first_question(self):
+        question_id = self.attempt.get_first_question_id()
+        if question_id is None:
+            return False
+        return self.quiz.get_question(question_id)
+
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
 
         return dict(kwargs, question=self.question)
 
     def form_valid(self, form):
-        if self.logged_in_user:
-            self.form_valid_user(form)
-            if self.attempt.get_first_question() is False:
-                return self.final_result_user()
+        if self.quiz.single_page:
+            return self.form_valid_single_page(form)
+
+        self.form_valid_user(form)
+        if self.attempt.get_first_question_id() is None:
+            return self.final_result_user()
         self.request.POST = {}
 
         return super(QuizTake, self).get(self, self.request)
 
     def get_context_data(self, **kwargs):
         context = super(QuizTake, self).get_context_data(**kwargs)
+        if self.quiz.single_page:
+            context["quiz"] = self.quiz
+            context["questions"] = self.questions
+            return context
+
         context["question"] = self.question
         context["quiz"] = self.quiz
         if hasattr(self, "previous"):
@@ -199,16 +463,15 @@ class QuizTake(FormView):
         return context
 
     def form_valid_user(self, form):
-        progress, c = Progress.objects.get_or_create(user=self.request.user)
         guess = form.cleaned_data["answers"]
-        is_correct = self.question.check_answer(guess)
+        # Gabarito do snapshot, sem consultas
+        is_correct = self.quiz.check_answer(self.question.id, guess)
 
-        if is_correct is True:
-            self.attempt.add_to_score(1)
-            progress.update_score(self.question, 1, 1)
-        else:
-            self.attempt.add_incorrect_question(self.question)
-            progress.update_score(self.question, 0, 1)
+        recorded = self.attempt.record_answer(self.question, guess, is_correct)
+        # Um POST repetido não conta de novo no progresso
+        if recorded and self.logged_in_user:
+            progress, c = Progress.objects.get_or_create(user=self.request.user)
+            progress.update_score(self.question, int(is_correct is True), 1)
 
         if self.quiz.answers_at_end is not True:
             self.previous = {
@@ -216,14 +479,27 @@ class QuizTake(FormView):
                 "previous_outcome": is_correct,
                 "previous_question": self.question,
                 "previous_question_id": self.question.id,
-                "answers": self.question.get_answers(),
-                "question_type": {self.question.__class__.__name__: True},
+                "answers": self.question.get_answer_list_with_correct(),
+                "question_type": {self.question.kind: True},
             }
         else:
             self.previous = {}
 
-        self.attempt.add_user_answer(self.question, guess)
-        self.attempt.remove_first_question()
+    def form_valid_single_page(self, form):
+        """
+        Corrige todas as respostas de uma vez contra o gabarito do snapshot,
+        gravando a tentativa e o progresso na mesma transação
+        """
+        with transaction.atomic():
+            category_scores = self.attempt.grade_answers(
+                self.questions, form.get_guesses()
+            )
+            if self.logged_in_user:
+                progress, c = Progress.objects.get_or_create(user=self.request.user)
+                progress.update_scores(category_scores)
+
+        self.previous = {}
+        return self.final_result_user()
 
     def final_result_user(self):
         results = {
@@ -235,11 +511,14 @@ class QuizTake(FormView):
             "previous": self.previous,
         }
 
-        self.attempt.mark_quiz_complete()
+        if not self.attempt.complete:
+            self.attempt.mark_quiz_complete()
 
         if self.quiz.answers_at_end:
-            results["questions"] = self.attempt.get_questions(with_answers=True)
-            results["incorrect_questions"] = self.attempt.get_incorrect_questions
+            results["questions"] = self.attempt.get_questions(
+                with_answers=True, snapshot=self.quiz
+            )
+            results["incorrect_questions"] = set(self.attempt.get_incorrect_questions)
 
         if self.quiz.store_result is False:
             self.attempt.delete()
@@ -0,0 +1,104 @@
+from django import forms
+from django.conf import settings
+from django.contrib.admin.widgets import SELECT2_TRANSLATIONS
+from django.utils.translation import get_language
+
+from .models import Category
+
+
+class QuestionPickerWidget(forms.SelectMultiple):
+    """
+    Seletor de questões com busca por AJAX (select2). Só as questões já
+    escolhidas são renderizadas; as demais vêm do endpoint ``url``, que
+    recebe a busca, a categoria e a dificuldade escolhidas nos filtros ao
+    lado do campo.
+    """
+
+    template_name = "admin/quiz/widgets/question_picker.html"
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context["widget"]["categories"] = Category.objects.order_by(
+            "category"
+        ).values_list("id", "category")
+        context["widget"]["difficulties"] = range(1, 6)
+        return context
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs=extra_attrs)
+        attrs.setdefault("class", "")
+        attrs.update(
+            {
+                "data-ajax--url": str(self.url),
+                "data-ajax--delay": 250,
+                "data-ajax--cache": "true",
+                "data-theme": "admin-autocomplete",
+                "lang": get_language(),
+                "class": attrs["class"]
+                + (" " if attrs["class"] else "")
+                + "question-picker",
+            }
+        )
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        """
+        Renderiza apenas as questões escolhidas, numa única consulta.
+        """
+        selected = {str(v) for v in value if v not in (None, "")}
+        groups = []
+        if not selected:
+            return groups
+
+        queryset = self.choices.queryset.filter(pk__in=selected).select_related(
+            "category"
+        )
+        for index, question in enumerate(queryset.order_by("id")):
+            groups.append(
+                (
+                    None,
+                    [
+                        self.create_option(
+                            name, question.pk, picker_label(question), True, index
+                        )
+                    ],
+                    index,
+                )
+            )
+        return groups
+
+    @property
+    def media(self):
+        extra = "" if settings.DEBUG else ".min"
+        i18n_name = SELECT2_TRANSLATIONS.get(get_language())
+        i18n_file = (
+            ("admin/js/vendor/select2/i18n/%s.js" % i18n_name,) if i18n_name else ()
+        )
+        return forms.Media(
+            js=(
+                "admin/js/vendor/jquery/jquery%s.js" % extra,
+                "admin/js/vendor/select2/select2.full%s.js" % extra,
+            )
+            + i18n_file
+            + ("admin/js/jquery.init.js", "js/question_picker.js"),
+            css={
+                "screen": (
+                    "admin/css/vendor/select2/select2%s.css" % extra,
+                    "admin/css/autocomplete.css",
+                ),
+            },
+        )
+
+
+def picker_label(question):
+    category = question.category.category if question.category_id else "-"
+    return "#%s [%s, %s] %s" % (
+        question.pk,
+        category,
+        question.difficulty,
+        question.content[:80],
+    )
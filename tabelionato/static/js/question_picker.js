@@ -0,0 +1,30 @@
+/* Seletor de questões do admin de questionários (veja quiz/widgets.py). */
+'use strict';
+{
+    const $ = django.jQuery;
+
+    function init(element) {
+        const $element = $(element);
+        const $filters = $('.question-picker-filters[data-picker="' + element.id + '"]');
+
+        $element.select2({
+            width: '100%',
+            ajax: {
+                data: function(params) {
+                    return {
+                        q: params.term,
+                        page: params.page,
+                        category: $filters.find('.question-picker-category').val(),
+                        difficulty: $filters.find('.question-picker-difficulty').val()
+                    };
+                }
+            }
+        });
+    }
+
+    $(function() {
+        $('.question-picker').each(function() {
+            init(this);
+        });
+    });
+}
@@ -0,0 +1,39 @@
+"""
+Middlewares de terceiros adaptados para rodar também na cadeia assíncrona.
+
+Sob ASGI, o Django 3.1 só monta a cadeia assíncrona se todos os
+middlewares aceitarem ser chamados como corrotina; um só síncrono faz a
+requisição inteira, inclusive as views assíncronas, passar por uma thread.
+"""
+import asyncio
+
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """
+    <whitenoise.middleware.WhiteNoiseMiddleware> (5.2, só síncrono) que
+    também funciona na cadeia assíncrona. Fora do DEBUG, achar o arquivo é
+    uma consulta a um dicionário em memória, que pode rodar no laço de
+    eventos; as demais requisições seguem adiante sem passar por thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if asyncio.iscoroutinefunction(get_response):
+            # Como no MiddlewareMixin: o handler nos chama como corrotina
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        response = self.process_request(request)
+        if response is None:
+            response = await self.get_response(request)
+        return response
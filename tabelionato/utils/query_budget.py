@@ -0,0 +1,182 @@
+"""
+Contagem de consultas por requisição.
+
+<QueryCounter> registra as consultas executadas em todos os bancos enquanto
+está ativo e agrupa as que têm o mesmo formato (o SQL sem os parâmetros),
+o que denuncia padrões N+1: a mesma consulta repetida uma vez por item.
+
+<QueryBudgetMiddleware> conta as consultas de cada requisição e registra o
+total com o nome da URL resolvida. Cada view pode ter um orçamento em
+``QUERY_BUDGETS`` ({"quiz:quiz_take": 12, ...}); com ``QUERY_BUDGET_RAISE``
+(ligado nos testes), estourar o orçamento ou repetir uma consulta
+``QUERY_BUDGET_DUPLICATES`` vezes levanta <QueryBudgetExceeded>, senão
+apenas gera um aviso no log. Nas respostas em fluxo (como as exportações),
+a contagem continua enquanto o conteúdo é enviado e a verificação é feita
+ao final.
+
+O middleware funciona nas duas cadeias, síncrona e assíncrona. As
+conexões do Django são por thread: sob ASGI, a contagem é ligada na thread
+em que ``sync_to_async`` roda as consultas da requisição (uma por
+requisição, veja config/asgi.py), não na do laço de eventos.
+
+Nos testes, ``assert_query_budget`` faz a mesma verificação num bloco.
+"""
+import asyncio
+import logging
+import re
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DUPLICATES = 5
+
+# Controle de transação não conta como consulta
+IGNORED = re.compile(r"^\s*(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b", re.I)
+
+PLACEHOLDER_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+NUMBER = re.compile(r"\b\d+\b")
+BLANKS = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_shape(sql):
+    """
+    Formato da consulta: o SQL com listas de parâmetros e números
+    substituídos, para que consultas que diferem só nos valores sejam
+    iguais.
+    """
+    sql = PLACEHOLDER_LIST.sub("(...)", sql)
+    sql = NUMBER.sub("?", sql)
+    return BLANKS.sub(" ", sql).strip()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        if not IGNORED.match(sql):
+            self.shapes[query_shape(sql)] += 1
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def capture(self):
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(self))
+            yield self
+
+    @property
+    def count(self):
+        return sum(self.shapes.values())
+
+    def duplicates(self, minimum=2):
+        """
+        Formatos executados ao menos ``minimum`` vezes, dos mais repetidos
+        para os menos.
+        """
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= minimum]
+
+    def problems(self, max_queries=None, max_duplicates=DUPLICATES):
+        """
+        Lista de mensagens com o que passou dos limites.
+        """
+        problems = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(
+                "%s consultas, o orçamento é %s" % (self.count, max_queries)
+            )
+        if max_duplicates:
+            for shape, n in self.duplicates(max_duplicates):
+                problems.append("consulta repetida %s vezes (N+1?): %s" % (n, shape))
+        return problems
+
+
+@contextmanager
+def assert_query_budget(max_queries=None, max_duplicates=DUPLICATES):
+    """
+    Falha se o bloco executar mais de ``max_queries`` consultas ou repetir
+    uma mesma consulta ``max_duplicates`` vezes.
+    """
+    counter = QueryCounter()
+    with counter.capture():
+        yield counter
+
+    problems = counter.problems(max_queries, max_duplicates)
+    if problems:
+        raise QueryBudgetExceeded("; ".join(problems))
+
+
+class QueryBudgetMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Como no MiddlewareMixin: o handler nos chama como corrotina
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+
+        counter = QueryCounter()
+        with counter.capture():
+            response = self.get_response(request)
+        return self.finish(request, counter, response)
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        capture = counter.capture()
+        await sync_to_async(capture.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(capture.__exit__)(None, None, None)
+        return self.finish(request, counter, response)
+
+    def finish(self, request, counter, response):
+        if not response.streaming:
+            self.check(request, counter)
+            return response
+        response.streaming_content = self.stream(
+            request, counter, response.streaming_content
+        )
+        return response
+
+    def stream(self, request, counter, content):
+        # As consultas de uma resposta em fluxo rodam enquanto ela é
+        # enviada, depois que o middleware já retornou
+        with counter.capture():
+            yield from content
+        self.check(request, counter)
+
+    def check(self, request, counter):
+        match = getattr(request, "resolver_match", None)
+        view_name = match.view_name if match else request.path
+        logger.info(
+            "%s: %s consultas, %s repetidas",
+            view_name,
+            counter.count,
+            sum(n - 1 for _, n in counter.duplicates()),
+        )
+
+        budgets = getattr(settings, "QUERY_BUDGETS", {})
+        problems = counter.problems(
+            budgets.get(view_name),
+            getattr(settings, "QUERY_BUDGET_DUPLICATES", DUPLICATES),
+        )
+        if problems:
+            message = "%s: %s" % (view_name, "; ".join(problems))
+            if getattr(settings, "QUERY_BUDGET_RAISE", False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
@@ -0,0 +1,87 @@
+"""
+Consultas sobre várias tabelas com os mesmos campos.
+
+<MergedQuerySet> junta querysets de modelos com os mesmos campos (por
+exemplo <Attempt> e <ArchivedAttempt>) e repassa ``filter``, ``exclude``,
+``order_by``, ``select_related``, ``values_list`` e ``reverse`` a cada um.
+Fatiar ``[:n]`` busca até n itens de cada queryset e os intercala pela
+ordenação, o que basta para a paginação por chave (veja
+quiz/pagination.py). ``count`` soma as contagens e ``iterator`` percorre
+um queryset depois do outro.
+
+A ordenação deve ter todos os campos na mesma direção.
+"""
+import heapq
+from itertools import chain, islice
+from operator import attrgetter
+
+
+class MergedQuerySet:
+    def __init__(self, *querysets):
+        self.querysets = querysets
+
+    def __repr__(self):
+        return "<MergedQuerySet %r>" % (self.querysets,)
+
+    @property
+    def model(self):
+        return self.querysets[0].model
+
+    def _apply(self, method, *args, **kwargs):
+        return MergedQuerySet(
+            *(getattr(queryset, method)(*args, **kwargs) for queryset in self.querysets)
+        )
+
+    def all(self):
+        return self._apply("all")
+
+    def filter(self, *args, **kwargs):
+        return self._apply("filter", *args, **kwargs)
+
+    def exclude(self, *args, **kwargs):
+        return self._apply("exclude", *args, **kwargs)
+
+    def order_by(self, *fields):
+        return self._apply("order_by", *fields)
+
+    def reverse(self):
+        return self._apply("reverse")
+
+    def select_related(self, *fields):
+        return self._apply("select_related", *fields)
+
+    def values_list(self, *fields, **kwargs):
+        return self._apply("values_list", *fields, **kwargs)
+
+    def count(self):
+        return sum(queryset.count() for queryset in self.querysets)
+
+    def exists(self):
+        return any(queryset.exists() for queryset in self.querysets)
+
+    def iterator(self, chunk_size=2000):
+        return chain.from_iterable(
+            queryset.iterator(chunk_size) for queryset in self.querysets
+        )
+
+    def _merge(self, results):
+        query = self.querysets[0].query
+        ordering = query.order_by
+        if not ordering:
+            return chain.from_iterable(results)
+
+        descending = ordering[0].startswith("-") == query.standard_ordering
+        key = attrgetter(*(name.lstrip("-") for name in ordering))
+        return heapq.merge(*results, key=key, reverse=descending)
+
+    def __iter__(self):
+        return iter(self._merge([list(queryset) for queryset in self.querysets]))
+
+    def __len__(self):
+        return sum(len(queryset) for queryset in self.querysets)
+
+    def __getitem__(self, k):
+        if not isinstance(k, slice) or k.start or k.step or k.stop is None:
+            raise TypeError("MergedQuerySet só aceita fatias [:n]")
+        results = [list(queryset[: k.stop]) for queryset in self.querysets]
+        return list(islice(self._merge(results), k.stop))
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import time
+
+import pytest
+from asgiref.sync import ThreadSensitiveContext
+from asgiref.testing import ApplicationCommunicator
+from django.core.handlers.asgi import ASGIHandler as BaseASGIHandler
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+
+from config.asgi import application
+from tabelionato.quiz import views
+from tabelionato.quiz.models import Quiz
+from tabelionato.utils.asgi import ASGIHandler
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+async def asgi_get(path):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "query_string": b"",
+        "headers": [(b"host", b"testserver")],
+    }
+    communicator = ApplicationCommunicator(application, scope)
+    await communicator.send_input({"type": "http.request", "body": b""})
+    start = await communicator.receive_output(5)
+    while (await communicator.receive_output(5)).get("more_body"):
+        pass
+    return start["status"]
+
+
+def test_middleware_chain_is_async(settings, caplog):
+    # Com DEBUG, o Django registra cada middleware adaptado a síncrono
+    settings.DEBUG = True
+    with caplog.at_level(logging.DEBUG, logger="django.request"):
+        BaseASGIHandler()
+
+    assert "adapted" not in caplog.text
+
+
+def test_slow_requests_overlap(monkeypatch):
+    def slow_version(self):
+        time.sleep(0.5)
+
+    monkeypatch.setattr(views.QuizDetailView, "get_version", slow_version)
+    monkeypatch.setattr(views, "get_quiz_snapshot_by_url", lambda url: None)
+    url = reverse("quiz:quiz_detail", kwargs={"quiz_url": "x"})
+
+    async def both():
+        return await asyncio.gather(asgi_get(url), asgi_get(url))
+
+    started = time.monotonic()
+    assert asyncio.run(both()) == [404, 404]
+    # Em série levariam 1s: cada requisição tem a sua thread
+    assert time.monotonic() - started < 0.9
+
+
+def test_middleware_counts_async_queries(caplog):
+    url = reverse("quiz:quiz_list")
+
+    with caplog.at_level(logging.INFO, logger="tabelionato.utils.query_budget"):
+        assert asyncio.run(asgi_get(url)) == 200
+
+    assert "quiz:quiz_list: 1 consultas" in caplog.text
+
+
+def test_streaming_response_reads_database():
+    def content():
+        yield str(Quiz.objects.count())
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    async def stream():
+        async with ThreadSensitiveContext():
+            await ASGIHandler().send_response(StreamingHttpResponse(content()), send)
+
+    asyncio.run(stream())
+
+    assert [m.get("body") for m in sent[1:]] == [b"0", None]
@@ -0,0 +1,70 @@
+import logging
+
+import pytest
+from django.urls import reverse
+
+from tabelionato.quiz.models import Category
+from tabelionato.utils.query_budget import QueryBudgetExceeded, query_shape
+
+pytestmark = pytest.mark.django_db
+
+
+def test_query_shape():
+    first = query_shape('SELECT * FROM "t" WHERE "id" IN (%s, %s) LIMIT 21')
+    second = query_shape('SELECT *  FROM "t"\nWHERE "id" IN (%s) LIMIT 1')
+
+    assert first == second == 'SELECT * FROM "t" WHERE "id" IN (...) LIMIT ?'
+
+
+def test_budget(query_budget):
+    with query_budget(2) as counter:
+        Category.objects.count()
+        Category.objects.exists()
+
+    assert counter.count == 2
+
+    with pytest.raises(QueryBudgetExceeded, match="3 consultas"):
+        with query_budget(2):
+            for _ in range(3):
+                Category.objects.count()
+
+
+def test_detects_n_plus_one(query_budget):
+    categories = [Category.objects.create(category=str(n)) for n in range(5)]
+
+    with pytest.raises(QueryBudgetExceeded, match="N\\+1"):
+        with query_budget():
+            for category in categories:
+                Category.objects.get(pk=category.pk)
+
+
+def test_middleware(client, settings, caplog):
+    url = reverse("quiz:quiz_list")
+
+    with caplog.at_level(logging.INFO, logger="tabelionato.utils.query_budget"):
+        client.get(url)
+    assert "quiz:quiz_list: 1 consultas" in caplog.text
+
+    settings.QUERY_BUDGETS = {"quiz:quiz_list": 0}
+    with pytest.raises(QueryBudgetExceeded):
+        client.get(url)
+
+    settings.QUERY_BUDGET_RAISE = False
+    with caplog.at_level(logging.WARNING):
+        assert client.get(url).status_code == 200
+    assert "o orçamento é 0" in caplog.text
+
+
+def test_middleware_counts_streaming_responses(admin_client, settings, caplog):
+    url = reverse("quiz:quiz_marking_export")
+
+    with caplog.at_level(logging.INFO, logger="tabelionato.utils.query_budget"):
+        response = admin_client.get(url)
+        assert "quiz:quiz_marking_export" not in caplog.text
+        b"".join(response.streaming_content)
+    assert "quiz:quiz_marking_export: " in caplog.text
+
+    settings.QUERY_BUDGETS = {"quiz:quiz_marking_export": 0}
+    response = admin_client.get(url)
+    with pytest.raises(QueryBudgetExceeded):
+        b"".join(response.streaming_content)